@@ -3,8 +3,11 @@
 from __future__ import annotations
 
 from opennote.bot.commands import (  # noqa: F401
+    ask_command,
     note_command,
     outline_command,
+    retry_command,
+    search_command,
     study_command,
     summary_command,
     transcript_command,
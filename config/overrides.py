@@ -0,0 +1,28 @@
+"""Temporarily change settings, for tools that run the app with another configuration."""
+
+from __future__ import annotations
+
+from contextlib import contextmanager
+from typing import Any, Iterator
+
+from config import settings
+
+
+@contextmanager
+def override_settings(**values: Any) -> Iterator[None]:
+    """Set the given settings for the duration of the block, then restore them.
+
+    The change is process-wide, like editing settings.py; unknown names raise
+    AttributeError so a typo cannot silently leave a setting alone.
+    """
+    unknown = [name for name in values if not hasattr(settings, name)]
+    if unknown:
+        raise AttributeError(f"Unknown settings: {', '.join(sorted(unknown))}")
+    previous = {name: getattr(settings, name) for name in values}
+    for name, value in values.items():
+        setattr(settings, name, value)
+    try:
+        yield
+    finally:
+        for name, value in previous.items():
+            setattr(settings, name, value)
@@ -2,45 +2,25 @@
 
 from __future__ import annotations
 
-import json
+import logging
 import subprocess
-import tempfile
 from datetime import date
 from pathlib import Path
-from typing import List
+from typing import Callable, Optional
 
 from faster_whisper import WhisperModel
+from faster_whisper.utils import download_model
 
 from config import settings
+from opennote.adapters.segments import SegmentArray
 from opennote.adapters.types import IngestResult
+from opennote.engine.fingerprint import Fingerprint, fingerprint_file, get_fingerprint_index
+from opennote.engine.jobs import Job, job_stages, open_job
+from opennote.engine.probe_cache import is_whisper_ready, probe_media
+from opennote.engine.recordings import Resume, get_recordings
+from opennote.registry import SUPPORTED_AUDIO_EXTENSIONS, SUPPORTED_VIDEO_EXTENSIONS
 
-SUPPORTED_AUDIO_EXTENSIONS = {".wav", ".mp3", ".m4a", ".aac", ".flac", ".ogg"}
-SUPPORTED_VIDEO_EXTENSIONS = {".mp4", ".mkv", ".webm", ".mov", ".avi"}
-
-
-def _probe_media(path: Path) -> dict:
-    completed = subprocess.run(
-        [
-            "ffprobe",
-            "-v",
-            "error",
-            "-show_entries",
-            "format=duration:format_tags=title",
-            "-of",
-            "json",
-            str(path),
-        ],
-        capture_output=True,
-        text=True,
-        check=False,
-    )
-    if completed.returncode != 0:
-        raise RuntimeError(
-            f"ffprobe failed: {completed.stderr.strip() or 'unknown error'}"
-        )
-    if not completed.stdout:
-        raise RuntimeError("ffprobe returned no output; ensure ffmpeg is installed.")
-    return json.loads(completed.stdout)
+logger = logging.getLogger(__name__)
 
 
 def _extract_title(path: Path, probe_data: dict) -> str:
@@ -76,8 +56,7 @@ def _extract_audio(input_path: Path, work_dir: Path) -> Path:
     return output_path
 
 
-def _normalize_audio(audio_path: Path) -> Path:
-    output_path = audio_path.with_suffix(".normalized.wav")
+def _normalize_audio(audio_path: Path, output_path: Path) -> Path:
     command = [
         "ffmpeg",
         "-y",
@@ -97,26 +76,145 @@ def _normalize_audio(audio_path: Path) -> Path:
     return output_path
 
 
-def _transcribe_audio(audio_path: Path) -> tuple[str, List[dict]]:
-    model = WhisperModel(settings.WHISPER_MODEL, compute_type=settings.WHISPER_COMPUTE_TYPE)
+def _extract_tail(input_path: Path, start_seconds: float, output_path: Path) -> Path:
+    command = [
+        "ffmpeg",
+        "-y",
+        "-ss",
+        f"{start_seconds:.3f}",
+        "-i",
+        str(input_path),
+        "-vn",
+        "-ac",
+        "1",
+        "-ar",
+        "16000",
+        str(output_path),
+    ]
+    completed = subprocess.run(command, capture_output=True, text=True, check=False)
+    if completed.returncode != 0:
+        raise RuntimeError(
+            f"ffmpeg tail extract failed: {completed.stderr.strip() or 'unknown error'}"
+        )
+    return output_path
+
+
+def _transcribe_audio(
+    audio_path: Path,
+    model_name: str,
+    pause_point: Callable[[], None],
+    on_segments: Callable[[SegmentArray], None],
+    segments: Optional[SegmentArray] = None,
+    offset_seconds: float = 0.0,
+) -> SegmentArray:
+    """Transcribe ``audio_path``, appending to ``segments`` with ``offset_seconds`` added."""
+    model = WhisperModel(model_name, compute_type=settings.WHISPER_COMPUTE_TYPE)
     segments_iter, _info = model.transcribe(str(audio_path))
 
-    segments: List[dict] = []
-    texts: List[str] = []
+    if segments is None:
+        segments = SegmentArray()
+    # faster-whisper decodes one 30 s window per step of this generator.
     for segment in segments_iter:
         segments.append(
-            {
-                "start": float(segment.start),
-                "end": float(segment.end),
-                "text": segment.text.strip(),
-            }
+            float(segment.start) + offset_seconds,
+            float(segment.end) + offset_seconds,
+            segment.text.strip(),
         )
-        texts.append(segment.text.strip())
+        on_segments(segments)
+        pause_point()
+    return segments
+
+
+def fetch_whisper_model(model_name: str) -> None:
+    """Make sure the model files are on disk, so the first job doesn't download them."""
+    if not Path(model_name).is_dir():
+        download_model(model_name)
 
-    return "\n".join(texts).strip(), segments
 
+def _probe_stage(media_path: Path, job: Job) -> dict:
+    return job.json_stage("probe", lambda: probe_media(media_path))
 
-def ingest_media_file(path: str) -> IngestResult:
+
+def probe_duration(media_path: Path, job: Job) -> float:
+    return _extract_duration_seconds(_probe_stage(media_path, job))
+
+
+def _save_transcript(audio_path: Path, path: Path, model_name: str, job: Job) -> SegmentArray:
+    segments = _transcribe_audio(audio_path, model_name, job.pause_point, job.on_segments)
+    segments.save(path)
+    return segments
+
+
+def _save_tail_transcript(
+    media_path: Path, resume: Resume, path: Path, model_name: str, job: Job
+) -> SegmentArray:
+    tail_path = _extract_tail(media_path, resume.resume_seconds, job.artifact("tail.16k.wav"))
+    try:
+        segments = _transcribe_audio(
+            tail_path,
+            model_name,
+            job.pause_point,
+            job.on_segments,
+            segments=resume.segments,
+            offset_seconds=resume.resume_seconds,
+        )
+    finally:
+        tail_path.unlink(missing_ok=True)
+    segments.save(path)
+    return segments
+
+
+def _shift_segments(offset_seconds: float, duration_seconds: float) -> Callable[[Path, Path], None]:
+    def convert(source: Path, target: Path) -> None:
+        shifted = SegmentArray()
+        for segment in SegmentArray.load(source):
+            start = float(segment["start"]) + offset_seconds
+            end = float(segment["end"]) + offset_seconds
+            # Speech from the part of the other recording that this one doesn't have.
+            if end <= 0 or start >= duration_seconds:
+                continue
+            shifted.append(max(0.0, start), min(end, duration_seconds), str(segment["text"]))
+        shifted.save(target)
+
+    return convert
+
+
+def _adopt_duplicate(audio_path: Path, job: Job, duration_seconds: float) -> Optional[Fingerprint]:
+    """Take over the transcript and summaries of an earlier job with the same audio.
+
+    Returns the fingerprint to index once this job is transcribed, or None
+    if a duplicate was adopted.
+    """
+    fingerprint = fingerprint_file(audio_path)
+    index = get_fingerprint_index()
+    for match in index.matches(fingerprint, settings.FINGERPRINT_MIN_SCORE):
+        if match.job_key == job.key:
+            continue
+        stages = job_stages(match.job_key)
+        if "transcript" not in stages:
+            # Job directory collected; its fingerprint is of no use any more.
+            index.forget(match.job_key)
+            continue
+        convert = _shift_segments(match.offset_seconds, duration_seconds)
+        info = {"offset_seconds": round(match.offset_seconds, 3), "score": round(match.score, 3)}
+        if not job.adopt(match.job_key, "transcript", convert, **info):
+            continue
+        # Summaries don't contain timestamps, so they carry over as they are.
+        for stage in stages:
+            if stage.startswith("summary-"):
+                job.adopt(match.job_key, stage)
+        logger.info(
+            "Reusing transcript of %s for %s (score %.2f, offset %+.2fs)",
+            match.source,
+            audio_path.name,
+            match.score,
+            match.offset_seconds,
+        )
+        return None
+    return fingerprint
+
+
+def ingest_media_file(path: str, job: Optional[Job] = None) -> IngestResult:
     media_path = Path(path).expanduser().resolve()
     if not media_path.exists():
         raise FileNotFoundError(f"Media not found at {media_path}")
@@ -125,21 +223,38 @@ def ingest_media_file(path: str) -> IngestResult:
     if suffix not in SUPPORTED_AUDIO_EXTENSIONS | SUPPORTED_VIDEO_EXTENSIONS:
         raise ValueError(f"Unsupported media format: {suffix}")
 
-    probe_data = _probe_media(media_path)
+    if job is None:
+        with open_job(str(media_path)) as owned_job:
+            return ingest_media_file(str(media_path), owned_job)
+
+    probe_data = _probe_stage(media_path, job)
     duration_seconds = _extract_duration_seconds(probe_data)
     if duration_seconds > settings.MAX_MEDIA_LENGTH_SECONDS:
         raise ValueError("Media exceeds max length configured in settings.")
 
     title = _extract_title(media_path, probe_data)
     source_type = "audio"
+    model_name = job.whisper_model or settings.WHISPER_MODEL
 
-    with tempfile.TemporaryDirectory(prefix="opennote_") as work_dir_name:
-        work_dir = Path(work_dir_name)
-        audio_path = media_path
-        if suffix in SUPPORTED_VIDEO_EXTENSIONS:
-            audio_path = _extract_audio(media_path, work_dir)
-        normalized_audio = _normalize_audio(audio_path)
-        raw_text, segments = _transcribe_audio(normalized_audio)
+    # Finished files are transcribed once; only a file that may still grow is followed.
+    follow = settings.ENABLE_INCREMENTAL_INGEST and get_recordings().follows(media_path)
+    resume: Optional[Resume] = None
+    if follow and not job.done("transcript"):
+        resume = get_recordings().resume(media_path)
+    if resume is not None:
+        logger.info(
+            "Continuing the transcript of %s from %.1fs", media_path.name, resume.resume_seconds
+        )
+        segments = job.run_stage(
+            "transcript",
+            "segments.transcript.bin",
+            lambda path: _save_tail_transcript(media_path, resume, path, model_name, job),
+            SegmentArray.load,
+        )
+    else:
+        segments = _transcribe_file(media_path, probe_data, duration_seconds, model_name, job)
+    if follow:
+        get_recordings().record(media_path, segments, job.key, resumed=resume is not None)
 
     metadata = {
         "title": title,
@@ -148,4 +263,39 @@ def ingest_media_file(path: str) -> IngestResult:
         "source_type": source_type,
         "date": date.today().isoformat(),
     }
-    return IngestResult(raw_text=raw_text, segments=segments, metadata=metadata)
+    return IngestResult(segments=segments, metadata=metadata)
+
+
+def _transcribe_file(
+    media_path: Path, probe_data: dict, duration_seconds: float, model_name: str, job: Job
+) -> SegmentArray:
+    suffix = media_path.suffix.lower()
+
+    def decode(output_path: Path) -> Path:
+        if suffix not in SUPPORTED_VIDEO_EXTENSIONS:
+            return _normalize_audio(media_path, output_path)
+        extracted = _extract_audio(media_path, job.directory)
+        try:
+            return _normalize_audio(extracted, output_path)
+        finally:
+            extracted.unlink(missing_ok=True)
+
+    # 16 kHz mono PCM/FLAC is what Whisper decodes to anyway, so it is read as is.
+    audio_path = media_path if is_whisper_ready(probe_data) else job.artifact("audio.16k.wav")
+    if audio_path != media_path and not job.done("transcript"):
+        job.run_stage("audio", audio_path.name, decode, lambda path: path)
+    fingerprint: Optional[Fingerprint] = None
+    if settings.ENABLE_FINGERPRINT_DEDUP and not job.done("transcript"):
+        fingerprint = _adopt_duplicate(audio_path, job, duration_seconds)
+    segments = job.run_stage(
+        "transcript",
+        "segments.transcript.bin",
+        lambda path: _save_transcript(audio_path, path, model_name, job),
+        SegmentArray.load,
+    )
+    # Indexed only once transcribed, so every match has a transcript to reuse.
+    if fingerprint is not None and not job.private:
+        get_fingerprint_index().add(job.key, str(media_path), fingerprint)
+    # The decoded audio is only kept so an interrupted transcription can restart.
+    job.discard("audio.16k.wav")
+    return segments
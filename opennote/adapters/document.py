@@ -4,12 +4,14 @@ from __future__ import annotations
 
 from datetime import date
 from pathlib import Path
+from typing import Optional
 
 from pypdf import PdfReader
 
+from opennote.adapters.segments import SegmentArray
 from opennote.adapters.types import IngestResult
-
-SUPPORTED_DOCUMENT_EXTENSIONS = {".pdf", ".txt", ".md"}
+from opennote.engine.jobs import Job
+from opennote.registry import SUPPORTED_DOCUMENT_EXTENSIONS
 
 
 def _read_pdf(path: Path) -> str:
@@ -21,7 +23,7 @@ def _read_pdf(path: Path) -> str:
     return "\n".join(pages).strip()
 
 
-def ingest_document(path: str) -> IngestResult:
+def ingest_document(path: str, job: Optional[Job] = None) -> IngestResult:
     doc_path = Path(path).expanduser().resolve()
     if not doc_path.exists():
         raise FileNotFoundError(f"Document not found at {doc_path}")
@@ -30,6 +32,8 @@ def ingest_document(path: str) -> IngestResult:
     if suffix not in SUPPORTED_DOCUMENT_EXTENSIONS:
         raise ValueError(f"Unsupported document format: {suffix}")
 
+    # Documents have no intermediate stages worth keeping; ``job`` is accepted
+    # so every adapter can be called the same way.
     if suffix == ".pdf":
         raw_text = _read_pdf(doc_path)
     else:
@@ -42,4 +46,4 @@ def ingest_document(path: str) -> IngestResult:
         "source_type": "document",
         "date": date.today().isoformat(),
     }
-    return IngestResult(raw_text=raw_text, segments=[], metadata=metadata)
+    return IngestResult(raw_text=raw_text, segments=SegmentArray(), metadata=metadata)
@@ -0,0 +1,362 @@
+"""Direct HTTP media ingestion, transcribing while the download is in flight."""
+
+from __future__ import annotations
+
+import json
+import logging
+import re
+import subprocess
+import threading
+from datetime import date
+from pathlib import Path, PurePosixPath
+from typing import BinaryIO, Callable, Iterator, List, Optional, Tuple
+from urllib.parse import unquote, urlparse
+
+import numpy as np
+import requests
+from faster_whisper import WhisperModel
+
+from config import settings
+from opennote.adapters.segments import SegmentArray
+from opennote.adapters.types import IngestResult
+from opennote.engine.jobs import Job, open_job
+from opennote.output.vault_index import atomic_open
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_RATE = 16000
+_BYTES_PER_SAMPLE = 2
+_READ_SIZE = 64 * 1024
+_DURATION_HEADERS = ("X-Content-Duration", "Content-Duration")
+_FFMPEG_DURATION = re.compile(r"Duration: (\d+):(\d{2}):(\d{2}(?:\.\d+)?)")
+_FFMPEG_TITLE = re.compile(r"^\s+title\s*:\s*(.+)$", re.M)
+_RESUMABLE_ERRORS = (
+    requests.ConnectionError,
+    requests.Timeout,
+    requests.exceptions.ChunkedEncodingError,
+)
+
+
+class MediaTooLongError(ValueError):
+    pass
+
+
+class _NotStreamableError(RuntimeError):
+    """ffmpeg decoded nothing from the piped body, e.g. an MP4 whose index is at the end."""
+
+
+def _check_duration(seconds: Optional[float]) -> None:
+    if seconds is not None and seconds > settings.MAX_MEDIA_LENGTH_SECONDS:
+        raise MediaTooLongError("Media exceeds max length configured in settings.")
+
+
+def _header_duration(headers: requests.structures.CaseInsensitiveDict) -> Optional[float]:
+    for name in _DURATION_HEADERS:
+        value = headers.get(name)
+        if value:
+            try:
+                return float(value)
+            except ValueError:
+                continue
+    return None
+
+
+def stream_body(
+    url: str,
+    sink: BinaryIO,
+    stop: threading.Event,
+    on_headers: Callable[[requests.structures.CaseInsensitiveDict], None] = lambda _h: None,
+    retries: int = 3,
+    timeout: float = 30,
+) -> int:
+    """Copy the body of ``url`` into ``sink``; returns the number of bytes written.
+
+    If the connection drops and the server advertised ``Accept-Ranges: bytes``,
+    the request is reissued with a ``Range`` header from the last byte written,
+    up to ``retries`` times. Otherwise the error propagates.
+    """
+    received = 0
+    failures = 0
+    resumable = False
+    total: Optional[int] = None
+    with requests.Session() as session:
+        while not stop.is_set():
+            headers = {"Range": f"bytes={received}-"} if received else {}
+            try:
+                with session.get(url, headers=headers, stream=True, timeout=timeout) as response:
+                    response.raise_for_status()
+                    if received and response.status_code != 206:
+                        raise RuntimeError("Server ignored the range request; cannot resume.")
+                    if not received:
+                        on_headers(response.headers)
+                        resumable = response.headers.get("Accept-Ranges", "").lower() == "bytes"
+                        length = response.headers.get("Content-Length")
+                        total = int(length) if length and length.isdigit() else None
+                    for chunk in response.iter_content(_READ_SIZE):
+                        if stop.is_set():
+                            return received
+                        sink.write(chunk)
+                        received += len(chunk)
+                if total is None or received >= total:
+                    return received
+                raise requests.ConnectionError(f"Body ended at {received} of {total} bytes")
+            except _RESUMABLE_ERRORS as exc:
+                failures += 1
+                if not received or not resumable or failures > retries:
+                    raise
+                logger.warning(
+                    "Stream from %s dropped at %d bytes (%s); resuming", url, received, exc
+                )
+    return received
+
+
+def _quietest_split(samples: np.ndarray, search_seconds: float = 2.0) -> int:
+    """Index in the tail of ``samples`` with the least energy, so windows don't cut words."""
+    frame = SAMPLE_RATE // 10
+    search = min(len(samples), int(search_seconds * SAMPLE_RATE)) // frame * frame
+    if search < frame:
+        return len(samples)
+    tail = samples[len(samples) - search :].reshape(-1, frame)
+    quietest = int(np.argmin(np.square(tail).mean(axis=1)))
+    return len(samples) - search + quietest * frame + frame // 2
+
+
+def iter_windows(pcm: BinaryIO, window_seconds: float) -> Iterator[Tuple[float, np.ndarray]]:
+    """Yield (offset_seconds, float32 samples) windows read from 16 kHz mono s16le PCM."""
+    window = int(window_seconds * SAMPLE_RATE)
+    pending = np.empty(0, dtype=np.float32)
+    offset = 0
+    carry = b""
+    while True:
+        data = pcm.read(_READ_SIZE)
+        if data:
+            data = carry + data
+            usable = len(data) - len(data) % _BYTES_PER_SAMPLE
+            carry = data[usable:]
+            samples = np.frombuffer(data[:usable], dtype="<i2").astype(np.float32) / 32768.0
+            pending = np.concatenate([pending, samples])
+        while len(pending) >= window or (not data and len(pending)):
+            cut = _quietest_split(pending[:window]) if len(pending) >= window else len(pending)
+            yield offset / SAMPLE_RATE, pending[:cut]
+            offset += cut
+            pending = pending[cut:]
+        if not data:
+            return
+
+
+def _decoder(source: str = "pipe:0") -> subprocess.Popen:
+    return subprocess.Popen(
+        [
+            "ffmpeg",
+            "-hide_banner",
+            "-i",
+            source,
+            "-vn",
+            "-f",
+            "s16le",
+            "-acodec",
+            "pcm_s16le",
+            "-ac",
+            "1",
+            "-ar",
+            str(SAMPLE_RATE),
+            "pipe:1",
+        ],
+        stdin=subprocess.PIPE if source == "pipe:0" else subprocess.DEVNULL,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+    )
+
+
+class _StreamProbe:
+    """Watches ffmpeg's stderr for the container duration and title."""
+
+    def __init__(self, stderr: BinaryIO, on_duration: Callable[[float], None]) -> None:
+        self.title: Optional[str] = None
+        self.duration: Optional[float] = None
+        self.log: List[str] = []
+        self._on_duration = on_duration
+        self._thread = threading.Thread(target=self._read, args=(stderr,), daemon=True)
+        self._thread.start()
+
+    def _read(self, stderr: BinaryIO) -> None:
+        for raw in stderr:
+            line = raw.decode("utf-8", "replace")
+            self.log.append(line)
+            if self.title is None:
+                match = _FFMPEG_TITLE.match(line)
+                if match:
+                    self.title = match.group(1).strip()
+            if self.duration is None:
+                match = _FFMPEG_DURATION.search(line)
+                if match:
+                    hours, minutes, seconds = match.groups()
+                    self.duration = int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+                    self._on_duration(self.duration)
+
+    def join(self) -> None:
+        self._thread.join(timeout=5)
+
+    def error(self) -> str:
+        return "".join(self.log[-5:]).strip() or "unknown error"
+
+
+def _transcribe_stream(
+    url: str,
+    model_name: str,
+    on_segments: Callable[[SegmentArray], None],
+    local_path: Optional[Path] = None,
+) -> Tuple[SegmentArray, Optional[float], Optional[str]]:
+    """Transcribe ``url`` as ffmpeg decodes it from the response body.
+
+    With ``local_path`` (the body, already downloaded) ffmpeg reads the file
+    instead, so containers that need seeking can be decoded.
+    """
+    stop = threading.Event()
+    failure: List[BaseException] = []
+    header_duration: List[Optional[float]] = [None]
+    decoder = _decoder("pipe:0" if local_path is None else str(local_path))
+
+    def abort(exc: BaseException) -> None:
+        failure.append(exc)
+        stop.set()
+        decoder.kill()
+
+    def on_headers(headers: requests.structures.CaseInsensitiveDict) -> None:
+        header_duration[0] = _header_duration(headers)
+        try:
+            _check_duration(header_duration[0])
+        except MediaTooLongError as exc:
+            abort(exc)
+
+    def on_probe_duration(seconds: float) -> None:
+        try:
+            _check_duration(seconds)
+        except MediaTooLongError as exc:
+            abort(exc)
+
+    def feed() -> None:
+        try:
+            stream_body(
+                url,
+                decoder.stdin,
+                stop,
+                on_headers,
+                retries=settings.HTTP_MEDIA_RETRIES,
+                timeout=settings.HTTP_MEDIA_TIMEOUT_SECONDS,
+            )
+        except BrokenPipeError:
+            pass
+        except BaseException as exc:
+            abort(exc)
+        finally:
+            try:
+                decoder.stdin.close()
+            except OSError:
+                pass
+
+    probe = _StreamProbe(decoder.stderr, on_probe_duration)
+    feeder = None
+    if local_path is None:
+        feeder = threading.Thread(target=feed, name="http-media-feed", daemon=True)
+        feeder.start()
+
+    model = WhisperModel(model_name, compute_type=settings.WHISPER_COMPUTE_TYPE)
+    segments = SegmentArray()
+    decoded = False
+    try:
+        for offset, samples in iter_windows(decoder.stdout, settings.HTTP_MEDIA_WINDOW_SECONDS):
+            decoded = True
+            # Servers that send neither a duration header nor a container duration
+            # (live streams, raw ADTS) are cut off once they reach the limit.
+            _check_duration(offset)
+            window_segments, _info = model.transcribe(samples)
+            for segment in window_segments:
+                segments.append(
+                    offset + float(segment.start), offset + float(segment.end), segment.text.strip()
+                )
+            on_segments(segments)
+    except BaseException:
+        stop.set()
+        decoder.kill()
+        raise
+    finally:
+        if feeder is not None:
+            feeder.join()
+        decoder.wait()
+        probe.join()
+
+    if failure:
+        raise failure[0]
+    if decoder.returncode != 0:
+        if not decoded and local_path is None:
+            raise _NotStreamableError(probe.error())
+        raise RuntimeError(f"ffmpeg decode failed: {probe.error()}")
+    duration = header_duration[0] or probe.duration
+    if duration is None and len(segments):
+        duration = float(segments.ends[-1])
+    return segments, duration, probe.title
+
+
+def _download(url: str, path: Path) -> None:
+    def on_headers(headers: requests.structures.CaseInsensitiveDict) -> None:
+        _check_duration(_header_duration(headers))
+
+    with path.open("wb") as handle:
+        stream_body(
+            url,
+            handle,
+            threading.Event(),
+            on_headers,
+            retries=settings.HTTP_MEDIA_RETRIES,
+            timeout=settings.HTTP_MEDIA_TIMEOUT_SECONDS,
+        )
+
+
+def _transcribe_url(
+    url: str, model_name: str, on_segments: Callable[[SegmentArray], None], download_path: Path
+) -> Tuple[SegmentArray, Optional[float], Optional[str]]:
+    try:
+        return _transcribe_stream(url, model_name, on_segments)
+    except _NotStreamableError as exc:
+        logger.info("Cannot decode %s while streaming (%s); downloading it first", url, exc)
+    try:
+        _download(url, download_path)
+        return _transcribe_stream(url, model_name, on_segments, local_path=download_path)
+    finally:
+        download_path.unlink(missing_ok=True)
+
+
+def ingest_http_media(url: str, job: Optional[Job] = None) -> IngestResult:
+    if job is None:
+        with open_job(url) as owned_job:
+            return ingest_http_media(url, owned_job)
+
+    segments_path = job.artifact("segments.transcript.bin")
+    info_path = job.artifact("stream.json")
+    if job.done("transcript"):
+        segments = SegmentArray.load(segments_path)
+        with info_path.open("r", encoding="utf-8") as handle:
+            stream_info = json.load(handle)
+    else:
+        segments, duration, title = _transcribe_url(
+            url,
+            job.whisper_model or settings.WHISPER_MODEL,
+            job.on_segments,
+            job.artifact("download" + PurePosixPath(urlparse(url).path).suffix),
+        )
+        segments.save(segments_path)
+        stream_info = {"duration_seconds": duration, "title": title}
+        with atomic_open(info_path) as handle:
+            json.dump(stream_info, handle, ensure_ascii=False)
+        job.complete("transcript", segments_path.name, info_path.name)
+
+    fallback_title = unquote(PurePosixPath(urlparse(url).path).stem) or "Untitled"
+    metadata = {
+        "title": stream_info.get("title") or fallback_title,
+        "source_url": url,
+        "duration_seconds": stream_info.get("duration_seconds"),
+        "source_type": "http",
+        "date": date.today().isoformat(),
+    }
+    return IngestResult(segments=segments, metadata=metadata)
@@ -0,0 +1,173 @@
+"""Array-backed transcript segment storage."""
+
+from __future__ import annotations
+
+import json
+import mmap
+import struct
+from pathlib import Path
+from typing import BinaryIO, Dict, Iterable, Iterator, List, Optional, TextIO
+
+import numpy as np
+
+_MAGIC = b"ONSEG001"
+_HEADER = struct.Struct("<8sQQ")
+
+
+class SegmentArray:
+    """Segments as parallel start/end arrays plus one packed UTF-8 text buffer.
+
+    Iterating yields the same ``{"start", "end", "text"}`` dicts the adapters
+    used to build, so existing consumers keep working. Instances loaded with
+    :meth:`load` are backed by a read-only memory map until appended to.
+    """
+
+    def __init__(self, capacity: int = 64) -> None:
+        self._count = 0
+        self._starts = np.empty(capacity, dtype=np.float64)
+        self._ends = np.empty(capacity, dtype=np.float64)
+        self._offsets = np.zeros(capacity + 1, dtype=np.int64)
+        self._text: bytearray | mmap.mmap = bytearray()
+        self._text_base = 0
+        self._mmap: Optional[mmap.mmap] = None
+
+    @classmethod
+    def from_dicts(cls, segments: Iterable[Dict[str, float | str]]) -> "SegmentArray":
+        if isinstance(segments, cls):
+            return segments
+        array = cls()
+        for segment in segments:
+            array.append(float(segment["start"]), float(segment["end"]), str(segment["text"]))
+        return array
+
+    @classmethod
+    def load(cls, path: Path) -> "SegmentArray":
+        with path.open("rb") as handle:
+            mapped = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, count, text_length = _HEADER.unpack_from(mapped, 0)
+        if magic != _MAGIC:
+            raise ValueError(f"Not a segment sidecar: {path}")
+
+        offset = _HEADER.size
+        array = cls(capacity=0)
+        array._count = count
+        array._starts = np.frombuffer(mapped, dtype="<f8", count=count, offset=offset)
+        offset += 8 * count
+        array._ends = np.frombuffer(mapped, dtype="<f8", count=count, offset=offset)
+        offset += 8 * count
+        array._offsets = np.frombuffer(mapped, dtype="<i8", count=count + 1, offset=offset)
+        offset += 8 * (count + 1)
+        if offset + text_length > len(mapped):
+            raise ValueError(f"Truncated segment sidecar: {path}")
+        array._text = mapped
+        array._text_base = offset
+        array._mmap = mapped
+        return array
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __iter__(self) -> Iterator[Dict[str, float | str]]:
+        for index in range(self._count):
+            yield self[index]
+
+    def __getitem__(self, index: int) -> Dict[str, float | str]:
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError("segment index out of range")
+        return {
+            "start": float(self._starts[index]),
+            "end": float(self._ends[index]),
+            "text": self.text(index),
+        }
+
+    @property
+    def starts(self) -> np.ndarray:
+        return self._starts[: self._count]
+
+    @property
+    def ends(self) -> np.ndarray:
+        return self._ends[: self._count]
+
+    def text(self, index: int) -> str:
+        begin = self._text_base + int(self._offsets[index])
+        end = self._text_base + int(self._offsets[index + 1])
+        return bytes(self._text[begin:end]).decode("utf-8")
+
+    def texts(self) -> Iterator[str]:
+        for index in range(self._count):
+            yield self.text(index)
+
+    def append(self, start: float, end: float, text: str) -> None:
+        if self._mmap is not None:
+            self._detach()
+        if self._count == len(self._starts):
+            self._grow(max(64, 2 * self._count))
+        encoded = text.encode("utf-8")
+        self._text.extend(encoded)
+        self._starts[self._count] = start
+        self._ends[self._count] = end
+        self._offsets[self._count + 1] = self._offsets[self._count] + len(encoded)
+        self._count += 1
+
+    def _grow(self, capacity: int) -> None:
+        self._starts = np.resize(self._starts, capacity)
+        self._ends = np.resize(self._ends, capacity)
+        offsets = np.zeros(capacity + 1, dtype=np.int64)
+        offsets[: self._count + 1] = self._offsets[: self._count + 1]
+        self._offsets = offsets
+
+    def _detach(self) -> None:
+        count = self._count
+        begin = self._text_base
+        end = begin + int(self._offsets[count])
+        self._text = bytearray(self._text[begin:end])
+        self._starts = np.array(self._starts, dtype=np.float64)
+        self._ends = np.array(self._ends, dtype=np.float64)
+        self._offsets = np.array(self._offsets, dtype=np.int64)
+        self._text_base = 0
+        self._mmap = None
+
+    def index_at(self, seconds: float) -> int:
+        return max(0, int(np.searchsorted(self.starts, seconds, side="right")) - 1)
+
+    def find(self, needle: str) -> List[int]:
+        encoded = needle.encode("utf-8")
+        if not encoded:
+            return []
+        begin = self._text_base
+        end = begin + int(self._offsets[self._count])
+        positions = []
+        position = self._text.find(encoded, begin, end)
+        while position != -1:
+            positions.append(position - begin)
+            position = self._text.find(encoded, position + 1, end)
+        if not positions:
+            return []
+        indices = np.searchsorted(self._offsets[1 : self._count + 1], positions, side="right")
+        return sorted(set(int(index) for index in indices))
+
+    def save(self, path: Path) -> None:
+        with path.open("wb") as handle:
+            self.write(handle)
+
+    def write(self, handle: BinaryIO) -> None:
+        count = self._count
+        begin = self._text_base
+        text_length = int(self._offsets[count])
+        handle.write(_HEADER.pack(_MAGIC, count, text_length))
+        handle.write(self.starts.astype("<f8").tobytes())
+        handle.write(self.ends.astype("<f8").tobytes())
+        handle.write(self._offsets[: count + 1].astype("<i8").tobytes())
+        handle.write(bytes(self._text[begin : begin + text_length]))
+
+
+def write_segments_json(segments: Iterable[Dict[str, float | str]], handle: TextIO) -> None:
+    handle.write("[")
+    separator = "\n"
+    for segment in segments:
+        handle.write(separator)
+        json.dump(segment, handle, ensure_ascii=False)
+        separator = ",\n"
+    handle.write("]\n" if separator == "\n" else "\n]\n")
@@ -2,12 +2,39 @@
 
 from __future__ import annotations
 
-from dataclasses import dataclass
-from typing import Dict, List
+from typing import Any, Dict, Optional
+
+from opennote.adapters.segments import SegmentArray
 
 
-@dataclass(frozen=True)
 class IngestResult:
-    raw_text: str
-    segments: List[Dict[str, float | str]]
-    metadata: Dict[str, str | float | None]
+    """What an adapter produced: timed segments, plain text and source metadata.
+
+    For transcribed media the segments are the only copy of the text;
+    ``raw_text`` is joined from them on first access and cached, so code that
+    only streams the segments (rendering, writing, compaction) never holds the
+    transcript twice. Sources without timing, such as documents, pass
+    ``raw_text`` and an empty ``SegmentArray``.
+    """
+
+    __slots__ = ("segments", "metadata", "_raw_text")
+
+    def __init__(
+        self,
+        segments: SegmentArray,
+        metadata: Dict[str, str | float | None],
+        raw_text: Optional[str] = None,
+    ) -> None:
+        self.segments = segments
+        self.metadata = metadata
+        self._raw_text = raw_text
+
+    @property
+    def raw_text(self) -> str:
+        if self._raw_text is None:
+            self._raw_text = "\n".join(self.segments.texts()).strip()
+        return self._raw_text
+
+    def with_metadata(self, **changes: Any) -> "IngestResult":
+        """A copy with updated metadata that shares the segments and text."""
+        return IngestResult(self.segments, {**self.metadata, **changes}, self._raw_text)
@@ -4,13 +4,14 @@ from __future__ import annotations
 
 import time
 from pathlib import Path
-from typing import Iterable
+from typing import Iterable, Optional
 
 from config import settings
 from datetime import date
 
 from opennote.adapters.audio import ingest_media_file
 from opennote.adapters.types import IngestResult
+from opennote.engine.jobs import Job
 
 SUPPORTED_EXTENSIONS = {
     ".wav",
@@ -54,15 +55,11 @@ def _supported_extensions() -> Iterable[str]:
     return SUPPORTED_EXTENSIONS
 
 
-def ingest_youtube(url: str) -> IngestResult:
+def ingest_youtube(url: str, job: Optional[Job] = None) -> IngestResult:
     media_path = _poll_for_download(url, settings.EXTERNAL_DOWNLOAD_DIR)
-    ingest_result = ingest_media_file(str(media_path))
-    metadata = dict(ingest_result.metadata)
-    metadata["source_type"] = "youtube"
-    metadata["source_url"] = url
-    metadata["date"] = metadata.get("date") or date.today().isoformat()
-    return IngestResult(
-        raw_text=ingest_result.raw_text,
-        segments=ingest_result.segments,
-        metadata=metadata,
+    ingest_result = ingest_media_file(str(media_path), job)
+    return ingest_result.with_metadata(
+        source_type="youtube",
+        source_url=url,
+        date=ingest_result.metadata.get("date") or date.today().isoformat(),
     )
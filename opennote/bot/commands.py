@@ -3,102 +3,471 @@
 from __future__ import annotations
 
 import asyncio
+import json
 import logging
+import threading
+from dataclasses import asdict
+from functools import partial
 from pathlib import Path
-from typing import Callable, Optional
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
 
 from telegram import Update
 from telegram.ext import ContextTypes
 
 from config import settings
-from opennote.adapters import audio as audio_adapter
-from opennote.adapters import document as document_adapter
-from opennote.adapters import youtube as youtube_adapter
-from opennote.engine.format import build_markdown, build_transcript_text
-from opennote.engine.summarize import SummaryContent, summarize_text
-from opennote.output.writer import write_outputs
+from opennote import registry
+from opennote.adapters.types import IngestResult
+from opennote.engine.admission import Demand, Ticket, get_admission
+from opennote.engine.jobs import Job, collect_configured_garbage, open_job
+from opennote.engine.metrics import JobMetrics
+from opennote.engine.recordings import get_recordings
+from opennote.engine.scheduler import Lease, get_scheduler
+from opennote.output.vault_index import atomic_open
+
+if TYPE_CHECKING:
+    from opennote.adapters.segments import SegmentArray
+    from opennote.engine.compact import CompactionResult, Compactor
+    from opennote.engine.summarize import MapStream, SummaryContent, TextSource
+    from opennote.output.writer import OutputPaths
 
 logger = logging.getLogger(__name__)
 
+_last_jobs_lock = threading.Lock()
+
+_STATUS_BY_KIND = {
+    "audio": "Transcribing media...",
+    "document": "Extracting document text...",
+    "http": "Streaming and transcribing media...",
+    "youtube": "Downloading/locating YouTube media...",
+}
+
+
+def _record_compaction(
+    metrics: JobMetrics, segments_before: int, compaction: CompactionResult
+) -> None:
+    metrics.record("segments_before_compaction", segments_before)
+    metrics.record("segments_after_compaction", len(compaction.segments))
+    metrics.record("tokens_before_compaction", compaction.tokens_before)
+    metrics.record("tokens_after_compaction", compaction.tokens_after)
+    metrics.record("compaction_reduction", compaction.reduction)
+
+
+def _summary_source(ingest_result: IngestResult, metrics: JobMetrics) -> TextSource:
+    if not ingest_result.segments:
+        return ingest_result.raw_text
+    if not settings.ENABLE_COMPACTION:
+        return ingest_result.segments
+    compaction = registry.engine("compact").compact_segments(
+        ingest_result.segments,
+        min_words=settings.COMPACT_MIN_WORDS,
+        max_gap_seconds=settings.COMPACT_MAX_GAP_SECONDS,
+    )
+    _record_compaction(metrics, len(ingest_result.segments), compaction)
+    return compaction.segments
+
+
+class _SegmentFeed:
+    """Passes transcript segments to a MapStream while Whisper is still producing them.
+
+    Installed as ``job.on_segments``. Segments are compacted on the way, so
+    the stream sees the same lines ``_summary_source`` would produce from
+    the finished transcript.
+    """
+
+    def __init__(self, stream: MapStream, metrics: JobMetrics) -> None:
+        self.stream = stream
+        self.metrics = metrics
+        self._fed = 0
+        self._compactor: Optional[Compactor] = None
+        if settings.ENABLE_COMPACTION:
+            self._compactor = registry.engine("compact").Compactor(
+                min_words=settings.COMPACT_MIN_WORDS,
+                max_gap_seconds=settings.COMPACT_MAX_GAP_SECONDS,
+            )
+
+    def __call__(self, segments: SegmentArray) -> None:
+        for index in range(self._fed, len(segments)):
+            text = segments.text(index)
+            if self._compactor is not None:
+                text = self._compactor.add(
+                    float(segments.starts[index]), float(segments.ends[index]), text
+                )
+            if text is not None:
+                self.stream.feed(text)
+        self._fed = len(segments)
+
+    def summarize(self, ingest_result: IngestResult, mode: str) -> SummaryContent:
+        # A transcript loaded from an earlier run never went through the callback.
+        self(ingest_result.segments)
+        if self._compactor is not None:
+            last = self._compactor.finish()
+            if last is not None:
+                self.stream.feed(last)
+            _record_compaction(self.metrics, self._fed, self._compactor.result())
+        title = ingest_result.metadata.get("title", "Untitled")
+        return self.stream.summarize(title, mode)
+
+
+def _recording(kind: str, input_value: str) -> Optional[Path]:
+    """The local media file, for incremental ingestion in case it is still being written."""
+    if kind != "audio" or not settings.ENABLE_INCREMENTAL_INGEST:
+        return None
+    path = Path(input_value).expanduser().resolve()
+    return path if get_recordings().follows(path) else None
+
+
+def _checkpoint_dir(recording: Optional[Path]) -> Optional[Path]:
+    return get_recordings().directory(recording) if recording is not None else None
+
+
+def _segment_feed(
+    kind: str,
+    mode: str,
+    fast: bool,
+    job: Job,
+    metrics: JobMetrics,
+    recording: Optional[Path] = None,
+) -> Optional[_SegmentFeed]:
+    """A feed that summarizes during transcription, for jobs that will summarize media."""
+    if not settings.ENABLE_STREAMING_SUMMARY or not settings.ENABLE_SUMMARY:
+        return None
+    if fast or mode == "transcript" or kind == "document":
+        return None
+    # Extractive pre-selection ranks sentences across the whole text.
+    if settings.EXTRACTIVE_KEEP_RATIO < 1.0:
+        return None
+    if job.done("ingest") or job.done(f"summary-{mode}"):
+        return None
+    stream = registry.engine("summarize").MapStream(job.key, metrics, _checkpoint_dir(recording))
+    return _SegmentFeed(stream, metrics)
+
+
+def _admission_demand(kind: str, input_value: str, job: Job) -> Optional[Demand]:
+    if not settings.ENABLE_ADMISSION_CONTROL or job.done("ingest"):
+        return None
+    if kind == "document":
+        path = Path(input_value).expanduser()
+        size = path.stat().st_size if path.is_file() else 0
+        return Demand("document", document_bytes=size, document_suffix=path.suffix.lower())
+
+    duration = None
+    if kind == "audio":
+        media_path = Path(input_value).expanduser().resolve()
+        try:
+            duration = registry.adapter_module("audio").probe_duration(media_path, job)
+        except Exception:
+            # The adapter reports probe failures properly; budget for the maximum here.
+            logger.debug("Probe for admission failed for %s", input_value, exc_info=True)
+    return Demand("media", duration_seconds=duration)
+
+
+def _summarize(
+    job: Job,
+    ingest_result: IngestResult,
+    mode: str,
+    fast: bool,
+    metrics: JobMetrics,
+    feed: Optional[_SegmentFeed] = None,
+    recording: Optional[Path] = None,
+) -> SummaryContent:
+    summarize = registry.engine("summarize")
 
-def _is_url(value: str) -> bool:
-    return value.startswith("http://") or value.startswith("https://")
+    def produce() -> dict:
+        if feed is not None:
+            return asdict(feed.summarize(ingest_result, mode))
+        summary_source = _summary_source(ingest_result, metrics)
+        if fast:
+            return asdict(summarize.summarize_extractive(summary_source))
+        title = ingest_result.metadata.get("title", "Untitled")
+        return asdict(
+            summarize.summarize_text(
+                summary_source, title, mode, metrics, _checkpoint_dir(recording)
+            )
+        )
+
+    stage = f"summary-{mode}-fast" if fast else f"summary-{mode}"
+    return summarize.SummaryContent(**job.json_stage(stage, produce))
+
+
+def _outputs_stage(mode: str, fast: bool) -> str:
+    return f"outputs-{mode}-fast" if fast else f"outputs-{mode}"
+
+
+def _saved_outputs(job: Job, mode: str, fast: bool) -> Optional[Tuple[OutputPaths, bool]]:
+    """The vault files an earlier run of ``job`` wrote, and whether that run finished."""
+    entry = job.manifest["stages"].get(_outputs_stage(mode, fast))
+    if entry is None:
+        return None
+    outputs = registry.engine("writer").OutputPaths.from_dict(entry["outputs"])
+    if not outputs.transcript_path.exists():
+        return None
+    return outputs, entry["finished"]
+
+
+def _saved_lines(outputs: OutputPaths) -> List[str]:
+    lines = [f"Saved transcript: {outputs.transcript_path}"]
+    if outputs.markdown_path:
+        lines.append(f"Saved note: {outputs.markdown_path}")
+    return lines
+
+
+def _write_outputs(
+    job: Job,
+    ingest_result: IngestResult,
+    mode: str,
+    fast: bool,
+    summary_content: Optional[SummaryContent],
+    recording: Optional[Path],
+    finished: bool,
+) -> OutputPaths:
+    """Write the job's vault files and record them in the job's manifest.
+
+    A rerun of a job that did not finish (its summary failed) overwrites the
+    files of that run rather than adding a second set next to them.
+    """
+    title = ingest_result.metadata.get("title", "Untitled")
+    outputs = None
+    saved = _saved_outputs(job, mode, fast)
+    if saved is not None and not saved[1]:
+        formatter = registry.engine("format")
+        outputs = registry.engine("writer").rewrite_outputs(
+            saved[0],
+            title,
+            ingest_result.segments,
+            partial(formatter.render_outputs, ingest_result, mode, summary_content),
+            formatter.render_manifest(ingest_result, mode, summary_content),
+        )
+    if outputs is None:
+        outputs = _write_new_outputs(job, ingest_result, mode, summary_content, recording)
+    job.complete(_outputs_stage(mode, fast), outputs=outputs.to_dict(), finished=finished)
+    return outputs
 
 
-def _detect_adapter(input_value: str) -> Callable[[str], object]:
-    if _is_url(input_value):
-        return youtube_adapter.ingest_youtube
+def _write_new_outputs(
+    job: Job,
+    ingest_result: IngestResult,
+    mode: str,
+    summary_content: Optional[SummaryContent],
+    recording: Optional[Path],
+) -> OutputPaths:
+    writer = registry.engine("writer")
+    formatter = registry.engine("format")
+    title = ingest_result.metadata.get("title", "Untitled")
+    render = partial(formatter.render_outputs, ingest_result, mode, summary_content)
+    manifest = formatter.render_manifest(ingest_result, mode, summary_content)
+    if recording is None:
+        return writer.write_outputs(title, ingest_result.segments, mode, render, manifest)
 
-    path = Path(input_value).expanduser()
-    suffix = path.suffix.lower()
-    if suffix in document_adapter.SUPPORTED_DOCUMENT_EXTENSIONS:
-        return document_adapter.ingest_document
-    if suffix in audio_adapter.SUPPORTED_AUDIO_EXTENSIONS | audio_adapter.SUPPORTED_VIDEO_EXTENSIONS:
-        return audio_adapter.ingest_media_file
+    # A recording that grew since its last run extends that run's vault files.
+    recordings = get_recordings()
+    previous = recordings.outputs(recording, mode, job.key)
+    if previous is not None:
+        outputs = writer.update_outputs(
+            previous,
+            title,
+            ingest_result.segments,
+            render,
+            formatter.write_transcript,
+            manifest,
+        )
+        if outputs is not None:
+            return outputs
+    outputs = writer.write_outputs(title, ingest_result.segments, mode, render, manifest)
+    recordings.remember_outputs(recording, mode, outputs)
+    return outputs
 
-    raise ValueError(f"Unsupported input type: {suffix or 'unknown'}")
+
+def _last_jobs_path() -> Path:
+    return Path(settings.STATE_DIR).expanduser() / "last_jobs.json"
+
+
+def _load_last_jobs() -> Dict[str, dict]:
+    try:
+        with _last_jobs_path().open("r", encoding="utf-8") as handle:
+            return json.load(handle)
+    except (OSError, ValueError):
+        return {}
+
+
+def _remember_job(chat_id: int, mode: str, input_value: str, fast: bool) -> None:
+    with _last_jobs_lock:
+        jobs = _load_last_jobs()
+        jobs[str(chat_id)] = {"mode": mode, "input": input_value, "fast": fast}
+        path = _last_jobs_path()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with atomic_open(path) as handle:
+            json.dump(jobs, handle)
+
+
+def _recall_job(chat_id: int) -> Optional[dict]:
+    with _last_jobs_lock:
+        return _load_last_jobs().get(str(chat_id))
 
 
 async def _handle_command(update: Update, context: ContextTypes.DEFAULT_TYPE, mode: str) -> None:
     if update.message is None:
         return
-    if not context.args:
+    args = list(context.args or [])
+    fast = mode == "summary" and "--fast" in args
+    if fast:
+        args.remove("--fast")
+    if not args:
         await update.message.reply_text("Provide a file path or YouTube URL.")
         return
 
-    input_value = " ".join(context.args)
+    input_value = " ".join(args)
+    await asyncio.to_thread(_remember_job, update.message.chat_id, mode, input_value, fast)
+    await _run_job(update, mode, input_value, fast)
+
+
+async def _run_job(
+    update: Update, mode: str, input_value: str, fast: bool, retry: bool = False
+) -> None:
+    metrics = JobMetrics(f"{mode} {input_value}")
 
     try:
-        adapter = _detect_adapter(input_value)
+        kind = registry.detect_kind(input_value)
     except ValueError as exc:
         await update.message.reply_text(str(exc))
         return
 
+    lease: Optional[Lease] = None
+    if settings.ENABLE_FAIR_SCHEDULING:
+        lease = await get_scheduler().acquire(update.message.chat_id, update.message.reply_text)
+        metrics.record("scheduling", lease.describe())
     try:
-        if adapter is youtube_adapter.ingest_youtube:
-            await update.message.reply_text("Downloading/locating YouTube media...")
-        elif adapter is document_adapter.ingest_document:
-            await update.message.reply_text("Extracting document text...")
+        job = await asyncio.to_thread(open_job, input_value)
+        if lease is not None:
+            job.pause_point = lease.pause_point
+        try:
+            await _run_stages(update, mode, input_value, fast, kind, job, metrics, lease, retry)
+        finally:
+            job.close()
+    finally:
+        if lease is not None:
+            get_scheduler().release(lease)
+            if lease.pauses:
+                logger.info("Preempted job [%s]: %s", metrics.job, lease.describe())
+    await asyncio.to_thread(collect_configured_garbage)
+
+
+async def _run_stages(
+    update: Update,
+    mode: str,
+    input_value: str,
+    fast: bool,
+    kind: str,
+    job: Job,
+    metrics: JobMetrics,
+    lease: Optional[Lease] = None,
+    retry: bool = False,
+) -> None:
+    if retry:
+        saved = await asyncio.to_thread(_saved_outputs, job, mode, fast)
+        if saved is not None and saved[1]:
+            lines = ["The last run already finished; nothing to retry.", *_saved_lines(saved[0])]
+            await update.message.reply_text("\n".join(lines))
+            return
+
+    ticket: Optional[Ticket] = None
+    feed: Optional[_SegmentFeed] = None
+    recording = _recording(kind, input_value)
+    try:
+        demand = await asyncio.to_thread(_admission_demand, kind, input_value, job)
+        if demand is not None:
+            ticket = await get_admission().admit(demand, update.message.reply_text)
+            metrics.record("admission", ticket.describe())
+            if lease is not None:
+                lease.on_pause = partial(get_admission().suspend, ticket)
+                lease.on_resume = partial(get_admission().resume, ticket)
+            if ticket.action == "downgrade":
+                job.whisper_model = ticket.whisper_model
+                await update.message.reply_text(
+                    f"Low on memory: transcribing with Whisper {ticket.whisper_model} "
+                    f"instead of {settings.WHISPER_MODEL}."
+                )
+
+        if job.done("ingest"):
+            await update.message.reply_text("Reusing the saved transcript from an earlier run...")
         else:
-            await update.message.reply_text("Transcribing media...")
+            await update.message.reply_text(_STATUS_BY_KIND[kind])
 
-        ingest_result = await asyncio.to_thread(adapter, input_value)
+        feed = await asyncio.to_thread(_segment_feed, kind, mode, fast, job, metrics, recording)
+        if feed is not None:
+            job.on_segments = feed
+        with metrics.timed("ingest"):
+            # Resolved per job: the first job of a kind may have to import the adapter.
+            adapter = await asyncio.to_thread(registry.adapter, kind)
+            ingest_result = await asyncio.to_thread(
+                job.ingest_stage, partial(adapter, input_value, job)
+            )
     except Exception as exc:
+        if feed is not None:
+            feed.stream.close()
         logger.exception("Ingestion failed")
         await update.message.reply_text(f"Failed to ingest input: {exc}")
         return
+    finally:
+        if ticket is not None:
+            await get_admission().release(ticket)
 
     summary_content: Optional[SummaryContent] = None
-    if mode != "transcript" and settings.ENABLE_SUMMARY:
-        await update.message.reply_text("Summarizing...")
-        try:
+    summary_failed = False
+    if fast:
+        await update.message.reply_text("Extracting key sentences...")
+        with metrics.timed("summarize"):
             summary_content = await asyncio.to_thread(
-                summarize_text,
-                ingest_result.raw_text,
-                ingest_result.metadata.get("title", "Untitled"),
-                mode,
+                _summarize, job, ingest_result, mode, True, metrics
             )
+    elif mode != "transcript" and settings.ENABLE_SUMMARY:
+        await update.message.reply_text(
+            "Finishing the summary..." if feed is not None else "Summarizing..."
+        )
+        try:
+            with metrics.timed("summarize"):
+                summary_content = await asyncio.to_thread(
+                    _summarize, job, ingest_result, mode, False, metrics, feed, recording
+                )
         except Exception as exc:
+            summary_failed = True
             logger.exception("Summarization failed")
-            await update.message.reply_text(f"Summarization failed: {exc}")
-
-    markdown = build_markdown(ingest_result, mode, summary_content)
-    transcript_text = build_transcript_text(ingest_result)
+            await update.message.reply_text(
+                f"Summarization failed: {exc}\nFinished chunks were saved; send /retry to resume."
+            )
+        finally:
+            if feed is not None:
+                # Unused if the summary came from an earlier stage (e.g. an adopted duplicate).
+                feed.stream.close()
 
     await update.message.reply_text("Writing output files...")
-    outputs = await asyncio.to_thread(
-        write_outputs,
-        ingest_result.metadata.get("title", "Untitled"),
-        transcript_text,
-        ingest_result.segments,
-        markdown,
-        mode,
-    )
+    with metrics.timed("write"):
+        outputs = await asyncio.to_thread(
+            _write_outputs,
+            job,
+            ingest_result,
+            mode,
+            fast,
+            summary_content,
+            recording,
+            not summary_failed,
+        )
 
-    lines = [f"Saved transcript: {outputs.transcript_path}"]
-    if outputs.markdown_path:
-        lines.append(f"Saved note: {outputs.markdown_path}")
-    await update.message.reply_text("\n".join(lines))
+    if settings.ENABLE_EMBEDDINGS:
+        try:
+            await asyncio.to_thread(
+                registry.engine("vector_index").index_transcript,
+                ingest_result.metadata.get("title", "Untitled"),
+                outputs.transcript_path,
+                ingest_result.segments,
+                # Only consulted when there are no segments; don't join a transcript for it.
+                "" if ingest_result.segments else ingest_result.raw_text,
+            )
+        except Exception:
+            logger.exception("Embedding failed")
+
+    logger.info("Job metrics [%s]: %s", metrics.job, metrics.format())
+
+    await update.message.reply_text("\n".join(_saved_lines(outputs)))
 
 
 async def note_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
@@ -119,3 +488,73 @@ async def outline_command(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
 
 async def study_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     await _handle_command(update, context, "study")
+
+
+async def retry_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    if update.message is None:
+        return
+    job = await asyncio.to_thread(_recall_job, update.message.chat_id)
+    if job is None:
+        await update.message.reply_text("Nothing to retry yet.")
+        return
+
+    flag = " --fast" if job["fast"] else ""
+    await update.message.reply_text(f"Retrying /{job['mode']}{flag} {job['input']}")
+    await _run_job(update, job["mode"], job["input"], job["fast"], retry=True)
+
+
+async def search_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    if update.message is None:
+        return
+    if not context.args:
+        await update.message.reply_text("Provide a search query.")
+        return
+
+    query = " ".join(context.args)
+    try:
+        search_index = await asyncio.to_thread(registry.engine("search_index").get_search_index)
+        hits = await asyncio.to_thread(search_index.search, query, settings.SEARCH_RESULT_LIMIT)
+    except Exception as exc:
+        logger.exception("Search failed")
+        await update.message.reply_text(f"Search failed: {exc}")
+        return
+
+    if not hits:
+        await update.message.reply_text(f"No matches for: {query}")
+        return
+
+    format_timestamp = (await asyncio.to_thread(registry.engine, "format")).format_timestamp
+    lines = []
+    for hit in hits:
+        timestamp = f" [{format_timestamp(hit.start_ms / 1000)}]" if hit.start_ms is not None else ""
+        lines.append(f"{hit.title}{timestamp}\n{hit.snippet}")
+    await update.message.reply_text("\n\n".join(lines))
+
+
+async def ask_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    if update.message is None:
+        return
+    if not context.args:
+        await update.message.reply_text("Ask a question about your processed sources.")
+        return
+
+    question = " ".join(context.args)
+    try:
+        retrieval = await asyncio.to_thread(registry.engine, "retrieval")
+        answer = await asyncio.to_thread(retrieval.answer_question, question, settings.ASK_TOP_K)
+    except Exception as exc:
+        logger.exception("Question answering failed")
+        await update.message.reply_text(f"Failed to answer: {exc}")
+        return
+
+    format_timestamp = (await asyncio.to_thread(registry.engine, "format")).format_timestamp
+    lines = [answer.text]
+    if answer.sources:
+        lines.append("")
+        lines.append("Sources:")
+        for number, chunk in enumerate(answer.sources, 1):
+            timestamp = (
+                f" [{format_timestamp(chunk.start_seconds)}]" if chunk.start_seconds is not None else ""
+            )
+            lines.append(f"[{number}] {chunk.title}{timestamp}")
+    await update.message.reply_text("\n".join(lines))
@@ -2,35 +2,126 @@
 
 from __future__ import annotations
 
+import asyncio
 import logging
+import os
+import time
+from typing import Optional
 
-from telegram.ext import ApplicationBuilder, CommandHandler
+from telegram.ext import Application, ApplicationBuilder, CommandHandler
 
 from config import settings
+from opennote import registry
 from opennote.bot.commands import (
+    ask_command,
     note_command,
     outline_command,
+    retry_command,
+    search_command,
     study_command,
     summary_command,
     transcript_command,
 )
+from opennote.engine.jobs import collect_configured_garbage
+from opennote.engine.metrics import JobMetrics
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+_startup = JobMetrics("startup")
+_polling_started = 0.0
+
+
+def _process_age() -> Optional[float]:
+    """Seconds since this process was started, from /proc (None elsewhere)."""
+    try:
+        with open("/proc/self/stat", "r", encoding="ascii") as handle:
+            start_ticks = int(handle.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/uptime", "r", encoding="ascii") as handle:
+            uptime = float(handle.read().split()[0])
+    except (OSError, ValueError, IndexError):
+        return None
+    return uptime - start_ticks / os.sysconf("SC_CLK_TCK")
+
+
+async def _warm_up_llm() -> None:
+    client = (await asyncio.to_thread(registry.engine, "ollama")).get_client()
+    loaded = await asyncio.to_thread(client.warm_up)
+    for url, seconds in loaded.items():
+        logger.info(
+            "Ollama model %s loaded on %s in %.2fs (keep_alive=%s)",
+            client.model,
+            url,
+            seconds,
+            client.keep_alive,
+        )
+
+
+async def _prewarm() -> None:
+    """Load what the first job would otherwise wait for, while the bot already polls."""
+    metrics = JobMetrics("prewarm")
+    with metrics.timed("imports"):
+        timings = await asyncio.to_thread(registry.prewarm)
+    for name, seconds in sorted(timings.items(), key=lambda item: -item[1]):
+        metrics.record(f"import_{name.removeprefix('opennote.')}", seconds)
+
+    try:
+        with metrics.timed("whisper_model"):
+            audio = await asyncio.to_thread(registry.adapter_module, "audio")
+            await asyncio.to_thread(audio.fetch_whisper_model, settings.WHISPER_MODEL)
+    except Exception as exc:
+        # Not fatal: the first job tries again and reports the error to the chat.
+        logger.warning("Could not fetch Whisper model %s: %s", settings.WHISPER_MODEL, exc)
+
+    if settings.ENABLE_SUMMARY and settings.OLLAMA_WARM_UP:
+        with metrics.timed("llm"):
+            await _warm_up_llm()
+    logger.info("Prewarm finished: %s", metrics.format())
+
+
+async def _post_init(application: Application) -> None:
+    # Runs once the bot has connected; polling starts right after this returns.
+    _startup.record("initialize_seconds", time.perf_counter() - _polling_started)
+    total = sum(value for value in _startup.snapshot().values() if isinstance(value, float))
+    logger.info("Startup took %.2fs: %s", total, _startup.format())
+
+    application.create_task(asyncio.to_thread(collect_configured_garbage))
+    if settings.ENABLE_PREWARM:
+        application.create_task(_prewarm())
+    elif settings.ENABLE_SUMMARY and settings.OLLAMA_WARM_UP:
+        application.create_task(_warm_up_llm())
+
 
 def main() -> None:
+    global _polling_started
+    age = _process_age()
+    if age is not None:
+        # Interpreter start plus importing telegram and the command module.
+        _startup.record("boot_seconds", age)
+
     if not settings.TELEGRAM_BOT_TOKEN:
         raise RuntimeError("TELEGRAM_BOT_TOKEN is not set in config/settings.py")
 
-    application = ApplicationBuilder().token(settings.TELEGRAM_BOT_TOKEN).build()
-    application.add_handler(CommandHandler("transcript", transcript_command))
-    application.add_handler(CommandHandler("note", note_command))
-    application.add_handler(CommandHandler("summary", summary_command))
-    application.add_handler(CommandHandler("outline", outline_command))
-    application.add_handler(CommandHandler("study", study_command))
+    with _startup.timed("build"):
+        application = (
+            ApplicationBuilder()
+            .token(settings.TELEGRAM_BOT_TOKEN)
+            # Handlers run concurrently; the fair scheduler decides which jobs run.
+            .concurrent_updates(True)
+            .post_init(_post_init)
+            .build()
+        )
+        application.add_handler(CommandHandler("transcript", transcript_command))
+        application.add_handler(CommandHandler("note", note_command))
+        application.add_handler(CommandHandler("summary", summary_command))
+        application.add_handler(CommandHandler("outline", outline_command))
+        application.add_handler(CommandHandler("study", study_command))
+        application.add_handler(CommandHandler("retry", retry_command))
+        application.add_handler(CommandHandler("search", search_command))
+        application.add_handler(CommandHandler("ask", ask_command))
 
     logger.info("Starting OpenNote bot")
+    _polling_started = time.perf_counter()
     application.run_polling()
 
 
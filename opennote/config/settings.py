@@ -5,12 +5,75 @@ from __future__ import annotations
 OBSIDIAN_YT_PATH = "/absolute/path/to/Obsidian/YouTube"
 MAX_MEDIA_LENGTH_SECONDS = 7200
 ENABLE_SUMMARY = False
+EXTRACTIVE_KEEP_RATIO = 1.0
+ENABLE_COMPACTION = True
+COMPACT_MIN_WORDS = 12
+COMPACT_MAX_GAP_SECONDS = 2.0
 OLLAMA_MODEL = "llama3:8b"
+OLLAMA_URL = "http://localhost:11434"
+# Extra Ollama hosts as "url" or ("url", weight); empty means just OLLAMA_URL.
+OLLAMA_BACKENDS: list = []
+OLLAMA_HEALTH_CHECK_SECONDS = 30
+OLLAMA_FAILURE_THRESHOLD = 3
+OLLAMA_CIRCUIT_COOLDOWN_SECONDS = 30
+OLLAMA_KEEP_ALIVE = "30m"
+OLLAMA_WARM_UP = True
+# Cap on each map-chunk summary.
+OLLAMA_NUM_PREDICT = 512
+# Reduce steps and /ask answers; -1 lets the model finish instead of cutting it off.
+OLLAMA_REDUCE_NUM_PREDICT = -1
+OLLAMA_NUM_CTX_STEP = 2048
+SUMMARY_CHUNK_CHARS = 4000
+SUMMARY_MAP_CONCURRENCY = 1
+# Map-call num_ctx and num_predict; None sizes num_ctx to the chunk and uses OLLAMA_NUM_PREDICT.
+SUMMARY_NUM_CTX = None
+SUMMARY_NUM_PREDICT = None
+# Let STATE_DIR/llm_tuning.json (written by `python -m opennote.tune_llm`) override the four above.
+ENABLE_LLM_TUNING = True
+# Summarize media chunks while Whisper is still transcribing; only the reduce waits.
+ENABLE_STREAMING_SUMMARY = True
+SUMMARY_CHUNK_ATTEMPTS = 3
+SUMMARY_RETRY_BACKOFF_SECONDS = 2.0
+OLLAMA_EMBED_MODEL = "nomic-embed-text"
+ENABLE_EMBEDDINGS = False
+EMBED_CHUNK_CHARS = 1500
+ASK_TOP_K = 6
 WHISPER_MODEL = "large-v3"
 WHISPER_COMPUTE_TYPE = "int8"
+# Import adapters/engines and fetch the Whisper model in the background after startup.
+ENABLE_PREWARM = True
+PROBE_CACHE_MAX_ENTRIES = 10000
+# Reuse the transcript of an earlier job whose audio fingerprint matches (other encodings too).
+ENABLE_FINGERPRINT_DEDUP = True
+# Fraction of fingerprint hashes that must line up; re-encodes score about 0.3 and up.
+FINGERPRINT_MIN_SCORE = 0.2
+# Transcribe only the new tail of a local recording that grew since its last run.
+ENABLE_INCREMENTAL_INGEST = True
+INCREMENTAL_MAX_RECORDINGS = 200
+# Only files modified this recently (or already followed) are treated as growing recordings.
+INCREMENTAL_RECENT_SECONDS = 600
+ENABLE_ADMISSION_CONTROL = True
+# Memory kept free for the OS, Ollama and the bot itself.
+ADMISSION_RESERVE_MB = 1024
+# Smaller Whisper models a job may fall back to instead of queueing; empty disables.
+ADMISSION_DOWNGRADE_MODELS = ["medium", "small"]
+ENABLE_FAIR_SCHEDULING = True
+SCHEDULER_MAX_ACTIVE_JOBS = 2
+SCHEDULER_PER_CHAT_LIMIT = 1
+# Optional {chat_id: weight}; a chat with weight 2 gets twice the share of one with 1.
+SCHEDULER_CHAT_WEIGHTS = {}
 DATE_PREFIX_FILENAMES = True
+STATE_DIR = "~/.local/state/opennote"
+JOB_MAX_AGE_DAYS = 7
+JOB_MAX_TOTAL_MB = 4096
+WRITE_SEGMENT_SIDECAR = True
+ENABLE_SEARCH_INDEX = True
+SEARCH_RESULT_LIMIT = 10
 
 TELEGRAM_BOT_TOKEN = ""
 EXTERNAL_DOWNLOAD_DIR = ""
 MEDIA_POLL_SECONDS = 5
 MEDIA_POLL_TIMEOUT_SECONDS = 600
+HTTP_MEDIA_WINDOW_SECONDS = 30
+HTTP_MEDIA_RETRIES = 3
+HTTP_MEDIA_TIMEOUT_SECONDS = 30
@@ -0,0 +1,261 @@
+"""Memory-aware admission control for ingestion jobs."""
+
+from __future__ import annotations
+
+import asyncio
+import itertools
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Deque, Dict, List, Optional, Sequence
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+_MB = 1024 * 1024
+_GB = 1024 * _MB
+
+# Approximate float16 weight sizes of the CTranslate2 Whisper models.
+WHISPER_MODEL_BYTES: Dict[str, int] = {
+    "tiny": 75 * _MB,
+    "base": 145 * _MB,
+    "small": 484 * _MB,
+    "medium": 1530 * _MB,
+    "large-v1": 3090 * _MB,
+    "large-v2": 3090 * _MB,
+    "large-v3": 3090 * _MB,
+}
+_COMPUTE_TYPE_SCALE = {
+    "int8": 0.5,
+    "int8_float16": 0.5,
+    "int8_float32": 0.5,
+    "float16": 1.0,
+    "float32": 2.0,
+}
+# Encoder activations, beam search state and CTranslate2 scratch space.
+_WHISPER_WORKING_BYTES = 400 * _MB
+# Decoded float32 samples plus the log-mel features computed from them.
+_AUDIO_BYTES_PER_SECOND = 16000 * 4 * 2
+# pypdf keeps parsed object trees and extracted text alongside the raw file.
+_PDF_EXPANSION = 8
+_TEXT_EXPANSION = 3
+_BASE_JOB_BYTES = 50 * _MB
+
+
+@dataclass(frozen=True)
+class Demand:
+    kind: str  # "media" or "document"
+    duration_seconds: Optional[float] = None
+    document_bytes: int = 0
+    document_suffix: str = ""
+    whisper_model: Optional[str] = None
+
+
+def whisper_model_bytes(model: str, compute_type: str) -> int:
+    weights = WHISPER_MODEL_BYTES.get(model, WHISPER_MODEL_BYTES["large-v3"])
+    return int(weights * _COMPUTE_TYPE_SCALE.get(compute_type, 1.0)) + _WHISPER_WORKING_BYTES
+
+
+def estimate_bytes(demand: Demand, whisper_model: Optional[str] = None) -> int:
+    if demand.kind == "document":
+        expansion = _PDF_EXPANSION if demand.document_suffix == ".pdf" else _TEXT_EXPANSION
+        return _BASE_JOB_BYTES + demand.document_bytes * expansion
+    model = whisper_model or demand.whisper_model or settings.WHISPER_MODEL
+    # Unknown durations (URLs not yet fetched) are budgeted at the configured maximum.
+    duration = demand.duration_seconds or settings.MAX_MEDIA_LENGTH_SECONDS
+    return (
+        _BASE_JOB_BYTES
+        + whisper_model_bytes(model, settings.WHISPER_COMPUTE_TYPE)
+        + int(duration * _AUDIO_BYTES_PER_SECOND)
+    )
+
+
+def _read_kib(path: str, field: str) -> Optional[int]:
+    try:
+        with open(path, "r", encoding="ascii") as handle:
+            for line in handle:
+                if line.startswith(field + ":"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        return None
+    return None
+
+
+def available_memory() -> Optional[int]:
+    return _read_kib("/proc/meminfo", "MemAvailable")
+
+
+def process_rss() -> Optional[int]:
+    return _read_kib("/proc/self/status", "VmRSS")
+
+
+@dataclass
+class Ticket:
+    id: int
+    action: str  # "admit", "downgrade" or "overcommit"
+    estimate_bytes: int
+    available_bytes: Optional[int]
+    whisper_model: Optional[str]
+    waited_seconds: float = 0.0
+    # Set while the job is parked by the scheduler; see AdmissionController.suspend.
+    suspended: bool = False
+
+    def describe(self) -> str:
+        free = "unknown"
+        if self.available_bytes is not None:
+            free = f"{self.available_bytes / _GB:.1f} GB"
+        text = f"{self.action}: needs ~{self.estimate_bytes / _GB:.1f} GB, {free} available"
+        if self.waited_seconds:
+            text += f", queued {self.waited_seconds:.0f}s"
+        return text
+
+
+StatusCallback = Callable[[str], Awaitable[None]]
+
+
+class AdmissionController:
+    """Admits jobs only while their estimated memory fits what the machine has left.
+
+    Free memory is ``MemAvailable`` minus the part of admitted jobs' estimates
+    that hasn't shown up in this process's RSS yet, minus a fixed reserve.
+    A job that doesn't fit is first offered a smaller Whisper model (if
+    allowed), otherwise it waits in FIFO order until a running job releases
+    memory. A job is always admitted when nothing else is running, so an
+    oversized job degrades to running alone rather than waiting forever.
+    Jobs parked by the scheduler are suspended and don't count, so the job
+    that preempted them can be admitted.
+    """
+
+    def __init__(
+        self,
+        reserve_bytes: int,
+        downgrade_models: Sequence[str] = (),
+        recheck_seconds: float = 5.0,
+        available: Callable[[], Optional[int]] = available_memory,
+        rss: Callable[[], Optional[int]] = process_rss,
+    ) -> None:
+        self.reserve_bytes = reserve_bytes
+        self.downgrade_models = list(downgrade_models)
+        self.recheck_seconds = recheck_seconds
+        self._available = available
+        self._rss = rss
+        self._baseline_rss = rss() or 0
+        self._running: Dict[int, Ticket] = {}
+        self._waiting: Deque[int] = deque()
+        self._ids = itertools.count(1)
+        self._changed = asyncio.Condition()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _active(self) -> List[Ticket]:
+        return [ticket for ticket in self._running.values() if not ticket.suspended]
+
+    def _free_bytes(self) -> Optional[int]:
+        available = self._available()
+        if available is None:
+            return None
+        # A parked job's memory is already resident, so MemAvailable accounts for it.
+        committed = sum(ticket.estimate_bytes for ticket in self._active())
+        materialised = max(0, (self._rss() or 0) - self._baseline_rss)
+        return available - max(0, committed - materialised) - self.reserve_bytes
+
+    def _try_admit(self, ticket_id: int, demand: Demand) -> Optional[Ticket]:
+        estimate = estimate_bytes(demand)
+        free = self._free_bytes()
+        if free is None or estimate <= free:
+            return Ticket(ticket_id, "admit", estimate, free, demand.whisper_model)
+
+        if demand.kind == "media":
+            current = demand.whisper_model or settings.WHISPER_MODEL
+            current_size = WHISPER_MODEL_BYTES.get(current, 0)
+            for model in self.downgrade_models:
+                if WHISPER_MODEL_BYTES.get(model, 0) >= current_size:
+                    continue
+                smaller = estimate_bytes(demand, model)
+                if smaller <= free:
+                    return Ticket(ticket_id, "downgrade", smaller, free, model)
+
+        if not self._active():
+            return Ticket(ticket_id, "overcommit", estimate, free, demand.whisper_model)
+        return None
+
+    async def admit(self, demand: Demand, on_status: Optional[StatusCallback] = None) -> Ticket:
+        ticket_id = next(self._ids)
+        started = time.monotonic()
+        self._loop = asyncio.get_running_loop()
+        queued = False
+        self._waiting.append(ticket_id)
+        try:
+            while True:
+                message = None
+                async with self._changed:
+                    ticket = None
+                    if self._waiting[0] == ticket_id:
+                        ticket = self._try_admit(ticket_id, demand)
+                    if ticket is not None:
+                        self._running[ticket_id] = ticket
+                        break
+                    if not queued:
+                        queued = True
+                        message = (
+                            "Queued until memory frees up: needs "
+                            f"~{estimate_bytes(demand) / _GB:.1f} GB, {len(self._running)} job(s) "
+                            f"running, {self._waiting.index(ticket_id)} ahead in line."
+                        )
+                    else:
+                        try:
+                            # Memory can also be freed by other processes, so poll as well.
+                            await asyncio.wait_for(self._changed.wait(), self.recheck_seconds)
+                        except asyncio.TimeoutError:
+                            pass
+                # Report outside the lock so a slow reply doesn't hold up releases.
+                if message is not None and on_status is not None:
+                    await on_status(message)
+        finally:
+            self._waiting.remove(ticket_id)
+            async with self._changed:
+                self._changed.notify_all()
+
+        if queued:
+            ticket.waited_seconds = time.monotonic() - started
+        logger.info("Admission %d %s", ticket_id, ticket.describe())
+        return ticket
+
+    async def release(self, ticket: Ticket) -> None:
+        async with self._changed:
+            self._running.pop(ticket.id, None)
+            self._changed.notify_all()
+
+    def suspend(self, ticket: Ticket) -> None:
+        """Stop counting ``ticket`` while its job is parked; callable from any thread.
+
+        Otherwise the job that preempted it could wait for memory that only
+        the parked job's completion would free, while the parked job waits
+        for that job's slot.
+        """
+        ticket.suspended = True
+        loop = self._loop
+        if loop is not None and not loop.is_closed():
+            loop.call_soon_threadsafe(lambda: loop.create_task(self._notify()))
+
+    def resume(self, ticket: Ticket) -> None:
+        """Count ``ticket`` again once its job runs; callable from any thread."""
+        ticket.suspended = False
+
+    async def _notify(self) -> None:
+        async with self._changed:
+            self._changed.notify_all()
+
+
+_controller: Optional[AdmissionController] = None
+
+
+def get_admission() -> AdmissionController:
+    global _controller
+    if _controller is None:
+        _controller = AdmissionController(
+            reserve_bytes=settings.ADMISSION_RESERVE_MB * _MB,
+            downgrade_models=settings.ADMISSION_DOWNGRADE_MODELS,
+        )
+    return _controller
@@ -0,0 +1,131 @@
+"""On-disk checkpoints for map-phase chunk summaries."""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Set
+
+from config import settings
+from opennote.output.vault_index import atomic_open
+
+
+def content_key(*parts: str) -> str:
+    digest = hashlib.sha1()
+    for part in parts:
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class LinesDigest:
+    """:func:`lines_key` computed one line at a time, as the lines are produced."""
+
+    def __init__(self, *parts: str) -> None:
+        self._digest = hashlib.sha1()
+        for part in parts:
+            self._digest.update(part.encode("utf-8"))
+            self._digest.update(b"\0")
+        self._first = True
+
+    def update(self, line: str) -> None:
+        if not self._first:
+            self._digest.update(b"\n")
+        self._first = False
+        self._digest.update(line.encode("utf-8"))
+
+    def hexdigest(self) -> str:
+        digest = self._digest.copy()
+        digest.update(b"\0")
+        return digest.hexdigest()
+
+
+def lines_key(lines: Iterable[str], *parts: str) -> str:
+    """``content_key(*parts, "\\n".join(lines))`` without building the joined string."""
+    digest = LinesDigest(*parts)
+    for line in lines:
+        digest.update(line)
+    return digest.hexdigest()
+
+
+class MapCheckpoint:
+    """Completed chunk summaries for one job, appended to a JSON-lines file.
+
+    Entries are keyed by a hash of the chunk text, so a rerun over the same
+    source finds them even if chunks finish in a different order. Each line
+    is flushed and fsynced as it is written; a torn final line from a crash
+    is ignored on load.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        self._done: Dict[str, str] = {}
+        # Entries looked up or added since the file was loaded.
+        self._used: Set[str] = set()
+        if path.exists():
+            with path.open("r", encoding="utf-8") as handle:
+                for line in handle:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+                    self._done[entry["chunk"]] = entry["summary"]
+
+    def __len__(self) -> int:
+        return len(self._done)
+
+    def get(self, chunk: str) -> Optional[str]:
+        key = content_key(chunk)
+        with self._lock:
+            summary = self._done.get(key)
+            if summary is not None:
+                self._used.add(key)
+        return summary
+
+    def put(self, chunk: str, summary: str) -> None:
+        key = content_key(chunk)
+        line = json.dumps({"chunk": key, "summary": summary}, ensure_ascii=False) + "\n"
+        with self._lock:
+            self._done[key] = summary
+            self._used.add(key)
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with self.path.open("a", encoding="utf-8") as handle:
+                handle.write(line)
+                handle.flush()
+                os.fsync(handle.fileno())
+
+    def rekey(self, job_key: str) -> None:
+        """Move the file to ``job_key``'s path, replacing any checkpoint already there."""
+        path = _checkpoint_path(job_key)
+        with self._lock:
+            if self.path.exists():
+                os.replace(self.path, path)
+            self.path = path
+
+    def prune(self) -> None:
+        """Rewrite the file with only the entries looked up or added since it was loaded."""
+        with self._lock:
+            if len(self._used) == len(self._done):
+                return
+            self._done = {key: self._done[key] for key in self._used}
+            with atomic_open(self.path) as handle:
+                for key, summary in self._done.items():
+                    entry = {"chunk": key, "summary": summary}
+                    handle.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+    def discard(self) -> None:
+        with self._lock:
+            self._done.clear()
+            self.path.unlink(missing_ok=True)
+
+
+def _checkpoint_path(job_key: str) -> Path:
+    return Path(settings.STATE_DIR).expanduser() / "checkpoints" / f"map-{job_key}.jsonl"
+
+
+def map_checkpoint(job_key: str) -> MapCheckpoint:
+    return MapCheckpoint(_checkpoint_path(job_key))
@@ -0,0 +1,181 @@
+"""Compact Whisper transcripts before summarization."""
+
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from opennote.adapters.segments import SegmentArray
+
+_DISFLUENCY = re.compile(
+    r"(?<!\w)(?:u+m+|u+h+|e+r+m*|a+h+|h+m+|m+h*m+|uh-huh)(?!\w)[,.]?\s*",
+    re.IGNORECASE,
+)
+_SPACES = re.compile(r"\s+")
+_WORD = re.compile(r"\w+")
+
+
+@dataclass(frozen=True)
+class CompactionResult:
+    segments: SegmentArray
+    # Inclusive range of original segment indices folded into each compacted segment.
+    source_ranges: List[Tuple[int, int]]
+    tokens_before: int
+    tokens_after: int
+
+    @property
+    def text(self) -> str:
+        return "\n".join(self.segments.texts())
+
+    @property
+    def reduction(self) -> float:
+        if not self.tokens_before:
+            return 0.0
+        return 1.0 - self.tokens_after / self.tokens_before
+
+
+def _count_tokens(text: str) -> int:
+    return len(text.split())
+
+
+def _normalize(text: str) -> str:
+    return " ".join(_WORD.findall(text.lower()))
+
+
+def _collapse_repeats(words: List[str], max_ngram: int) -> List[str]:
+    keys = [_normalize(word) for word in words]
+    output: List[str] = []
+    index = 0
+    while index < len(words):
+        for size in range(min(max_ngram, (len(words) - index) // 2), 0, -1):
+            pattern = keys[index : index + size]
+            end = index + size
+            while keys[end : end + size] == pattern:
+                end += size
+            if end > index + size:
+                output.extend(words[end - size : end])
+                index = end
+                break
+        else:
+            output.append(words[index])
+            index += 1
+    return output
+
+
+def clean_text(text: str, max_ngram: int = 8) -> str:
+    text = _DISFLUENCY.sub("", text)
+    words = _SPACES.split(text.strip())
+    if not words or words == [""]:
+        return ""
+    return " ".join(_collapse_repeats(words, max_ngram))
+
+
+class Compactor:
+    """Incremental form of :func:`compact_segments`.
+
+    Segments are fed in order with :meth:`add`; each compacted segment is
+    returned as soon as the next one starts (or from :meth:`finish` for the
+    last), so a transcript can be compacted while it is still being made.
+    """
+
+    def __init__(
+        self,
+        min_words: int = 12,
+        max_gap_seconds: float = 2.0,
+        loop_window: int = 4,
+        loop_gap_seconds: float = 10.0,
+    ) -> None:
+        self.min_words = min_words
+        self.max_gap_seconds = max_gap_seconds
+        self.loop_window = loop_window
+        self.loop_gap_seconds = loop_gap_seconds
+        self.segments = SegmentArray()
+        # Inclusive range of original segment indices folded into each compacted segment.
+        self.source_ranges: List[Tuple[int, int]] = []
+        self.tokens_before = 0
+        self.tokens_after = 0
+        self._index = -1
+        # Normalized text and end time of the last ``loop_window`` distinct lines.
+        self._recent: List[Tuple[str, float]] = []
+        self._pending_text: List[str] = []
+        self._pending_words = 0
+        self._pending_start = self._pending_end = 0.0
+        self._pending_first = self._pending_last = -1
+
+    def _flush(self) -> Optional[str]:
+        if not self._pending_text:
+            return None
+        text = " ".join(self._pending_text)
+        self.segments.append(self._pending_start, self._pending_end, text)
+        self.source_ranges.append((self._pending_first, self._pending_last))
+        self.tokens_after += _count_tokens(text)
+        self._pending_text = []
+        self._pending_words = 0
+        return text
+
+    def add(self, start: float, end: float, raw: str) -> Optional[str]:
+        """Feed the next segment; returns the text of a compacted segment it completed."""
+        self._index += 1
+        self.tokens_before += _count_tokens(raw)
+
+        text = clean_text(raw)
+        key = _normalize(text)
+        # Whisper hallucination loops repeat the same line (or a short cycle of lines)
+        # back to back; the same line said again later in the talk is kept.
+        dropped = not key
+        for position, (seen, seen_end) in enumerate(self._recent):
+            if seen == key and start - seen_end <= self.loop_gap_seconds:
+                self._recent[position] = (key, max(seen_end, end))
+                dropped = True
+        if dropped:
+            # Fold it into the pending segment's time range, but never across a gap.
+            if self._pending_text and start - self._pending_end <= self.max_gap_seconds:
+                self._pending_end = max(self._pending_end, end)
+                self._pending_last = self._index
+            return None
+        self._recent = [entry for entry in self._recent if entry[0] != key]
+        self._recent.append((key, end))
+        if len(self._recent) > self.loop_window:
+            self._recent.pop(0)
+
+        flushed = None
+        if self._pending_text and (
+            self._pending_words >= self.min_words
+            or start - self._pending_end > self.max_gap_seconds
+        ):
+            flushed = self._flush()
+        if not self._pending_text:
+            self._pending_start = start
+            self._pending_first = self._index
+        self._pending_text.append(text)
+        self._pending_words += _count_tokens(text)
+        self._pending_end = end
+        self._pending_last = self._index
+        return flushed
+
+    def finish(self) -> Optional[str]:
+        """Flush the last compacted segment and return its text."""
+        return self._flush()
+
+    def result(self) -> CompactionResult:
+        return CompactionResult(
+            segments=self.segments,
+            source_ranges=self.source_ranges,
+            tokens_before=self.tokens_before,
+            tokens_after=self.tokens_after,
+        )
+
+
+def compact_segments(
+    segments: Iterable[Dict[str, float | str]],
+    min_words: int = 12,
+    max_gap_seconds: float = 2.0,
+    loop_window: int = 4,
+    loop_gap_seconds: float = 10.0,
+) -> CompactionResult:
+    compactor = Compactor(min_words, max_gap_seconds, loop_window, loop_gap_seconds)
+    for segment in segments:
+        compactor.add(float(segment["start"]), float(segment["end"]), str(segment["text"]))
+    compactor.finish()
+    return compactor.result()
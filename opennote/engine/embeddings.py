@@ -0,0 +1,34 @@
+"""Embed text with Ollama's local embeddings endpoint."""
+
+from __future__ import annotations
+
+from typing import Callable, List
+
+import numpy as np
+import requests
+
+from config import settings
+from opennote.engine.llm_pool import get_pool
+
+EmbedFn = Callable[[List[str]], np.ndarray]
+
+
+def embed_texts(texts: List[str]) -> np.ndarray:
+    if not texts:
+        return np.empty((0, 0), dtype=np.float32)
+    return get_pool().call(lambda url: _embed_on(url, texts))
+
+
+def _embed_on(base_url: str, texts: List[str]) -> np.ndarray:
+    response = requests.post(
+        f"{base_url}/api/embed",
+        json={
+            "model": settings.OLLAMA_EMBED_MODEL,
+            "input": texts,
+            "keep_alive": settings.OLLAMA_KEEP_ALIVE,
+        },
+        timeout=180,
+    )
+    response.raise_for_status()
+    data = response.json()
+    return np.asarray(data.get("embeddings", []), dtype=np.float32)
@@ -0,0 +1,71 @@
+"""Extractive sentence selection with vectorised TF-IDF scoring."""
+
+from __future__ import annotations
+
+import re
+from typing import List
+
+import numpy as np
+
+_SENTENCE_SPLIT = re.compile(r"(?<=[.!?])\s+|\n+")
+_TOKEN = re.compile(r"[a-z0-9']+")
+_STOPWORDS = frozenset(
+    """
+    a an and are as at be but by for from has have he her his i if in into is it its
+    just like me my no not of on or our so some that the their them then there these
+    they this to up was we were what when which who will with you your um uh yeah okay
+    oh really very gonna got get going know think right well also can do does did
+    """.split()
+)
+
+
+def split_sentences(text: str) -> List[str]:
+    return [sentence.strip() for sentence in _SENTENCE_SPLIT.split(text) if sentence.strip()]
+
+
+def score_sentences(sentences: List[str]) -> np.ndarray:
+    vocabulary: dict[str, int] = {}
+    token_ids: List[int] = []
+    sentence_ids: List[int] = []
+    for index, sentence in enumerate(sentences):
+        for token in _TOKEN.findall(sentence.lower()):
+            if token in _STOPWORDS or len(token) < 3:
+                continue
+            token_ids.append(vocabulary.setdefault(token, len(vocabulary)))
+            sentence_ids.append(index)
+
+    count = len(sentences)
+    if not token_ids:
+        return np.zeros(count, dtype=np.float64)
+
+    tokens = np.asarray(token_ids, dtype=np.int64)
+    owners = np.asarray(sentence_ids, dtype=np.int64)
+    vocab_size = len(vocabulary)
+
+    # Document frequency counts each (sentence, term) pair once.
+    pairs = np.unique(owners * vocab_size + tokens)
+    document_frequency = np.bincount(pairs % vocab_size, minlength=vocab_size)
+    idf = np.log((1 + count) / (1 + document_frequency)) + 1.0
+
+    # Term frequency across the whole text rewards sentences about recurring topics.
+    term_frequency = np.bincount(tokens, minlength=vocab_size).astype(np.float64)
+    weights = np.log1p(term_frequency) * idf
+
+    totals = np.bincount(owners, weights=weights[tokens], minlength=count)
+    lengths = np.bincount(owners, minlength=count).astype(np.float64)
+    # Divide by sqrt(length) so long run-on sentences don't win by size alone.
+    return totals / np.sqrt(np.maximum(lengths, 1.0))
+
+
+def rank_sentences(sentences: List[str]) -> np.ndarray:
+    scores = score_sentences(sentences)
+    return np.argsort(-scores, kind="stable")
+
+
+def extract_text(text: str, keep_ratio: float) -> str:
+    sentences = split_sentences(text)
+    if len(sentences) < 3 or keep_ratio >= 1.0:
+        return text
+    keep = max(1, int(np.ceil(len(sentences) * keep_ratio)))
+    chosen = np.sort(rank_sentences(sentences)[:keep])
+    return " ".join(sentences[index] for index in chosen)
@@ -0,0 +1,288 @@
+"""Acoustic fingerprints of decoded audio and a local index to find duplicates.
+
+The same recording in another container or codec decodes to nearly the same
+16 kHz signal, but not to the same bytes. Fingerprints are built from
+spectral peaks instead: per frame and frequency band the strongest bin is
+kept if it is the band's maximum over a short stretch of time, and pairs of
+nearby peaks are hashed as (frequency, frequency, time delta). Those hashes
+survive re-encoding, gain changes and added noise, and two fingerprints of
+the same audio agree on many hashes at one constant time offset. Only a
+fixed quarter of the possible hash values is kept, the same quarter for
+every file, so the index stays small without changing what lines up.
+"""
+
+from __future__ import annotations
+
+import sqlite3
+import threading
+import time
+import wave
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from config import settings
+
+SAMPLE_RATE = 16000
+_FRAME = 1024
+_HOP = 512
+_WINDOW = np.hanning(_FRAME).astype(np.float32)
+# FFT bin edges of the bands peaks are picked in: about 310 Hz to 4 kHz, where speech lives.
+_BANDS = np.array([20, 32, 48, 72, 104, 152, 200, 256])
+# A band's level is a peak if it is the maximum within this many frames either side.
+_PEAK_RADIUS = 10
+# Each peak is paired with this many following peaks, at most _MAX_DT frames later.
+_FAN_OUT = 4
+_MAX_DT = 63
+# Keep one hash value in this many; picked by value, so all fingerprints keep the same ones.
+_HASH_SAMPLE = 4
+# Frames read per FFT batch (about 65 s), which bounds memory for long recordings.
+_BLOCK_FRAMES = 2048
+_SCHEMA_VERSION = 2
+
+
+@dataclass(frozen=True)
+class Fingerprint:
+    # Parallel arrays: peak-pair hash and the frame of the pair's first peak.
+    hashes: np.ndarray
+    frames: np.ndarray
+    duration_seconds: float
+
+    def __len__(self) -> int:
+        return len(self.hashes)
+
+
+@dataclass(frozen=True)
+class Match:
+    job_key: str
+    source: str
+    # Fraction of the larger fingerprint's hashes that line up at ``offset_seconds``.
+    score: float
+    # Add to the matched job's timestamps to get this source's timestamps.
+    offset_seconds: float
+
+
+def frames_to_seconds(frames: float) -> float:
+    return frames * _HOP / SAMPLE_RATE
+
+
+def _read_blocks(path: Path) -> Iterator[np.ndarray]:
+    """Float samples of a 16 kHz mono file, a block at a time where the format allows it."""
+    block = _BLOCK_FRAMES * _HOP
+    try:
+        with wave.open(str(path), "rb") as reader:
+            if (reader.getframerate(), reader.getnchannels(), reader.getsampwidth()) == (
+                SAMPLE_RATE,
+                1,
+                2,
+            ):
+                while True:
+                    data = reader.readframes(block)
+                    if not data:
+                        return
+                    yield np.frombuffer(data, dtype="<i2").astype(np.float32) / 32768.0
+    except (wave.Error, EOFError):
+        pass
+    # FLAC or anything else: let PyAV resample it, at the cost of holding it whole.
+    from faster_whisper.audio import decode_audio
+
+    samples = decode_audio(str(path), sampling_rate=SAMPLE_RATE)
+    for start in range(0, len(samples), block):
+        yield samples[start : start + block]
+
+
+def _band_peaks(blocks: Iterator[np.ndarray]) -> Tuple[np.ndarray, np.ndarray, int]:
+    """Strongest bin and its log magnitude for every frame and band."""
+    rows = np.arange(_BLOCK_FRAMES)
+    bins: List[np.ndarray] = []
+    levels: List[np.ndarray] = []
+    carry = np.zeros(0, dtype=np.float32)
+    samples_seen = 0
+    for block in blocks:
+        samples_seen += len(block)
+        samples = np.concatenate([carry, block])
+        count = (len(samples) - _FRAME) // _HOP + 1
+        if count <= 0:
+            carry = samples
+            continue
+        frames = sliding_window_view(samples, _FRAME)[: count * _HOP : _HOP]
+        spectrum = np.abs(np.fft.rfft(frames * _WINDOW, axis=1))[:, _BANDS[0] : _BANDS[-1]]
+        block_bins = np.empty((count, len(_BANDS) - 1), dtype=np.int64)
+        for band, (low, high) in enumerate(zip(_BANDS[:-1] - _BANDS[0], _BANDS[1:] - _BANDS[0])):
+            block_bins[:, band] = spectrum[:, low:high].argmax(axis=1) + low
+        bins.append(block_bins)
+        levels.append(np.log(spectrum[rows[:count, None], block_bins] + 1e-6))
+        carry = samples[count * _HOP :]
+    if not bins:
+        empty = np.zeros((0, len(_BANDS) - 1))
+        return empty.astype(np.int64), empty, samples_seen
+    return np.concatenate(bins), np.concatenate(levels), samples_seen
+
+
+def fingerprint_file(path: Path) -> Fingerprint:
+    bins, levels, samples = _band_peaks(_read_blocks(path))
+    duration = samples / SAMPLE_RATE
+    if len(levels) == 0:
+        return Fingerprint(np.zeros(0, np.int64), np.zeros(0, np.int64), duration)
+
+    padded = np.pad(levels, ((_PEAK_RADIUS, _PEAK_RADIUS), (0, 0)), constant_values=-np.inf)
+    local_max = sliding_window_view(padded, 2 * _PEAK_RADIUS + 1, axis=0).max(axis=-1)
+    # Silence and steady noise have no maximum worth keeping.
+    is_peak = (levels == local_max) & (levels > levels.mean(axis=0))
+    peak_frames, peak_bands = np.nonzero(is_peak)
+    peak_bins = bins[peak_frames, peak_bands]
+
+    hashes: List[np.ndarray] = []
+    frames: List[np.ndarray] = []
+    for step in range(1, _FAN_OUT + 1):
+        delta = peak_frames[step:] - peak_frames[:-step]
+        keep = (delta > 0) & (delta <= _MAX_DT)
+        hashes.append(((peak_bins[:-step] << 14) | (peak_bins[step:] << 6) | delta)[keep])
+        frames.append(peak_frames[:-step][keep])
+    hashes_all, frames_all = np.concatenate(hashes), np.concatenate(frames)
+    # Scramble the bits first; the low bits of a hash are the time delta.
+    sampled = (hashes_all * 2654435761 >> 16) % _HASH_SAMPLE == 0
+    return Fingerprint(hashes_all[sampled], frames_all[sampled], duration)
+
+
+class FingerprintIndex:
+    """Peak-pair hashes of every transcribed source, keyed by job.
+
+    Looking up a fingerprint joins its hashes against the index and, per
+    indexed source, counts how many agree on each time offset. A duplicate
+    has one offset with far more agreeing hashes than chance would give.
+    Sources whose length rules out a good enough score are not joined at all.
+    """
+
+    def __init__(self, db_path: Path) -> None:
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(db_path), check_same_thread=False)
+        with self._db:
+            (version,) = self._db.execute("PRAGMA user_version").fetchone()
+            if version < _SCHEMA_VERSION:
+                # Earlier indexes hold every hash, which thinned queries would never match.
+                self._db.execute("DROP TABLE IF EXISTS hashes")
+                self._db.execute("DROP TABLE IF EXISTS sources")
+                self._db.execute(f"PRAGMA user_version = {_SCHEMA_VERSION}")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS sources (id INTEGER PRIMARY KEY, job_key TEXT UNIQUE, "
+                "source TEXT, duration REAL, hashes INTEGER, added REAL)"
+            )
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS hashes (hash INTEGER, source_id INTEGER, frame INTEGER)"
+            )
+            self._db.execute(
+                "CREATE INDEX IF NOT EXISTS hashes_by_hash ON hashes (hash, source_id)"
+            )
+
+    def add(self, job_key: str, source: str, fingerprint: Fingerprint) -> None:
+        with self._lock, self._db:
+            self._forget(job_key)
+            cursor = self._db.execute(
+                "INSERT INTO sources (job_key, source, duration, hashes, added) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (job_key, source, fingerprint.duration_seconds, len(fingerprint), time.time()),
+            )
+            source_id = cursor.lastrowid
+            self._db.executemany(
+                "INSERT INTO hashes VALUES (?, ?, ?)",
+                zip(
+                    fingerprint.hashes.tolist(),
+                    [source_id] * len(fingerprint),
+                    fingerprint.frames.tolist(),
+                ),
+            )
+
+    def forget(self, job_key: str) -> None:
+        with self._lock, self._db:
+            self._forget(job_key)
+
+    def _forget(self, job_key: str) -> None:
+        row = self._db.execute("SELECT id FROM sources WHERE job_key = ?", (job_key,)).fetchone()
+        if row is not None:
+            self._db.execute("DELETE FROM hashes WHERE source_id = ?", (row[0],))
+            self._db.execute("DELETE FROM sources WHERE id = ?", (row[0],))
+
+    def matches(self, fingerprint: Fingerprint, min_score: float, limit: int = 8) -> List[Match]:
+        """Up to ``limit`` indexed sources that ``fingerprint`` duplicates, best first.
+
+        The hash join is counted per (source, offset) inside SQLite, so only
+        one row per offset bucket leaves the database rather than one per
+        shared hash, and only each source's best bucket is returned.
+        """
+        if not len(fingerprint):
+            return []
+        # Hash counts grow with duration, and at most the shorter source's hashes can
+        # line up, so a source more than 1 / min_score times longer or shorter can't score.
+        duration = fingerprint.duration_seconds
+        longest = duration / min_score if min_score > 0 else float("inf")
+        with self._lock:
+            self._db.execute("CREATE TEMP TABLE IF NOT EXISTS candidates (id INTEGER PRIMARY KEY)")
+            self._db.execute("DELETE FROM candidates")
+            added = self._db.execute(
+                "INSERT INTO candidates SELECT id FROM sources WHERE duration BETWEEN ? AND ?",
+                (duration * min_score, longest),
+            ).rowcount
+            if not added:
+                return []
+            self._db.execute("CREATE TEMP TABLE IF NOT EXISTS query (hash INTEGER, frame INTEGER)")
+            self._db.execute(
+                "CREATE TEMP TABLE IF NOT EXISTS offsets "
+                "(source_id INTEGER, offset INTEGER, n INTEGER, PRIMARY KEY (source_id, offset))"
+            )
+            self._db.execute("DELETE FROM query")
+            self._db.execute("DELETE FROM offsets")
+            self._db.executemany(
+                "INSERT INTO query VALUES (?, ?)",
+                zip(fingerprint.hashes.tolist(), fingerprint.frames.tolist()),
+            )
+            self._db.execute(
+                "INSERT INTO offsets SELECT h.source_id, h.frame - q.frame, COUNT(*) "
+                "FROM query q JOIN hashes h "
+                "ON h.hash = q.hash AND h.source_id IN (SELECT id FROM candidates) GROUP BY 1, 2"
+            )
+            # Decoder priming shifts one encoding by a frame or so; count neighbours too.
+            # SQLite takes the other columns from the row that has the MAX().
+            rows = self._db.execute(
+                "SELECT s.job_key, s.source, s.hashes, best.offset, best.total, "
+                "best.before, best.n, best.after FROM ("
+                "  SELECT o.source_id, o.offset, COALESCE(b.n, 0) AS before, o.n, "
+                "  COALESCE(a.n, 0) AS after, "
+                "  MAX(o.n + COALESCE(b.n, 0) + COALESCE(a.n, 0)) AS total"
+                "  FROM offsets o"
+                "  LEFT JOIN offsets b ON b.source_id = o.source_id AND b.offset = o.offset - 1"
+                "  LEFT JOIN offsets a ON a.source_id = o.source_id AND a.offset = o.offset + 1"
+                "  GROUP BY o.source_id"
+                ") best JOIN sources s ON s.id = best.source_id "
+                "WHERE best.total >= ? * MAX(?, s.hashes, 1) "
+                "ORDER BY CAST(best.total AS REAL) / MAX(?, s.hashes, 1) DESC LIMIT ?",
+                (min_score, len(fingerprint), len(fingerprint), limit),
+            ).fetchall()
+            self._db.execute("DELETE FROM query")
+            self._db.execute("DELETE FROM offsets")
+            self._db.execute("DELETE FROM candidates")
+
+        found: List[Match] = []
+        for job_key, source, indexed, center, total, before, at, after in rows:
+            # The window's fullest bucket is the offset; ties go to the earliest.
+            offset = center + max((-1, before), (0, at), (1, after), key=lambda item: item[1])[0]
+            score = float(total) / max(len(fingerprint), indexed, 1)
+            found.append(Match(job_key, source, score, -frames_to_seconds(offset)))
+        return found
+
+
+_index: Optional[FingerprintIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_fingerprint_index() -> FingerprintIndex:
+    global _index
+    with _index_lock:
+        if _index is None:
+            state_dir = Path(settings.STATE_DIR).expanduser()
+            state_dir.mkdir(parents=True, exist_ok=True)
+            _index = FingerprintIndex(state_dir / "fingerprints.sqlite3")
+        return _index
@@ -2,14 +2,20 @@
 
 from __future__ import annotations
 
+import io
+from dataclasses import asdict
 from datetime import date
-from typing import Iterable, List, Optional
+from typing import Any, Dict, Iterable, Iterator, List, Optional, TextIO
 
 from opennote.adapters.types import IngestResult
 from opennote.engine.summarize import SummaryContent
 
+# Bump whenever _frontmatter or _markdown_layout changes what a note looks like;
+# `python -m opennote.rerender` then rebuilds every note from its manifest.
+TEMPLATE_VERSION = 1
 
-def _format_timestamp(seconds: float) -> str:
+
+def format_timestamp(seconds: float) -> str:
     total_seconds = int(seconds)
     hours = total_seconds // 3600
     minutes = (total_seconds % 3600) // 60
@@ -20,18 +26,31 @@ def _format_timestamp(seconds: float) -> str:
 def _format_duration(duration_seconds: Optional[float]) -> Optional[str]:
     if duration_seconds is None:
         return None
-    return _format_timestamp(duration_seconds)
+    return format_timestamp(duration_seconds)
 
 
-def _format_segments(segments: Iterable[dict]) -> str:
-    lines = []
+def _iter_segment_lines(segments: Iterable[dict]) -> Iterator[str]:
     for segment in segments:
         start = segment.get("start")
         text = segment.get("text")
         if start is None or text is None:
             continue
-        lines.append(f"[{_format_timestamp(float(start))}] {text}")
-    return "\n".join(lines).strip()
+        yield f"[{format_timestamp(float(start))}] {text}"
+
+
+def write_transcript(segments: Iterable[dict], handle: TextIO, separator: str = "") -> bool:
+    """Write the transcript lines of ``segments``; returns whether any were written."""
+    written = False
+    for line in _iter_segment_lines(segments):
+        handle.write(separator)
+        handle.write(line)
+        separator = "\n"
+        written = True
+    return written
+
+
+def _format_segments(segments: Iterable[dict]) -> str:
+    return "\n".join(_iter_segment_lines(segments)).strip()
 
 
 def _frontmatter(metadata: dict, mode: str) -> str:
@@ -67,18 +86,16 @@ def build_transcript_text(ingest_result: IngestResult) -> str:
     return transcript_text
 
 
-def build_markdown(
+def _markdown_layout(
     ingest_result: IngestResult,
     mode: str,
-    summary: Optional[SummaryContent] = None,
-) -> str:
+    summary: Optional[SummaryContent],
+) -> tuple[str, Optional[str]]:
     title = ingest_result.metadata.get("title", "Untitled")
-    transcript_text = build_transcript_text(ingest_result)
-
     frontmatter = _frontmatter(ingest_result.metadata, mode)
 
     if mode == "transcript":
-        return f"{frontmatter}\n\n# {title}\n\n{transcript_text}\n"
+        return f"{frontmatter}\n\n# {title}\n\n", "\n"
 
     if mode in {"note", "summary"}:
         summary_text = summary.summary if summary and summary.summary else "Summary unavailable."
@@ -102,12 +119,63 @@ def build_markdown(
                     "<details>",
                     "<summary>Show transcript</summary>",
                     "",
-                    transcript_text,
                     "",
-                    "</details>",
                 ]
             )
-        return "\n".join(content_lines).strip() + "\n"
+            return "\n".join(content_lines), "\n\n</details>\n"
+        return "\n".join(content_lines).strip() + "\n", None
 
     body = summary.body if summary and summary.body else "Summarization disabled."
-    return "\n".join([frontmatter, "", f"# {title}", "", body]).strip() + "\n"
+    return "\n".join([frontmatter, "", f"# {title}", "", body]).strip() + "\n", None
+
+
+def render_outputs(
+    ingest_result: IngestResult,
+    mode: str,
+    summary: Optional[SummaryContent],
+    transcript_file: Optional[TextIO],
+    markdown_file: Optional[TextIO] = None,
+) -> None:
+    head, tail = _markdown_layout(ingest_result, mode, summary)
+
+    targets = [transcript_file] if transcript_file is not None else []
+    if markdown_file is not None:
+        markdown_file.write(head)
+        if tail is not None:
+            targets.append(markdown_file)
+
+    separator = ""
+    for line in _iter_segment_lines(ingest_result.segments):
+        for target in targets:
+            target.write(separator)
+            target.write(line)
+        separator = "\n"
+    if not separator:
+        for target in targets:
+            target.write(ingest_result.raw_text)
+
+    if markdown_file is not None and tail is not None:
+        markdown_file.write(tail)
+
+
+def render_manifest(
+    ingest_result: IngestResult,
+    mode: str,
+    summary: Optional[SummaryContent],
+) -> Dict[str, Any]:
+    return {
+        "template_version": TEMPLATE_VERSION,
+        "mode": mode,
+        "metadata": dict(ingest_result.metadata),
+        "summary": asdict(summary) if summary is not None else None,
+    }
+
+
+def build_markdown(
+    ingest_result: IngestResult,
+    mode: str,
+    summary: Optional[SummaryContent] = None,
+) -> str:
+    buffer = io.StringIO()
+    render_outputs(ingest_result, mode, summary, None, buffer)
+    return buffer.getvalue()
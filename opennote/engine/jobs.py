@@ -0,0 +1,317 @@
+"""Per-source job directories with resumable stages."""
+
+from __future__ import annotations
+
+import fcntl
+import json
+import logging
+import os
+import shutil
+import time
+import uuid
+from pathlib import Path
+from typing import IO, Any, Callable, Dict, Optional, Sequence, TypeVar
+
+from config import settings
+from opennote.adapters.segments import SegmentArray
+from opennote.adapters.types import IngestResult
+from opennote.engine.checkpoints import content_key
+from opennote.output.vault_index import atomic_open
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+MANIFEST = "manifest.json"
+_LOCK = ".lock"
+
+
+def _jobs_root() -> Path:
+    return Path(settings.STATE_DIR).expanduser() / "jobs"
+
+
+def source_key(source: str) -> str:
+    path = Path(source).expanduser()
+    if path.is_file():
+        # A re-encoded or replaced file at the same path must not reuse old artifacts.
+        stat = path.stat()
+        return content_key(str(path.resolve()), str(stat.st_size), str(stat.st_mtime_ns))
+    return content_key(source)
+
+
+def _try_lock(directory: Path) -> Optional[IO]:
+    handle = (directory / _LOCK).open("a")
+    try:
+        fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        handle.close()
+        return None
+    return handle
+
+
+def _never_pause() -> None:
+    return None
+
+
+def _ignore_segments(_segments: SegmentArray) -> None:
+    return None
+
+
+class Job:
+    """A directory of stage artifacts for one source, plus a manifest.
+
+    A stage counts as done once the manifest lists it and all of its
+    artifacts exist, so a crash mid-stage just reruns that stage. The
+    directory is flock()ed while open; a second run of the same source in
+    parallel gets a private directory that is removed when it closes.
+    """
+
+    def __init__(self, directory: Path, source: str, lock: IO, private: bool = False) -> None:
+        self.directory = directory
+        self.source = source
+        self.private = private
+        # Set by admission control when a job must run with a smaller model.
+        self.whisper_model: Optional[str] = None
+        # Called between transcription windows; the scheduler parks a preempted job here.
+        self.pause_point: Callable[[], None] = _never_pause
+        # Called with the growing transcript after new segments are appended to it.
+        self.on_segments: Callable[[SegmentArray], None] = _ignore_segments
+        self._lock = lock
+        manifest_path = directory / MANIFEST
+        if manifest_path.exists():
+            with manifest_path.open("r", encoding="utf-8") as handle:
+                self.manifest: Dict[str, Any] = json.load(handle)
+        else:
+            now = time.time()
+            self.manifest = {"source": source, "created": now, "updated": now, "stages": {}}
+
+    @property
+    def key(self) -> str:
+        return self.directory.name
+
+    def artifact(self, name: str) -> Path:
+        return self.directory / name
+
+    def done(self, stage: str) -> bool:
+        entry = self.manifest["stages"].get(stage)
+        if entry is None:
+            return False
+        return all(self.artifact(name).exists() for name in entry["artifacts"])
+
+    def next_stage(self, stages: Sequence[str]) -> Optional[str]:
+        """The stage after the last completed one, or None if all are done.
+
+        Earlier stages may have had their scratch artifacts discarded, so
+        this looks for the furthest stage that is done rather than the first
+        that is not.
+        """
+        for index in range(len(stages) - 1, -1, -1):
+            if self.done(stages[index]):
+                return stages[index + 1] if index + 1 < len(stages) else None
+        return stages[0] if stages else None
+
+    def complete(self, stage: str, *artifacts: str, **info: Any) -> None:
+        now = time.time()
+        self.manifest["stages"][stage] = {"completed": now, "artifacts": list(artifacts), **info}
+        self.manifest["updated"] = now
+        self._save_manifest()
+
+    def run_stage(
+        self,
+        stage: str,
+        artifact: str,
+        produce: Callable[[Path], T],
+        load: Callable[[Path], T],
+    ) -> T:
+        """Return the stage's result, loading it from ``artifact`` if already done.
+
+        ``produce`` receives the artifact path and must write it before returning.
+        """
+        path = self.artifact(artifact)
+        if self.done(stage):
+            logger.info("Job %s: reusing %s", self.key[:12], stage)
+            return load(path)
+        started = time.perf_counter()
+        result = produce(path)
+        self.complete(stage, artifact, seconds=round(time.perf_counter() - started, 3))
+        return result
+
+    def json_stage(self, stage: str, produce: Callable[[], Any]) -> Any:
+        def write(path: Path) -> Any:
+            data = produce()
+            with atomic_open(path) as handle:
+                json.dump(data, handle, ensure_ascii=False)
+            return data
+
+        return self.run_stage(stage, f"{stage}.json", write, _read_json)
+
+    def ingest_stage(self, produce: Callable[[], IngestResult]) -> IngestResult:
+        if self.done("ingest"):
+            logger.info("Job %s: reusing ingest", self.key[:12])
+            return self.load_ingest()
+        result = produce()
+        self.save_ingest(result)
+        return result
+
+    def save_ingest(self, result: IngestResult) -> None:
+        artifacts = ["segments.bin", "metadata.json"]
+        # Transcripts are stored once, as segments; only untimed text needs raw.txt.
+        if not len(result.segments):
+            with atomic_open(self.artifact("raw.txt")) as handle:
+                handle.write(result.raw_text)
+            artifacts.insert(0, "raw.txt")
+        with atomic_open(self.artifact("segments.bin"), "wb") as handle:
+            result.segments.write(handle)
+        with atomic_open(self.artifact("metadata.json")) as handle:
+            json.dump(result.metadata, handle, ensure_ascii=False)
+        self.complete("ingest", *artifacts)
+
+    def load_ingest(self) -> IngestResult:
+        raw_path = self.artifact("raw.txt")
+        return IngestResult(
+            segments=SegmentArray.load(self.artifact("segments.bin")),
+            metadata=_read_json(self.artifact("metadata.json")),
+            raw_text=raw_path.read_text(encoding="utf-8") if raw_path.exists() else None,
+        )
+
+    def adopt(
+        self,
+        key: str,
+        stage: str,
+        convert: Callable[[Path, Path], Any] = shutil.copyfile,
+        **info: Any,
+    ) -> bool:
+        """Complete ``stage`` with that stage's artifacts from the job directory ``key``.
+
+        ``convert(source, target)`` writes each artifact; by default it is
+        copied as is. Returns False if the other job no longer has the stage.
+        """
+        directory = _jobs_root() / key
+        entry = job_stages(key).get(stage)
+        if entry is None:
+            return False
+        try:
+            for name in entry["artifacts"]:
+                convert(directory / name, self.artifact(name))
+        except OSError:
+            # Collected while we were copying.
+            return False
+        self.complete(stage, *entry["artifacts"], adopted_from=key, **info)
+        return True
+
+    def discard(self, *artifacts: str) -> None:
+        for name in artifacts:
+            self.artifact(name).unlink(missing_ok=True)
+
+    def close(self) -> None:
+        if self.private:
+            shutil.rmtree(self.directory, ignore_errors=True)
+        self._lock.close()
+
+    def __enter__(self) -> "Job":
+        return self
+
+    def __exit__(self, *_exc) -> None:
+        self.close()
+
+    def _save_manifest(self) -> None:
+        with atomic_open(self.artifact(MANIFEST)) as handle:
+            json.dump(self.manifest, handle, ensure_ascii=False, indent=2)
+
+
+def _read_json(path: Path) -> Any:
+    with path.open("r", encoding="utf-8") as handle:
+        return json.load(handle)
+
+
+def job_stages(key: str) -> Dict[str, Dict[str, Any]]:
+    """Completed stages of another job directory; empty if it was collected."""
+    directory = _jobs_root() / key
+    try:
+        stages = _read_json(directory / MANIFEST)["stages"]
+    except (OSError, ValueError, KeyError):
+        return {}
+    return {
+        stage: entry
+        for stage, entry in stages.items()
+        if all((directory / name).exists() for name in entry["artifacts"])
+    }
+
+
+def open_job(source: str) -> Job:
+    directory = _jobs_root() / source_key(source)
+    directory.mkdir(parents=True, exist_ok=True)
+    lock = _try_lock(directory)
+    if lock is not None:
+        return Job(directory, source, lock)
+
+    logger.info("Job for %s is already running; using a private directory", source)
+    private = directory.with_name(f"{directory.name}-{uuid.uuid4().hex[:8]}")
+    private.mkdir()
+    return Job(private, source, _try_lock(private), private=True)
+
+
+def _directory_size(directory: Path) -> int:
+    total = 0
+    for root, _dirs, files in os.walk(directory):
+        for name in files:
+            try:
+                total += os.stat(os.path.join(root, name)).st_size
+            except OSError:
+                pass
+    return total
+
+
+def _last_used(directory: Path) -> float:
+    manifest = directory / MANIFEST
+    return (manifest if manifest.exists() else directory).stat().st_mtime
+
+
+def collect_garbage(max_age_seconds: float, max_bytes: int) -> int:
+    """Delete job directories older than ``max_age_seconds``, then the least
+    recently used ones until the rest fit in ``max_bytes``. Jobs that are
+    currently open are skipped. Returns the number of directories removed.
+    """
+    root = _jobs_root()
+    if not root.exists():
+        return 0
+
+    now = time.time()
+    candidates = []
+    for directory in root.iterdir():
+        if directory.is_dir():
+            candidates.append((_last_used(directory), _directory_size(directory), directory))
+    candidates.sort()
+
+    total = sum(size for _used, size, _dir in candidates)
+    removed = 0
+    for last_used, size, directory in candidates:
+        if now - last_used <= max_age_seconds and total <= max_bytes:
+            continue
+        lock = _try_lock(directory)
+        if lock is None:
+            continue
+        try:
+            shutil.rmtree(directory, ignore_errors=True)
+        finally:
+            lock.close()
+        total -= size
+        removed += 1
+
+    # Map checkpoints from failed summaries are only useful for a prompt retry.
+    checkpoints = Path(settings.STATE_DIR).expanduser() / "checkpoints"
+    if checkpoints.exists():
+        for path in checkpoints.glob("*.jsonl"):
+            if now - path.stat().st_mtime > max_age_seconds:
+                path.unlink(missing_ok=True)
+
+    if removed:
+        logger.info("Removed %d stale job directories", removed)
+    return removed
+
+
+def collect_configured_garbage() -> int:
+    return collect_garbage(
+        settings.JOB_MAX_AGE_DAYS * 86400,
+        settings.JOB_MAX_TOTAL_MB * 1024 * 1024,
+    )
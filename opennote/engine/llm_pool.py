@@ -0,0 +1,198 @@
+"""Weighted pool of LLM backends with health checks and circuit breaking."""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Iterable, List, Optional, Sequence, Tuple, TypeVar
+
+import requests
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class NoHealthyBackendError(RuntimeError):
+    pass
+
+
+@dataclass
+class Backend:
+    url: str
+    weight: float = 1.0
+    outstanding: int = 0
+    consecutive_failures: int = 0
+    open_until: float = 0.0
+    total_requests: int = 0
+    total_failures: int = 0
+
+    def is_available(self, now: float) -> bool:
+        return self.open_until <= now
+
+    def load(self) -> float:
+        return (self.outstanding + 1) / self.weight
+
+
+class BackendPool:
+    """Routes each call to the least-loaded available backend.
+
+    Load is outstanding requests divided by weight. After ``failure_threshold``
+    consecutive failures a backend's circuit opens for ``cooldown_seconds``,
+    unless it is the last backend still available: it then stays in use, so
+    callers keep retrying it rather than all failing at once. Once the
+    cooldown expires the backend is tried again (half-open), and one success
+    closes the circuit. Failed calls are retried on a different backend.
+    """
+
+    def __init__(
+        self,
+        endpoints: Sequence[Tuple[str, float]],
+        failure_threshold: int = 3,
+        cooldown_seconds: float = 30.0,
+        probe_timeout: float = 3.0,
+    ) -> None:
+        if not endpoints:
+            raise ValueError("At least one LLM backend is required.")
+        self.backends = [Backend(url=url.rstrip("/"), weight=float(weight)) for url, weight in endpoints]
+        self.failure_threshold = failure_threshold
+        self.cooldown_seconds = cooldown_seconds
+        self.probe_timeout = probe_timeout
+        self._lock = threading.Lock()
+        self._health_thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def acquire(self, exclude: Iterable[str] = ()) -> Backend:
+        excluded = set(exclude)
+        with self._lock:
+            now = time.monotonic()
+            candidates = [
+                backend
+                for backend in self.backends
+                if backend.url not in excluded and backend.is_available(now)
+            ]
+            if not candidates:
+                raise NoHealthyBackendError(
+                    "No healthy LLM backends: "
+                    + ", ".join(backend.url for backend in self.backends)
+                )
+            backend = min(candidates, key=Backend.load)
+            backend.outstanding += 1
+            backend.total_requests += 1
+            return backend
+
+    def release(self, backend: Backend, ok: bool) -> None:
+        with self._lock:
+            backend.outstanding -= 1
+            self._record(backend, ok)
+
+    def _record(self, backend: Backend, ok: bool) -> None:
+        if ok:
+            if backend.open_until:
+                logger.info("LLM backend %s recovered", backend.url)
+            backend.consecutive_failures = 0
+            backend.open_until = 0.0
+            return
+        backend.consecutive_failures += 1
+        backend.total_failures += 1
+        if backend.consecutive_failures >= self.failure_threshold:
+            now = time.monotonic()
+            if not any(
+                other is not backend and other.is_available(now) for other in self.backends
+            ):
+                return
+            backend.open_until = now + self.cooldown_seconds
+            logger.warning(
+                "LLM backend %s circuit open for %.0fs after %d failures",
+                backend.url,
+                self.cooldown_seconds,
+                backend.consecutive_failures,
+            )
+
+    def call(self, fn: Callable[[str], T], attempts: Optional[int] = None) -> T:
+        attempts = attempts or len(self.backends)
+        tried: List[str] = []
+        last_error: Optional[Exception] = None
+        for _ in range(attempts):
+            try:
+                backend = self.acquire(exclude=tried)
+            except NoHealthyBackendError:
+                if last_error is not None:
+                    break
+                raise
+            tried.append(backend.url)
+            try:
+                result = fn(backend.url)
+            except Exception as exc:
+                self.release(backend, ok=False)
+                last_error = exc
+                logger.warning("LLM call on %s failed: %s", backend.url, exc)
+                continue
+            self.release(backend, ok=True)
+            return result
+        if last_error is None:
+            raise NoHealthyBackendError("No LLM backend attempts were made.")
+        raise last_error
+
+    def probe(self, backend: Backend) -> bool:
+        try:
+            response = requests.get(f"{backend.url}/api/tags", timeout=self.probe_timeout)
+            response.raise_for_status()
+        except Exception:
+            ok = False
+        else:
+            ok = True
+        with self._lock:
+            # A failing probe must not extend an already-open circuit.
+            if ok or backend.is_available(time.monotonic()):
+                self._record(backend, ok)
+        return ok
+
+    def probe_all(self) -> List[bool]:
+        return [self.probe(backend) for backend in self.backends]
+
+    def start_health_checks(self, interval_seconds: float) -> None:
+        if self._health_thread is not None or interval_seconds <= 0:
+            return
+
+        def loop() -> None:
+            while not self._stop.wait(interval_seconds):
+                self.probe_all()
+
+        self._health_thread = threading.Thread(target=loop, name="llm-health", daemon=True)
+        self._health_thread.start()
+
+    def stop_health_checks(self) -> None:
+        self._stop.set()
+
+
+def _configured_endpoints() -> List[Tuple[str, float]]:
+    endpoints = []
+    for entry in settings.OLLAMA_BACKENDS or [settings.OLLAMA_URL]:
+        if isinstance(entry, str):
+            endpoints.append((entry, 1.0))
+        else:
+            url, weight = entry
+            endpoints.append((url, float(weight)))
+    return endpoints
+
+
+_pool: Optional[BackendPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> BackendPool:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = BackendPool(
+                _configured_endpoints(),
+                failure_threshold=settings.OLLAMA_FAILURE_THRESHOLD,
+                cooldown_seconds=settings.OLLAMA_CIRCUIT_COOLDOWN_SECONDS,
+            )
+            _pool.start_health_checks(settings.OLLAMA_HEALTH_CHECK_SECONDS)
+        return _pool
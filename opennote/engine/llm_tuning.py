@@ -0,0 +1,64 @@
+"""Per-model summarization settings measured by ``python -m opennote.tune_llm``."""
+
+from __future__ import annotations
+
+import json
+import threading
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+from config import settings
+from opennote.output.vault_index import atomic_open
+
+# Keys a tuning entry may set; each overrides the setting of the same meaning.
+TUNABLE = ("chunk_chars", "map_concurrency", "num_ctx", "num_predict")
+
+_cache: Dict[Path, Tuple[int, Dict[str, Any]]] = {}
+_cache_lock = threading.Lock()
+
+
+def tuning_path() -> Path:
+    return Path(settings.STATE_DIR).expanduser() / "llm_tuning.json"
+
+
+def _read(path: Path) -> Dict[str, Any]:
+    try:
+        mtime = path.stat().st_mtime_ns
+    except OSError:
+        return {}
+    with _cache_lock:
+        cached = _cache.get(path)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+    try:
+        with path.open("r", encoding="utf-8") as handle:
+            data = json.load(handle)
+    except (OSError, ValueError):
+        return {}
+    with _cache_lock:
+        _cache[path] = (mtime, data)
+    return data
+
+
+def load_tuning(model: str) -> Dict[str, int]:
+    """Tuned values for ``model``; empty when tuning is off or the model was never tuned."""
+    if not settings.ENABLE_LLM_TUNING:
+        return {}
+    entry = _read(tuning_path()).get(model) or {}
+    return {key: entry[key] for key in TUNABLE if isinstance(entry.get(key), int)}
+
+
+def save_tuning(
+    model: str,
+    values: Dict[str, Optional[int]],
+    report: Dict[str, Any],
+    path: Optional[Path] = None,
+) -> Path:
+    """Store ``values`` for ``model``, keeping the entries of other models."""
+    path = path or tuning_path()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    data = dict(_read(path))
+    data[model] = {**{key: values.get(key) for key in TUNABLE}, "report": report}
+    with atomic_open(path) as handle:
+        json.dump(data, handle, indent=2)
+    return path
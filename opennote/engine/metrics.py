@@ -0,0 +1,41 @@
+"""Per-job metrics collected while a command runs."""
+
+from __future__ import annotations
+
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator
+
+
+class JobMetrics:
+    def __init__(self, job: str) -> None:
+        self.job = job
+        self._lock = threading.Lock()
+        self._values: Dict[str, float | int | str] = {}
+
+    def record(self, name: str, value: float | int | str) -> None:
+        with self._lock:
+            self._values[name] = value
+
+    def add(self, name: str, value: float | int) -> None:
+        with self._lock:
+            self._values[name] = self._values.get(name, 0) + value
+
+    @contextmanager
+    def timed(self, stage: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(f"{stage}_seconds", time.perf_counter() - started)
+
+    def snapshot(self) -> Dict[str, float | int | str]:
+        with self._lock:
+            return dict(self._values)
+
+    def format(self) -> str:
+        parts = []
+        for name, value in sorted(self.snapshot().items()):
+            parts.append(f"{name}={value:.3f}" if isinstance(value, float) else f"{name}={value}")
+        return " ".join(parts)
@@ -0,0 +1,209 @@
+"""Ollama client with model keep-alive, context sizing and latency tracking."""
+
+from __future__ import annotations
+
+import json
+import logging
+import math
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Deque, Dict, List, Optional
+
+import requests
+
+from config import settings
+from opennote.engine.llm_pool import BackendPool, get_pool
+from opennote.engine.metrics import JobMetrics
+
+logger = logging.getLogger(__name__)
+
+# Rough English average for Llama-family tokenizers; only used to size num_ctx.
+CHARS_PER_TOKEN = 4
+# Room num_ctx leaves for an answer without a num_predict cap; Ollama shifts the context past it.
+UNCAPPED_ANSWER_TOKENS = 2048
+
+
+@dataclass(frozen=True)
+class GenerationStats:
+    ttft_seconds: float
+    total_seconds: float
+    load_seconds: float
+    prompt_tokens: int
+    prompt_eval_seconds: float
+    eval_tokens: int
+    eval_seconds: float
+    # Generation stopped at num_predict rather than at the end of the answer.
+    truncated: bool = False
+
+    @property
+    def tokens_per_second(self) -> float:
+        return self.eval_tokens / self.eval_seconds if self.eval_seconds else 0.0
+
+
+class OllamaClient:
+    def __init__(
+        self,
+        pool: BackendPool,
+        model: str,
+        keep_alive: str | int,
+        num_predict: int,
+        timeout: float = 180,
+    ) -> None:
+        self.pool = pool
+        self.model = model
+        self.keep_alive = keep_alive
+        self.num_predict = num_predict
+        self.timeout = timeout
+        self._session = requests.Session()
+        self._lock = threading.Lock()
+        self._recent: Deque[GenerationStats] = deque(maxlen=256)
+
+    def warm_up(self) -> Dict[str, float]:
+        loaded = {}
+        for backend in self.pool.backends:
+            started = time.perf_counter()
+            try:
+                # A generate request without a prompt only loads the model and pins it for keep_alive.
+                response = self._session.post(
+                    f"{backend.url}/api/generate",
+                    json={"model": self.model, "keep_alive": self.keep_alive},
+                    timeout=self.timeout,
+                )
+                response.raise_for_status()
+            except Exception as exc:
+                logger.warning("Ollama warm-up failed on %s: %s", backend.url, exc)
+                continue
+            loaded[backend.url] = time.perf_counter() - started
+        return loaded
+
+    def context_size(self, prompt_chars: int, num_predict: Optional[int] = None) -> int:
+        predict = self.num_predict if num_predict is None else num_predict
+        if predict < 0:
+            predict = UNCAPPED_ANSWER_TOKENS
+        needed = math.ceil(prompt_chars / CHARS_PER_TOKEN) + predict + 64
+        step = settings.OLLAMA_NUM_CTX_STEP
+        return max(step, math.ceil(needed / step) * step)
+
+    def generate(
+        self,
+        prompt: str,
+        system: Optional[str] = None,
+        num_ctx: Optional[int] = None,
+        num_predict: Optional[int] = None,
+        metrics: Optional[JobMetrics] = None,
+    ) -> str:
+        predict = self.num_predict if num_predict is None else num_predict
+        payload = {
+            "model": self.model,
+            "prompt": prompt,
+            "stream": True,
+            "keep_alive": self.keep_alive,
+            "options": {
+                "num_ctx": num_ctx or self.context_size(len(prompt) + len(system or ""), predict),
+                "num_predict": predict,
+            },
+        }
+        if system:
+            payload["system"] = system
+        return self.pool.call(lambda url: self._generate_on(url, payload, metrics))
+
+    def _generate_on(self, base_url: str, payload: dict, metrics: Optional[JobMetrics]) -> str:
+        started = time.perf_counter()
+        first_token_at: Optional[float] = None
+        parts: List[str] = []
+        final: dict = {}
+        with self._session.post(
+            f"{base_url}/api/generate",
+            json=payload,
+            stream=True,
+            timeout=self.timeout,
+        ) as response:
+            response.raise_for_status()
+            for line in response.iter_lines(chunk_size=None):
+                if not line:
+                    continue
+                message = json.loads(line)
+                if message.get("error"):
+                    raise RuntimeError(f"Ollama error: {message['error']}")
+                token = message.get("response", "")
+                if token and first_token_at is None:
+                    first_token_at = time.perf_counter()
+                parts.append(token)
+                if message.get("done"):
+                    final = message
+                    break
+
+        finished = time.perf_counter()
+        stats = GenerationStats(
+            ttft_seconds=(first_token_at or finished) - started,
+            total_seconds=finished - started,
+            load_seconds=final.get("load_duration", 0) / 1e9,
+            prompt_tokens=final.get("prompt_eval_count", 0),
+            prompt_eval_seconds=final.get("prompt_eval_duration", 0) / 1e9,
+            eval_tokens=final.get("eval_count", 0),
+            eval_seconds=final.get("eval_duration", 0) / 1e9,
+            truncated=_hit_num_predict(final, payload["options"]["num_predict"]),
+        )
+        self._record(base_url, stats, metrics)
+        return "".join(parts).strip()
+
+    def _record(self, base_url: str, stats: GenerationStats, metrics: Optional[JobMetrics]) -> None:
+        with self._lock:
+            self._recent.append(stats)
+        logger.debug(
+            "Ollama call on %s: ttft=%.3fs total=%.3fs load=%.3fs prompt_tokens=%d eval_tokens=%d (%.1f tok/s)",
+            base_url,
+            stats.ttft_seconds,
+            stats.total_seconds,
+            stats.load_seconds,
+            stats.prompt_tokens,
+            stats.eval_tokens,
+            stats.tokens_per_second,
+        )
+        if stats.truncated:
+            logger.warning(
+                "Ollama output on %s stopped at num_predict after %d tokens; it is cut off",
+                base_url,
+                stats.eval_tokens,
+            )
+        if metrics is not None:
+            metrics.add("llm_calls", 1)
+            metrics.add("llm_ttft_seconds", stats.ttft_seconds)
+            metrics.add("llm_seconds", stats.total_seconds)
+            metrics.add("llm_load_seconds", stats.load_seconds)
+            metrics.add("llm_prompt_tokens", stats.prompt_tokens)
+            metrics.add("llm_eval_tokens", stats.eval_tokens)
+            metrics.add("llm_eval_seconds", stats.eval_seconds)
+            if stats.truncated:
+                metrics.add("llm_truncated", 1)
+
+    def recent_stats(self) -> List[GenerationStats]:
+        with self._lock:
+            return list(self._recent)
+
+
+def _hit_num_predict(final: dict, num_predict: int) -> bool:
+    if "done_reason" in final:
+        return final["done_reason"] == "length"
+    # Older servers don't report why they stopped; a negative num_predict has no limit.
+    return 0 <= num_predict <= final.get("eval_count", 0)
+
+
+_client: Optional[OllamaClient] = None
+_client_lock = threading.Lock()
+
+
+def get_client() -> OllamaClient:
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = OllamaClient(
+                pool=get_pool(),
+                model=settings.OLLAMA_MODEL,
+                keep_alive=settings.OLLAMA_KEEP_ALIVE,
+                # Map calls pass their own cap; everything else may run to the end.
+                num_predict=settings.OLLAMA_REDUCE_NUM_PREDICT,
+            )
+        return _client
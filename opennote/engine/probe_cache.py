@@ -0,0 +1,126 @@
+"""Persistent cache of ffprobe results keyed by (path, size, mtime)."""
+
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+import subprocess
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+from config import settings
+
+_SHOW_ENTRIES = (
+    "format=duration,format_name:format_tags=title"
+    ":stream=index,codec_type,codec_name,sample_rate,channels"
+)
+# What faster-whisper decodes audio to; sources already in this shape need no ffmpeg pass.
+_WHISPER_SAMPLE_RATE = 16000
+_WHISPER_CODECS = {"pcm_s16le", "flac"}
+
+
+def run_ffprobe(path: Path) -> dict:
+    completed = subprocess.run(
+        ["ffprobe", "-v", "error", "-show_entries", _SHOW_ENTRIES, "-of", "json", str(path)],
+        capture_output=True,
+        text=True,
+        check=False,
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(
+            f"ffprobe failed: {completed.stderr.strip() or 'unknown error'}"
+        )
+    if not completed.stdout:
+        raise RuntimeError("ffprobe returned no output; ensure ffmpeg is installed.")
+    return json.loads(completed.stdout)
+
+
+def is_whisper_ready(probe_data: dict) -> bool:
+    """True for a single 16 kHz mono PCM/FLAC audio stream with nothing else in the file."""
+    streams = probe_data.get("streams")
+    if not isinstance(streams, list) or len(streams) != 1:
+        return False
+    stream = streams[0]
+    try:
+        sample_rate = int(stream.get("sample_rate") or 0)
+    except ValueError:
+        return False
+    return (
+        stream.get("codec_type") == "audio"
+        and stream.get("codec_name") in _WHISPER_CODECS
+        and sample_rate == _WHISPER_SAMPLE_RATE
+        and stream.get("channels") == 1
+    )
+
+
+class ProbeCache:
+    """ffprobe output per file, reused until the file's size or mtime changes.
+
+    Entries are keyed by resolved path, so a replaced file overwrites its old
+    entry. Beyond ``max_entries`` the least recently used entries are dropped.
+    """
+
+    def __init__(self, db_path: Path, max_entries: int) -> None:
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(db_path), check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS probes ("
+            "path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, used REAL, data TEXT)"
+        )
+
+    def get(self, path: Path) -> Optional[dict]:
+        stat = path.stat()
+        with self._lock:
+            row = self._db.execute(
+                "SELECT data FROM probes WHERE path = ? AND size = ? AND mtime_ns = ?",
+                (str(path), stat.st_size, stat.st_mtime_ns),
+            ).fetchone()
+            if row is None:
+                return None
+            with self._db:
+                self._db.execute(
+                    "UPDATE probes SET used = ? WHERE path = ?", (time.time(), str(path))
+                )
+        return json.loads(row[0])
+
+    def put(self, path: Path, probe_data: dict) -> None:
+        stat = path.stat()
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO probes VALUES (?, ?, ?, ?, ?)",
+                (str(path), stat.st_size, stat.st_mtime_ns, time.time(), json.dumps(probe_data)),
+            )
+            self._db.execute(
+                "DELETE FROM probes WHERE path NOT IN "
+                "(SELECT path FROM probes ORDER BY used DESC LIMIT ?)",
+                (self.max_entries,),
+            )
+
+
+_cache: Optional[ProbeCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_probe_cache() -> ProbeCache:
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            state_dir = Path(settings.STATE_DIR).expanduser()
+            state_dir.mkdir(parents=True, exist_ok=True)
+            _cache = ProbeCache(state_dir / "probes.sqlite3", settings.PROBE_CACHE_MAX_ENTRIES)
+        return _cache
+
+
+def probe_media(path: Path) -> dict:
+    """ffprobe ``path`` (format and stream details), answering from the cache when possible."""
+    path = Path(os.path.realpath(path))
+    cache = get_probe_cache()
+    probe_data = cache.get(path)
+    if probe_data is None:
+        probe_data = run_ffprobe(path)
+        cache.put(path, probe_data)
+    return probe_data
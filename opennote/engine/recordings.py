@@ -0,0 +1,210 @@
+"""How far local recordings that are still being written have been transcribed.
+
+OBS captures and livestream archives grow while the bot is asked about them.
+For each local media path the store keeps the transcript of the last run,
+the file size it covered and hashes of blocks sampled from that size. If
+the file has since grown and the sampled blocks are unchanged, only the
+audio after the last committed segment needs transcribing.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import shutil
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+
+from config import settings
+from opennote.adapters.segments import SegmentArray
+from opennote.engine.checkpoints import content_key
+from opennote.output.vault_index import atomic_open
+
+if TYPE_CHECKING:
+    from opennote.output.writer import OutputPaths
+
+_SAMPLE_BYTES = 4096
+_SAMPLES = 16
+# Containers rewrite their header when recording stops, and a growing file's last
+# bytes may be a partly written packet; neither is part of the stable prefix.
+_SKIP_BYTES = 64 * 1024
+
+
+@dataclass(frozen=True)
+class Resume:
+    # Committed segments, which the rest of the transcript is appended to.
+    segments: SegmentArray
+    # Where to start decoding: the start of the first segment to redo.
+    resume_seconds: float
+
+
+def _sample_offsets(size: int) -> List[int]:
+    low, high = _SKIP_BYTES, size - _SKIP_BYTES - _SAMPLE_BYTES
+    if high <= low:
+        return []
+    return [low + (high - low) * index // (_SAMPLES - 1) for index in range(_SAMPLES)]
+
+
+def _sample_hashes(path: Path, offsets: List[int]) -> List[str]:
+    hashes = []
+    with path.open("rb") as handle:
+        for offset in offsets:
+            handle.seek(offset)
+            hashes.append(hashlib.sha1(handle.read(_SAMPLE_BYTES)).hexdigest())
+    return hashes
+
+
+class RecordingStore:
+    """Per-path transcription progress under ``root``, one directory per path.
+
+    Each directory holds ``state.json`` and the transcript as ``segments.bin``,
+    and it is where summaries of the recording keep their map checkpoints.
+    Only paths modified within ``recent_seconds`` start being followed, so a
+    finished file is not copied here, and only the ``max_entries`` most
+    recently used paths are kept.
+    """
+
+    def __init__(self, root: Path, max_entries: int, recent_seconds: float = 600) -> None:
+        self.root = root
+        self.max_entries = max_entries
+        self.recent_seconds = recent_seconds
+        self._lock = threading.Lock()
+
+    def directory(self, path: Path) -> Path:
+        return self.root / content_key(str(path))
+
+    def follows(self, path: Path) -> bool:
+        """Whether ``path`` may still be growing: recently modified, or followed already."""
+        try:
+            if time.time() - path.stat().st_mtime <= self.recent_seconds:
+                return True
+        except OSError:
+            return False
+        return (self.directory(path) / "state.json").exists()
+
+    def _read(self, path: Path) -> Optional[Dict[str, Any]]:
+        try:
+            with (self.directory(path) / "state.json").open("r", encoding="utf-8") as handle:
+                return json.load(handle)
+        except (OSError, ValueError):
+            return None
+
+    def _write(self, path: Path, state: Dict[str, Any]) -> None:
+        state["used"] = time.time()
+        with atomic_open(self.directory(path) / "state.json") as handle:
+            json.dump(state, handle)
+
+    @staticmethod
+    def _same_prefix(state: Dict[str, Any], path: Path) -> bool:
+        """Whether ``path`` still starts with the bytes ``state`` was recorded from."""
+        try:
+            if path.stat().st_size < state["size"]:
+                return False
+            return _sample_hashes(path, state["offsets"]) == state["hashes"]
+        except (OSError, KeyError):
+            return False
+
+    def resume(self, path: Path) -> Optional[Resume]:
+        """Where to continue transcribing ``path``, or None to transcribe it from the start."""
+        with self._lock:
+            state = self._read(path)
+            if state is None or not state.get("offsets") or not self._same_prefix(state, path):
+                return None
+            try:
+                saved = SegmentArray.load(self.directory(path) / "segments.bin")
+            except (OSError, ValueError):
+                return None
+        # The last segment may have been cut off where the file ended; redo it.
+        keep = len(saved) - 1
+        if keep < 1:
+            return None
+        segments = SegmentArray(capacity=keep + 64)
+        for index in range(keep):
+            segments.append(float(saved.starts[index]), float(saved.ends[index]), saved.text(index))
+        return Resume(segments, float(saved.starts[keep]))
+
+    def record(self, path: Path, segments: SegmentArray, job_key: str, resumed: bool) -> None:
+        """Store ``segments`` as the transcript of ``path`` at its current size."""
+        size = path.stat().st_size
+        offsets = _sample_offsets(size)
+        hashes = _sample_hashes(path, offsets)
+        directory = self.directory(path)
+        directory.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            previous = self._read(path)
+            outputs: Dict[str, Any] = {}
+            # Otherwise a different file now lives at this path and gets new vault files.
+            if previous is not None and self._same_prefix(previous, path):
+                outputs = previous.get("outputs", {})
+                if previous.get("job_key") == job_key:
+                    resumed = resumed or previous.get("resumed", False)
+            with atomic_open(directory / "segments.bin", "wb") as handle:
+                segments.write(handle)
+            self._write(
+                path,
+                {
+                    "path": str(path),
+                    "size": size,
+                    "offsets": offsets,
+                    "hashes": hashes,
+                    "job_key": job_key,
+                    "resumed": bool(resumed),
+                    "outputs": outputs,
+                },
+            )
+        self.prune()
+
+    def outputs(self, path: Path, mode: str, job_key: str) -> Optional[OutputPaths]:
+        """The vault files of ``mode`` to extend, if ``job_key`` continued an earlier transcript."""
+        with self._lock:
+            state = self._read(path)
+        if state is None or state.get("job_key") != job_key or not state.get("resumed"):
+            return None
+        entry = state.get("outputs", {}).get(mode)
+        if not entry:
+            return None
+        # The bot loads the writer lazily, through the registry.
+        from opennote.output.writer import OutputPaths
+
+        return OutputPaths.from_dict(entry)
+
+    def remember_outputs(self, path: Path, mode: str, outputs: OutputPaths) -> None:
+        with self._lock:
+            state = self._read(path)
+            if state is None:
+                return
+            state.setdefault("outputs", {})[mode] = outputs.to_dict()
+            self._write(path, state)
+
+    def prune(self) -> None:
+        with self._lock:
+            entries = []
+            for directory in self.root.iterdir() if self.root.is_dir() else []:
+                try:
+                    state = json.loads((directory / "state.json").read_text(encoding="utf-8"))
+                    used = float(state["used"])
+                except (OSError, ValueError, KeyError):
+                    used = 0.0
+                entries.append((used, directory))
+            entries.sort(reverse=True)
+            for _used, directory in entries[self.max_entries :]:
+                shutil.rmtree(directory, ignore_errors=True)
+
+
+_store: Optional[RecordingStore] = None
+_store_lock = threading.Lock()
+
+
+def get_recordings() -> RecordingStore:
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = RecordingStore(
+                Path(settings.STATE_DIR).expanduser() / "recordings",
+                settings.INCREMENTAL_MAX_RECORDINGS,
+                settings.INCREMENTAL_RECENT_SECONDS,
+            )
+        return _store
@@ -0,0 +1,57 @@
+"""Answer questions from the vector index with a single LLM call."""
+
+from __future__ import annotations
+
+import textwrap
+from dataclasses import dataclass
+from typing import Callable, List
+
+from opennote.engine.embeddings import EmbedFn, embed_texts
+from opennote.engine.format import format_timestamp
+from opennote.engine.ollama import get_client
+from opennote.output.vector_index import RetrievedChunk, get_vector_index
+
+
+@dataclass(frozen=True)
+class Answer:
+    text: str
+    sources: List[RetrievedChunk]
+
+
+def _source_label(chunk: RetrievedChunk) -> str:
+    if chunk.start_seconds is None:
+        return chunk.title
+    return f"{chunk.title} [{format_timestamp(chunk.start_seconds)}]"
+
+
+def _generate(prompt: str) -> str:
+    # The client's default num_predict lets an answer run to its end.
+    return get_client().generate(prompt)
+
+
+def answer_question(
+    question: str,
+    k: int,
+    embed: EmbedFn = embed_texts,
+    generate: Callable[[str], str] = _generate,
+) -> Answer:
+    query_vector = embed([question])[0]
+    chunks = get_vector_index().search(query_vector, k)
+    if not chunks:
+        return Answer(text="No indexed sources to answer from yet.", sources=[])
+
+    excerpts = "\n\n".join(
+        f"[{number}] {_source_label(chunk)}\n{chunk.text}" for number, chunk in enumerate(chunks, 1)
+    )
+    prompt = textwrap.dedent(
+        """
+        Answer the question using only the numbered excerpts below. Cite excerpts as [n].
+        If the excerpts do not contain the answer, say so.
+
+        Question: {question}
+
+        Excerpts:
+        {excerpts}
+        """
+    ).strip().format(question=question, excerpts=excerpts)
+    return Answer(text=generate(prompt), sources=chunks)
@@ -0,0 +1,244 @@
+"""Weighted fair scheduling of jobs across chats."""
+
+from __future__ import annotations
+
+import asyncio
+import itertools
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, List, Mapping, Optional, Tuple
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+StatusCallback = Callable[[str], Awaitable[None]]
+
+
+def _nothing() -> None:
+    return None
+
+
+@dataclass(eq=False)
+class Lease:
+    """A job's claim on one of the scheduler's run slots."""
+
+    id: int
+    chat_id: int
+    interactive: bool
+    start_tag: float
+    scheduler: "FairScheduler"
+    queued_seconds: float = 0.0
+    paused_seconds: float = 0.0
+    pauses: int = 0
+    # Set by the scheduler when an interactive job needs this lease's slot.
+    preempt: bool = False
+    # Called from the worker thread when the job parks (before its slot is handed
+    # on) and when it resumes; admission control suspends the job's ticket here.
+    on_pause: Callable[[], None] = _nothing
+    on_resume: Callable[[], None] = _nothing
+    _resume: threading.Event = field(default_factory=threading.Event)
+
+    def pause_point(self) -> None:
+        """Called by worker threads between transcription windows; parks here if preempted."""
+        self.scheduler._pause_point(self)
+
+    def describe(self) -> str:
+        kind = "interactive" if self.interactive else "bulk"
+        text = f"{kind}, queued {self.queued_seconds:.1f}s"
+        if self.pauses:
+            text += f", paused {self.pauses}x for {self.paused_seconds:.1f}s"
+        return text
+
+
+class FairScheduler:
+    """Start-time fair queuing of jobs keyed by chat, with preemption of bulk work.
+
+    Each job is one unit of work, divided by its chat's weight. A chat that
+    queues 40 items gets start tags far in the virtual future, and a chat that
+    shows up later starts at the current virtual time, so it is served next.
+    A job is *interactive* while it is its chat's only job; once the chat
+    queues another, all of that chat's jobs count as bulk.
+    If no slot is free, an interactive job asks a running bulk job to pause.
+    The bulk job parks at its next ``pause_point`` (a window boundary) and
+    resumes once a slot frees up again.
+
+    At most ``max_active`` jobs run at once and at most ``per_chat_limit``
+    per chat. Paused jobs still count against their chat's limit, because
+    they keep their memory.
+    """
+
+    def __init__(
+        self,
+        max_active: int,
+        per_chat_limit: int,
+        weights: Optional[Mapping[int, float]] = None,
+    ) -> None:
+        self.max_active = max(1, max_active)
+        self.per_chat_limit = max(1, per_chat_limit)
+        self.weights = dict(weights or {})
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._virtual_time = 0.0
+        self._last_finish: Dict[int, float] = {}
+        self._waiting: List[Tuple[Lease, asyncio.Future, asyncio.AbstractEventLoop]] = []
+        self._running: List[Lease] = []
+        self._paused: List[Lease] = []
+        self._active_per_chat: Dict[int, int] = {}
+
+    def _outstanding(self, chat_id: int) -> int:
+        waiting = sum(1 for lease, _future, _loop in self._waiting if lease.chat_id == chat_id)
+        return waiting + self._active_per_chat.get(chat_id, 0)
+
+    def _leases_of(self, chat_id: int) -> List[Lease]:
+        leases = [lease for lease, _future, _loop in self._waiting]
+        return [lease for lease in leases + self._running + self._paused if lease.chat_id == chat_id]
+
+    @staticmethod
+    def _priority(lease: Lease) -> Tuple[bool, float, int]:
+        return (not lease.interactive, lease.start_tag, lease.id)
+
+    def _dispatch(self) -> None:
+        """Hand free slots to the best paused or waiting leases; call with the lock held."""
+        while True:
+            startable = [
+                entry
+                for entry in self._waiting
+                if self._active_per_chat.get(entry[0].chat_id, 0) < self.per_chat_limit
+            ]
+            candidates = self._paused + [lease for lease, _future, _loop in startable]
+            if not candidates:
+                return
+            best = min(candidates, key=self._priority)
+
+            if len(self._running) >= self.max_active:
+                self._request_preemption(candidates)
+                return
+
+            self._running.append(best)
+            self._virtual_time = max(self._virtual_time, best.start_tag)
+            if best in self._paused:
+                self._paused.remove(best)
+                best._resume.set()
+                continue
+            for entry in startable:
+                if entry[0] is best:
+                    self._waiting.remove(entry)
+                    _lease, future, loop = entry
+                    loop.call_soon_threadsafe(_wake, future)
+                    break
+            self._active_per_chat[best.chat_id] = self._active_per_chat.get(best.chat_id, 0) + 1
+
+    def _request_preemption(self, candidates: List[Lease]) -> None:
+        interactive = sum(1 for lease in candidates if lease.interactive)
+        pending = sum(1 for lease in self._running if lease.preempt)
+        victims = sorted(
+            (lease for lease in self._running if not lease.interactive and not lease.preempt),
+            key=self._priority,
+            reverse=True,
+        )
+        for victim in victims[: max(0, interactive - pending)]:
+            logger.info("Preempting job %d of chat %d", victim.id, victim.chat_id)
+            victim.preempt = True
+
+    async def acquire(self, chat_id: int, on_status: Optional[StatusCallback] = None) -> Lease:
+        loop = asyncio.get_running_loop()
+        future: asyncio.Future = loop.create_future()
+        started = time.monotonic()
+        with self._lock:
+            start_tag = max(self._virtual_time, self._last_finish.get(chat_id, 0.0))
+            self._last_finish[chat_id] = start_tag + 1.0 / self.weights.get(chat_id, 1.0)
+            interactive = self._outstanding(chat_id) == 0
+            if not interactive:
+                # A second job turns the chat's earlier ones into bulk work as well.
+                for other in self._leases_of(chat_id):
+                    other.interactive = False
+            lease = Lease(
+                id=next(self._ids),
+                chat_id=chat_id,
+                interactive=interactive,
+                start_tag=start_tag,
+                scheduler=self,
+            )
+            self._waiting.append((lease, future, loop))
+            self._dispatch()
+            queued = lease not in self._running
+            running = len(self._running)
+            ahead = len(self._waiting) - 1
+
+        try:
+            if queued and on_status is not None:
+                await on_status(f"Queued: {running} job(s) running, up to {ahead} waiting ahead.")
+            await future
+        except BaseException:
+            # Cancelled while queued, or after the slot was granted but before we woke up.
+            with self._lock:
+                granted = lease in self._running
+                self._waiting = [entry for entry in self._waiting if entry[0] is not lease]
+            if granted:
+                self.release(lease)
+            raise
+
+        lease.queued_seconds = time.monotonic() - started
+        return lease
+
+    def release(self, lease: Lease) -> None:
+        with self._lock:
+            if lease in self._running:
+                self._running.remove(lease)
+            elif lease in self._paused:
+                self._paused.remove(lease)
+            else:
+                return
+            remaining = self._active_per_chat.get(lease.chat_id, 0) - 1
+            if remaining > 0:
+                self._active_per_chat[lease.chat_id] = remaining
+            else:
+                self._active_per_chat.pop(lease.chat_id, None)
+                if (
+                    self._outstanding(lease.chat_id) == 0
+                    and self._last_finish.get(lease.chat_id, 0.0) <= self._virtual_time
+                ):
+                    self._last_finish.pop(lease.chat_id, None)
+            self._dispatch()
+
+    def _pause_point(self, lease: Lease) -> None:
+        with self._lock:
+            if not lease.preempt:
+                return
+            lease.preempt = False
+            if lease not in self._running:
+                return
+            self._running.remove(lease)
+            self._paused.append(lease)
+            lease._resume.clear()
+            lease.on_pause()
+            self._dispatch()
+        started = time.monotonic()
+        lease._resume.wait()
+        lease.on_resume()
+        lease.pauses += 1
+        lease.paused_seconds += time.monotonic() - started
+
+
+def _wake(future: asyncio.Future) -> None:
+    if not future.done():
+        future.set_result(None)
+
+
+_scheduler: Optional[FairScheduler] = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler() -> FairScheduler:
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = FairScheduler(
+                max_active=settings.SCHEDULER_MAX_ACTIVE_JOBS,
+                per_chat_limit=settings.SCHEDULER_PER_CHAT_LIMIT,
+                weights=settings.SCHEDULER_CHAT_WEIGHTS,
+            )
+        return _scheduler
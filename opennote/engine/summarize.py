@@ -2,16 +2,45 @@
 
 from __future__ import annotations
 
+import logging
+import queue
+import random
 import re
 import textwrap
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
 from dataclasses import dataclass
-from typing import Iterable, List, Optional
-
-import requests
+from pathlib import Path
+from typing import Callable, Deque, Iterable, Iterator, List, Optional, Tuple, TypeVar, Union
 
 from config import settings
+from opennote.adapters.segments import SegmentArray
+from opennote.engine.checkpoints import (
+    LinesDigest,
+    MapCheckpoint,
+    content_key,
+    lines_key,
+    map_checkpoint,
+)
+from opennote.engine.extractive import extract_text, rank_sentences, split_sentences
+from opennote.engine.llm_tuning import load_tuning
+from opennote.engine.metrics import JobMetrics
+from opennote.engine.ollama import get_client
 from opennote.engine.prompts import prompt_for_mode
 
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Plain text, or transcript segments read one line at a time (joined by newlines).
+TextSource = Union[str, SegmentArray]
+
+MAP_SYSTEM_PROMPT = (
+    "Summarize the following transcript chunk in 3-5 sentences and include 3 bullet takeaways."
+)
+
 
 @dataclass(frozen=True)
 class SummaryContent:
@@ -20,40 +49,137 @@ class SummaryContent:
     body: Optional[str]
 
 
-def _chunk_text(text: str, max_chars: int = 4000) -> Iterable[str]:
-    start = 0
-    while start < len(text):
-        yield text[start : start + max_chars]
-        start += max_chars
+def _lines(source: TextSource) -> Iterable[str]:
+    return [source] if isinstance(source, str) else source.texts()
+
+
+def _as_text(source: TextSource) -> str:
+    return source if isinstance(source, str) else "\n".join(source.texts())
+
+
+def _tuned(name: str, default: Optional[int]) -> Optional[int]:
+    # Measured for the configured model by opennote.tune_llm; settings otherwise.
+    return load_tuning(get_client().model).get(name, default)
+
+
+def _chunk_chars() -> int:
+    return _tuned("chunk_chars", settings.SUMMARY_CHUNK_CHARS) or settings.SUMMARY_CHUNK_CHARS
+
 
+def _map_concurrency() -> int:
+    return _tuned("map_concurrency", settings.SUMMARY_MAP_CONCURRENCY) or 1
 
-def _ollama_generate(prompt: str) -> str:
-    response = requests.post(
-        "http://localhost:11434/api/generate",
-        json={
-            "model": settings.OLLAMA_MODEL,
-            "prompt": prompt,
-            "stream": False,
-        },
-        timeout=180,
+
+def _map_num_predict() -> int:
+    return _tuned("num_predict", settings.SUMMARY_NUM_PREDICT) or settings.OLLAMA_NUM_PREDICT
+
+
+def _chunk_text(lines: Iterable[str], max_chars: Optional[int] = None) -> Iterator[str]:
+    """Cut the newline-joined ``lines`` into ``max_chars`` slices without joining them all."""
+    max_chars = max_chars or _chunk_chars()
+    pending: List[str] = []
+    pending_chars = 0
+    for index, line in enumerate(lines):
+        if index:
+            pending.append("\n")
+            pending_chars += 1
+        pending.append(line)
+        pending_chars += len(line)
+        if pending_chars < max_chars:
+            continue
+        # Join once and walk the result, so a single huge line is not re-copied per chunk.
+        text = "".join(pending)
+        start = 0
+        while len(text) - start >= max_chars:
+            yield text[start : start + max_chars]
+            start += max_chars
+        pending = [text[start:]]
+        pending_chars = len(text) - start
+    if pending_chars:
+        yield "".join(pending)
+
+
+def _ollama_generate(
+    prompt: str,
+    system: Optional[str] = None,
+    num_ctx: Optional[int] = None,
+    metrics: Optional[JobMetrics] = None,
+    num_predict: Optional[int] = None,
+) -> str:
+    return get_client().generate(
+        prompt, system=system, num_ctx=num_ctx, num_predict=num_predict, metrics=metrics
+    )
+
+
+def _map_context_size() -> int:
+    # One num_ctx for every map call: changing it forces Ollama to reload the model,
+    # and a fixed system prompt plus fixed context lets it reuse the cached prefix.
+    needed = get_client().context_size(
+        len(MAP_SYSTEM_PROMPT) + _chunk_chars() + 32, _map_num_predict()
     )
-    response.raise_for_status()
-    data = response.json()
-    return data.get("response", "").strip()
-
-
-def _summarize_chunks(chunks: Iterable[str]) -> List[str]:
-    summaries = []
-    for chunk in chunks:
-        prompt = textwrap.dedent(
-            f"""
-            Summarize the following transcript chunk in 3-5 sentences and include 3 bullet takeaways.
-
-            Transcript chunk:
-            {chunk}
-            """
-        ).strip()
-        summaries.append(_ollama_generate(prompt))
+    # A configured context smaller than the chunk would silently truncate it.
+    return max(needed, _tuned("num_ctx", settings.SUMMARY_NUM_CTX) or 0)
+
+
+def _with_retries(call: Callable[[], T], what: str, metrics: Optional[JobMetrics] = None) -> T:
+    attempts = max(1, settings.SUMMARY_CHUNK_ATTEMPTS)
+    for attempt in range(attempts):
+        try:
+            return call()
+        except Exception as exc:
+            if attempt + 1 == attempts:
+                raise
+            # Exponential backoff with jitter so parallel map workers don't retry in lockstep.
+            delay = settings.SUMMARY_RETRY_BACKOFF_SECONDS * 2**attempt * random.uniform(0.5, 1.5)
+            logger.warning("%s failed (%s); retrying in %.1fs", what, exc, delay)
+            if metrics is not None:
+                metrics.add("llm_retries", 1)
+            time.sleep(delay)
+    raise AssertionError("unreachable")
+
+
+def _summarize_chunks(
+    chunks: Iterable[str],
+    metrics: Optional[JobMetrics] = None,
+    checkpoint: Optional[MapCheckpoint] = None,
+) -> List[str]:
+    num_ctx = _map_context_size()
+    num_predict = _map_num_predict()
+
+    def summarize_chunk(chunk: str) -> str:
+        if checkpoint is not None:
+            done = checkpoint.get(chunk)
+            if done is not None:
+                if metrics is not None:
+                    metrics.add("map_chunks_resumed", 1)
+                return done
+        summary = _with_retries(
+            lambda: _ollama_generate(
+                f"Transcript chunk:\n{chunk}",
+                system=MAP_SYSTEM_PROMPT,
+                num_ctx=num_ctx,
+                metrics=metrics,
+                num_predict=num_predict,
+            ),
+            "Map chunk",
+            metrics,
+        )
+        if checkpoint is not None:
+            checkpoint.put(chunk, summary)
+        return summary
+
+    workers = _map_concurrency()
+    if workers <= 1:
+        return [summarize_chunk(chunk) for chunk in chunks]
+    summaries: List[str] = []
+    # Keep only a couple of chunks per worker in flight rather than the whole transcript.
+    in_flight: Deque[Future[str]] = deque()
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="summary-map") as executor:
+        for chunk in chunks:
+            if len(in_flight) >= 2 * workers:
+                summaries.append(in_flight.popleft().result())
+            in_flight.append(executor.submit(summarize_chunk, chunk))
+        summaries.extend(future.result() for future in in_flight)
     return summaries
 
 
@@ -75,9 +201,50 @@ def _parse_summary(response: str) -> SummaryContent:
     return SummaryContent(summary=summary_text, key_takeaways=takeaways, body=None)
 
 
-def summarize_text(raw_text: str, title: str, mode: str) -> SummaryContent:
-    chunks = list(_chunk_text(raw_text))
-    chunk_summaries = _summarize_chunks(chunks)
+def summarize_extractive(
+    source: TextSource, summary_sentences: int = 4, takeaways: int = 5
+) -> SummaryContent:
+    sentences = split_sentences(_as_text(source))
+    if not sentences:
+        return SummaryContent(summary=None, key_takeaways=None, body=None)
+
+    ranked = rank_sentences(sentences)[: summary_sentences + takeaways]
+    summary_indices = sorted(ranked[:summary_sentences])
+    takeaway_indices = sorted(ranked[summary_sentences:])
+    return SummaryContent(
+        summary=" ".join(sentences[index] for index in summary_indices),
+        key_takeaways=[sentences[index] for index in takeaway_indices] or None,
+        body=None,
+    )
+
+
+def _checkpoint_parts() -> Tuple[str, ...]:
+    # Everything besides the text that determines the map output, so a retry of
+    # the same source resumes while a different model or chunk size starts fresh.
+    return get_client().model, MAP_SYSTEM_PROMPT, str(_chunk_chars())
+
+
+def _recording_checkpoint(directory: Path) -> MapCheckpoint:
+    # Kept after the reduce: the next summary of a grown recording has the same
+    # leading chunks, so only the changed and new ones go to the LLM.
+    return MapCheckpoint(directory / f"map-{content_key(*_checkpoint_parts())}.jsonl")
+
+
+def _prune_recording_checkpoint(checkpoint: MapCheckpoint) -> None:
+    # Keep only the chunks of the run that just mapped: the recording's last chunk
+    # changes every time it grows, and other models or chunk sizes have other files.
+    checkpoint.prune()
+    for path in checkpoint.path.parent.glob("map-*.jsonl"):
+        if path != checkpoint.path:
+            path.unlink(missing_ok=True)
+
+
+def _reduce(
+    chunk_summaries: List[str],
+    title: str,
+    mode: str,
+    metrics: Optional[JobMetrics],
+) -> SummaryContent:
     combined_prompt = textwrap.dedent(
         f"""
         You are combining summaries of a single source titled "{title}".
@@ -88,9 +255,113 @@ def summarize_text(raw_text: str, title: str, mode: str) -> SummaryContent:
         {"\n\n".join(chunk_summaries)}
         """
     ).strip()
-    combined = _ollama_generate(combined_prompt)
+    combined = _with_retries(
+        lambda: _ollama_generate(
+            combined_prompt, metrics=metrics, num_predict=settings.OLLAMA_REDUCE_NUM_PREDICT
+        ),
+        "Reduce",
+        metrics,
+    )
 
     if mode in {"note", "summary"}:
         return _parse_summary(combined)
 
     return SummaryContent(summary=None, key_takeaways=None, body=combined.strip())
+
+
+def summarize_text(
+    source: TextSource,
+    title: str,
+    mode: str,
+    metrics: Optional[JobMetrics] = None,
+    checkpoint_dir: Optional[Path] = None,
+    open_checkpoint: Callable[[str], MapCheckpoint] = map_checkpoint,
+) -> SummaryContent:
+    """Map/reduce summary of ``source``.
+
+    Segments are read twice (once to key the checkpoint, once to chunk) and
+    never joined into one string, unless extractive pre-selection needs the
+    whole text. With ``checkpoint_dir`` (a recording that may grow) the map
+    checkpoint lives there and is kept after the summary. Otherwise it is
+    ``open_checkpoint(key)``, a file under ``STATE_DIR/checkpoints`` by default.
+    """
+    if settings.EXTRACTIVE_KEEP_RATIO < 1.0:
+        source = extract_text(_as_text(source), settings.EXTRACTIVE_KEEP_RATIO)
+    if checkpoint_dir is not None:
+        checkpoint = _recording_checkpoint(checkpoint_dir)
+    else:
+        checkpoint = open_checkpoint(lines_key(_lines(source), *_checkpoint_parts()))
+    chunk_summaries = _summarize_chunks(_chunk_text(_lines(source)), metrics, checkpoint)
+    if checkpoint_dir is not None:
+        _prune_recording_checkpoint(checkpoint)
+    summary = _reduce(chunk_summaries, title, mode, metrics)
+    if checkpoint_dir is None:
+        checkpoint.discard()
+    return summary
+
+
+class MapStream:
+    """The map phase of :func:`summarize_text` over lines that are still being produced.
+
+    Lines are chunked exactly as ``summarize_text`` chunks them, and each
+    chunk is summarized on a background thread as soon as it is full, so
+    only the reduce step has to wait for the end of the input. Until the
+    input is complete the checkpoint is keyed by ``stream_key``; afterwards
+    it moves to the key ``summarize_text`` uses for the same lines, so a
+    failed reduce resumes through the ordinary path. With ``checkpoint_dir``
+    it uses and keeps the same checkpoint as ``summarize_text`` does there.
+    """
+
+    def __init__(
+        self,
+        stream_key: str,
+        metrics: Optional[JobMetrics] = None,
+        checkpoint_dir: Optional[Path] = None,
+    ) -> None:
+        parts = _checkpoint_parts()
+        self._metrics = metrics
+        self._digest = LinesDigest(*parts)
+        self._persistent = checkpoint_dir is not None
+        if checkpoint_dir is not None:
+            self._checkpoint = _recording_checkpoint(checkpoint_dir)
+        else:
+            self._checkpoint = map_checkpoint(content_key("stream", stream_key, *parts))
+        self._lines: "queue.Queue[Optional[str]]" = queue.Queue()
+        self._closed = False
+        self._summaries: List[str] = []
+        self._error: Optional[BaseException] = None
+        self._thread = threading.Thread(target=self._map, name="summary-stream", daemon=True)
+        self._thread.start()
+
+    def _map(self) -> None:
+        try:
+            self._summaries = _summarize_chunks(
+                _chunk_text(iter(self._lines.get, None)), self._metrics, self._checkpoint
+            )
+        except BaseException as exc:
+            self._error = exc
+
+    def feed(self, line: str) -> None:
+        self._digest.update(line)
+        self._lines.put(line)
+
+    def close(self) -> None:
+        """End the input. Chunks already queued are still summarized and checkpointed."""
+        if not self._closed:
+            self._closed = True
+            self._lines.put(None)
+
+    def summarize(self, title: str, mode: str) -> SummaryContent:
+        """Close the input, wait for the map phase and run the reduce step."""
+        self.close()
+        self._thread.join()
+        if not self._persistent:
+            self._checkpoint.rekey(self._digest.hexdigest())
+        if self._error is not None:
+            raise self._error
+        if self._persistent:
+            _prune_recording_checkpoint(self._checkpoint)
+        summary = _reduce(self._summaries, title, mode, self._metrics)
+        if not self._persistent:
+            self._checkpoint.discard()
+        return summary
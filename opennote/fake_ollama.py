@@ -0,0 +1,276 @@
+"""Minimal fake Ollama server for exercising LLM clients without a GPU."""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import random
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Iterator, List, Optional
+
+import numpy as np
+
+_REPLY = (
+    "Summary: This section covers the main points of the material in a few sentences.\n"
+    "Key Takeaways:\n- First point\n- Second point\n- Third point"
+)
+
+
+class _QuietServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address) -> None:
+        # Clients drop keep-alive connections mid-read; that is not worth a traceback.
+        pass
+
+
+class FakeOllamaServer:
+    """Serves /api/generate, /api/embed and /api/tags on localhost.
+
+    Latency is ``latency`` seconds plus prompt processing at
+    ``prompt_tokens_per_second``, then tokens stream at ``tokens_per_second``.
+    At most ``parallel`` requests are processed at once (0 means no limit)
+    and the rest wait, like ``OLLAMA_NUM_PARALLEL``. A request with a
+    different ``num_ctx`` than the previous one first waits ``load_seconds``,
+    as Ollama reloads the model for it. With probability ``failure_rate`` a
+    request returns HTTP 500; setting ``down`` makes every request fail.
+    """
+
+    def __init__(
+        self,
+        port: int = 0,
+        latency: float = 0.0,
+        tokens_per_second: float = 1000.0,
+        prompt_tokens_per_second: float = 10000.0,
+        failure_rate: float = 0.0,
+        embedding_dim: int = 64,
+        seed: int = 0,
+        parallel: int = 0,
+        load_seconds: float = 0.0,
+    ) -> None:
+        self.latency = latency
+        self.tokens_per_second = tokens_per_second
+        self.prompt_tokens_per_second = prompt_tokens_per_second
+        self.failure_rate = failure_rate
+        self.embedding_dim = embedding_dim
+        self.load_seconds = load_seconds
+        self.down = False
+        self.requests = 0
+        self._slots = threading.BoundedSemaphore(parallel) if parallel > 0 else None
+        self._loaded_ctx: Optional[int] = None
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = _QuietServer(("127.0.0.1", port), self._handler_class())
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FakeOllamaServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self) -> None:
+        self._server.serve_forever()
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "FakeOllamaServer":
+        return self.start()
+
+    def __exit__(self, *_exc) -> None:
+        self.stop()
+
+    def _should_fail(self) -> bool:
+        with self._lock:
+            self.requests += 1
+            return self.down or self._rng.random() < self.failure_rate
+
+    @contextmanager
+    def _slot(self) -> Iterator[None]:
+        if self._slots is None:
+            yield
+            return
+        with self._slots:
+            yield
+
+    def _load(self, num_ctx: Optional[int]) -> float:
+        """Seconds spent reloading the model for ``num_ctx``; call while holding a slot."""
+        with self._lock:
+            reload = num_ctx is not None and num_ctx != self._loaded_ctx
+            if reload:
+                self._loaded_ctx = num_ctx
+        if not reload or not self.load_seconds:
+            return 0.0
+        time.sleep(self.load_seconds)
+        return self.load_seconds
+
+    def _embed(self, text: str) -> List[float]:
+        vector = np.zeros(self.embedding_dim, dtype=np.float32)
+        for word in text.lower().split():
+            digest = hashlib.blake2b(word.encode("utf-8"), digest_size=4).digest()
+            vector[int.from_bytes(digest, "little") % self.embedding_dim] += 1.0
+        return vector.tolist()
+
+    def _handler_class(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *_args) -> None:
+                pass
+
+            def _send_json(self, status: int, payload: dict) -> None:
+                body = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _send_chunk(self, payload: bytes) -> None:
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(payload), payload))
+                self.wfile.flush()
+
+            def do_GET(self) -> None:
+                if fake._should_fail():
+                    self._send_json(500, {"error": "fake failure"})
+                    return
+                if self.path == "/api/tags":
+                    self._send_json(200, {"models": [{"name": "fake"}]})
+                else:
+                    self._send_json(404, {"error": "not found"})
+
+            def do_POST(self) -> None:
+                length = int(self.headers.get("Content-Length", 0))
+                body = json.loads(self.rfile.read(length) or b"{}")
+                if fake._should_fail():
+                    self._send_json(500, {"error": "fake failure"})
+                    return
+                if self.path == "/api/generate":
+                    self._generate(body)
+                elif self.path == "/api/embed":
+                    inputs = body.get("input", [])
+                    if isinstance(inputs, str):
+                        inputs = [inputs]
+                    self._send_json(200, {"embeddings": [fake._embed(text) for text in inputs]})
+                else:
+                    self._send_json(404, {"error": "not found"})
+
+            def _generate(self, body: dict) -> None:
+                prompt = body.get("prompt")
+                if not prompt:
+                    self._send_json(200, {"model": body.get("model"), "response": "", "done": True})
+                    return
+
+                with fake._slot():
+                    self._respond(body, prompt)
+
+            def _respond(self, body: dict, prompt: str) -> None:
+                options = body.get("options", {})
+                load_seconds = fake._load(options.get("num_ctx"))
+                prompt_tokens = (len(prompt) + len(body.get("system", ""))) // 4
+                num_predict = options.get("num_predict") or 128
+                reply = _REPLY.split(" ")
+                # A negative num_predict means no limit, as in Ollama.
+                tokens = reply[:num_predict] if num_predict >= 0 else reply
+                stats = {
+                    "load_seconds": load_seconds,
+                    "prompt_tokens": prompt_tokens,
+                    "prompt_seconds": prompt_tokens / fake.prompt_tokens_per_second,
+                    "eval_tokens": len(tokens),
+                    "truncated": len(tokens) < len(reply),
+                }
+                time.sleep(fake.latency + stats["prompt_seconds"])
+
+                if not body.get("stream", True):
+                    eval_seconds = len(tokens) / fake.tokens_per_second
+                    time.sleep(eval_seconds)
+                    self._send_json(200, self._final(body, " ".join(tokens), eval_seconds, **stats))
+                    return
+
+                self.send_response(200)
+                self.send_header("Content-Type", "application/x-ndjson")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                started = time.perf_counter()
+                for index, token in enumerate(tokens):
+                    text = token if index == 0 else f" {token}"
+                    line = json.dumps({"model": body.get("model"), "response": text, "done": False})
+                    self._send_chunk(line.encode("utf-8") + b"\n")
+                    time.sleep(1.0 / fake.tokens_per_second)
+                eval_seconds = time.perf_counter() - started
+                final = self._final(body, "", eval_seconds, **stats)
+                self._send_chunk(json.dumps(final).encode("utf-8") + b"\n")
+                self._send_chunk(b"")
+
+            def _final(
+                self,
+                body: dict,
+                response: str,
+                eval_seconds: float,
+                load_seconds: float,
+                prompt_tokens: int,
+                prompt_seconds: float,
+                eval_tokens: int,
+                truncated: bool,
+            ) -> dict:
+                return {
+                    "model": body.get("model"),
+                    "response": response,
+                    "done": True,
+                    "done_reason": "length" if truncated else "stop",
+                    "load_duration": int(load_seconds * 1e9),
+                    "prompt_eval_count": prompt_tokens,
+                    "prompt_eval_duration": int(prompt_seconds * 1e9),
+                    "eval_count": eval_tokens,
+                    "eval_duration": int(eval_seconds * 1e9),
+                    "total_duration": int(
+                        (load_seconds + fake.latency + prompt_seconds + eval_seconds) * 1e9
+                    ),
+                }
+
+        return Handler
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--port", type=int, default=11500)
+    parser.add_argument("--latency", type=float, default=0.2, help="Seconds before the first token.")
+    parser.add_argument("--tokens-per-second", type=float, default=40.0)
+    parser.add_argument("--prompt-tokens-per-second", type=float, default=2000.0)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--parallel", type=int, default=0, help="Concurrent requests; 0 = no limit.")
+    parser.add_argument(
+        "--load-seconds", type=float, default=0.0, help="Model reload time when num_ctx changes."
+    )
+    args = parser.parse_args(argv)
+
+    server = FakeOllamaServer(
+        port=args.port,
+        latency=args.latency,
+        tokens_per_second=args.tokens_per_second,
+        prompt_tokens_per_second=args.prompt_tokens_per_second,
+        failure_rate=args.failure_rate,
+        parallel=args.parallel,
+        load_seconds=args.load_seconds,
+    )
+    print(f"Fake Ollama listening on {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,430 @@
+"""Load-test the bot command handlers with simulated Telegram updates."""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import logging
+import math
+import os
+import random
+import resource
+import tempfile
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+from dataclasses import dataclass, field
+from types import SimpleNamespace
+from typing import Dict, List, Optional
+
+from config.overrides import override_settings
+from opennote.adapters.segments import SegmentArray
+from opennote.adapters.types import IngestResult
+from opennote import registry
+from opennote.bot import commands
+from opennote.engine.summarize import SummaryContent
+
+MODES = ("note", "summary", "transcript", "outline", "study")
+SOURCE_KINDS = ("youtube", "media", "document")
+
+_WORDS = (
+    "model latency window queue memory thread summary transcript segment vault "
+    "note chunk token signal budget request worker process stream buffer index"
+).split()
+
+
+@dataclass(frozen=True)
+class LatencyProfile:
+    median_seconds: float
+    sigma: float
+
+    def sample(self, rng: random.Random, scale: float) -> float:
+        return rng.lognormvariate(math.log(self.median_seconds), self.sigma) * scale
+
+
+# Wall-clock latencies observed on the reference WSL box, before --time-scale.
+DEFAULT_PROFILES = {
+    "youtube": LatencyProfile(median_seconds=300.0, sigma=0.6),
+    "media": LatencyProfile(median_seconds=180.0, sigma=0.6),
+    "document": LatencyProfile(median_seconds=2.0, sigma=0.8),
+    "summarize": LatencyProfile(median_seconds=60.0, sigma=0.5),
+    "reply": LatencyProfile(median_seconds=0.08, sigma=0.4),
+}
+
+
+@dataclass
+class LoadTestConfig:
+    rate: float = 2.0
+    requests: int = 200
+    workers: Optional[int] = None
+    time_scale: float = 0.01
+    error_rate: float = 0.0
+    seed: int = 0
+    sample_interval: float = 0.05
+    profiles: Dict[str, LatencyProfile] = field(default_factory=lambda: dict(DEFAULT_PROFILES))
+
+
+@dataclass
+class RequestResult:
+    mode: str
+    source_kind: str
+    latency_seconds: float
+    replies: List[str]
+    failed: bool
+
+
+class _InstrumentedExecutor(ThreadPoolExecutor):
+    def __init__(self, max_workers: int) -> None:
+        super().__init__(max_workers=max_workers, thread_name_prefix="loadtest")
+        self.max_workers = max_workers
+        self._counter_lock = threading.Lock()
+        self.queued = 0
+        self.active = 0
+
+    def submit(self, fn, /, *args, **kwargs):
+        with self._counter_lock:
+            self.queued += 1
+
+        def run():
+            with self._counter_lock:
+                self.queued -= 1
+                self.active += 1
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                with self._counter_lock:
+                    self.active -= 1
+
+        return super().submit(run)
+
+
+class _FakeMessage:
+    def __init__(self, rng: random.Random, config: LoadTestConfig, chat_id: int) -> None:
+        self._rng = rng
+        self._config = config
+        self.chat_id = chat_id
+        self.replies: List[str] = []
+
+    async def reply_text(self, text: str, **_kwargs) -> None:
+        await asyncio.sleep(self._config.profiles["reply"].sample(self._rng, 1.0))
+        self.replies.append(text)
+
+
+class _Stubs:
+    def __init__(self, config: LoadTestConfig) -> None:
+        self._config = config
+        self._lock = threading.Lock()
+        self._rng = random.Random(config.seed + 1)
+
+    def _sample(self, profile: str) -> tuple[float, float]:
+        with self._lock:
+            delay = self._config.profiles[profile].sample(self._rng, self._config.time_scale)
+            roll = self._rng.random()
+        return delay, roll
+
+    def _fail(self, roll: float, stage: str) -> None:
+        if roll < self._config.error_rate:
+            raise RuntimeError(f"simulated {stage} failure")
+
+    def _media_result(self, title: str, duration_seconds: float, source_type: str) -> IngestResult:
+        rng = random.Random(title)
+        segments = SegmentArray()
+        start = 0.0
+        while start < duration_seconds:
+            end = start + rng.uniform(2.0, 8.0)
+            text = " ".join(rng.choice(_WORDS) for _ in range(rng.randint(6, 20)))
+            segments.append(start, end, text)
+            start = end
+        metadata = {
+            "title": title,
+            "source_url": None,
+            "duration_seconds": duration_seconds,
+            "source_type": source_type,
+            "date": None,
+        }
+        return IngestResult(segments=segments, metadata=metadata)
+
+    def ingest_youtube(self, url: str, job=None) -> IngestResult:
+        delay, roll = self._sample("youtube")
+        time.sleep(delay)
+        self._fail(roll, "download")
+        return self._media_result(url.rsplit("=", 1)[-1], delay / self._config.time_scale, "youtube")
+
+    def ingest_media_file(self, path: str, job=None) -> IngestResult:
+        delay, roll = self._sample("media")
+        time.sleep(delay)
+        self._fail(roll, "transcription")
+        return self._media_result(path.rsplit("/", 1)[-1], delay / self._config.time_scale, "audio")
+
+    def ingest_document(self, path: str, job=None) -> IngestResult:
+        delay, roll = self._sample("document")
+        time.sleep(delay)
+        self._fail(roll, "extraction")
+        rng = random.Random(path)
+        raw_text = " ".join(rng.choice(_WORDS) for _ in range(int(delay / self._config.time_scale * 2000)))
+        metadata = {
+            "title": path.rsplit("/", 1)[-1],
+            "source_url": None,
+            "duration_seconds": None,
+            "source_type": "document",
+            "date": None,
+        }
+        return IngestResult(raw_text=raw_text, segments=SegmentArray(), metadata=metadata)
+
+    def summarize_text(
+        self, source, title: str, mode: str, metrics=None, checkpoint_dir=None
+    ) -> SummaryContent:
+        delay, roll = self._sample("summarize")
+        time.sleep(delay)
+        self._fail(roll, "summarization")
+        if mode in {"note", "summary"}:
+            return SummaryContent(
+                summary=f"Synthetic summary of {title}.",
+                key_takeaways=["first takeaway", "second takeaway"],
+                body=None,
+            )
+        return SummaryContent(summary=None, key_takeaways=None, body=f"# {title}\n\n- outline")
+
+
+def _input_for(source_kind: str, index: int) -> List[str]:
+    if source_kind == "youtube":
+        return [f"https://youtube.com/watch?v=loadtest{index}"]
+    if source_kind == "media":
+        return [f"/loadtest/media-{index}.mp4"]
+    return [f"/loadtest/document-{index}.pdf"]
+
+
+async def _one_request(
+    index: int,
+    mode: str,
+    source_kind: str,
+    rng: random.Random,
+    config: LoadTestConfig,
+) -> RequestResult:
+    message = _FakeMessage(rng, config, chat_id=index)
+    update = SimpleNamespace(message=message)
+    context = SimpleNamespace(args=_input_for(source_kind, index))
+    handler = getattr(commands, f"{mode}_command")
+
+    started = time.perf_counter()
+    await handler(update, context)
+    latency = time.perf_counter() - started
+
+    failed = any(reply.startswith(("Failed", "Summarization failed")) for reply in message.replies)
+    return RequestResult(mode, source_kind, latency, message.replies, failed)
+
+
+async def _sample_loop(
+    executor: _InstrumentedExecutor,
+    interval: float,
+    samples: Dict[str, List[float]],
+    stop: asyncio.Event,
+) -> None:
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        expected = loop.time() + interval
+        await asyncio.sleep(interval)
+        samples["loop_lag"].append(max(0.0, loop.time() - expected))
+        samples["active"].append(executor.active)
+        samples["queued"].append(executor.queued)
+
+
+async def _drive(config: LoadTestConfig, workers: int) -> dict:
+    rng = random.Random(config.seed)
+    executor = _InstrumentedExecutor(workers)
+    loop = asyncio.get_running_loop()
+    loop.set_default_executor(executor)
+
+    samples: Dict[str, List[float]] = {"loop_lag": [], "active": [], "queued": []}
+    stop = asyncio.Event()
+    sampler = asyncio.create_task(_sample_loop(executor, config.sample_interval, samples, stop))
+
+    started = time.perf_counter()
+    tasks = []
+    for index in range(config.requests):
+        await asyncio.sleep(rng.expovariate(config.rate))
+        mode = rng.choice(MODES)
+        source_kind = rng.choice(SOURCE_KINDS)
+        tasks.append(asyncio.create_task(_one_request(index, mode, source_kind, rng, config)))
+    results = await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - started
+
+    stop.set()
+    await sampler
+    return _build_report(config, executor, results, samples, elapsed)
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, math.ceil(pct / 100 * len(ordered)) - 1)
+    return ordered[rank]
+
+
+def _latency_summary(values: List[float]) -> dict:
+    return {
+        "count": len(values),
+        "p50": _percentile(values, 50),
+        "p90": _percentile(values, 90),
+        "p95": _percentile(values, 95),
+        "p99": _percentile(values, 99),
+        "max": max(values, default=0.0),
+    }
+
+
+def _build_report(
+    config: LoadTestConfig,
+    executor: _InstrumentedExecutor,
+    results: List[RequestResult],
+    samples: Dict[str, List[float]],
+    elapsed: float,
+) -> dict:
+    by_mode = {
+        mode: _latency_summary([r.latency_seconds for r in results if r.mode == mode])
+        for mode in MODES
+    }
+    saturated = [active >= executor.max_workers for active in samples["active"]]
+    return {
+        "config": {
+            "rate": config.rate,
+            "requests": config.requests,
+            "workers": executor.max_workers,
+            "time_scale": config.time_scale,
+            "error_rate": config.error_rate,
+            "seed": config.seed,
+        },
+        "elapsed_seconds": elapsed,
+        "throughput_per_second": len(results) / elapsed if elapsed else 0.0,
+        "failed": sum(1 for r in results if r.failed),
+        "latency": {"all": _latency_summary([r.latency_seconds for r in results]), **by_mode},
+        "event_loop_lag": _latency_summary(samples["loop_lag"]),
+        "thread_pool": {
+            "max_workers": executor.max_workers,
+            "peak_active": max(samples["active"], default=0),
+            "peak_queued": max(samples["queued"], default=0),
+            "saturated_fraction": sum(saturated) / len(saturated) if saturated else 0.0,
+        },
+    }
+
+
+def _workers(config: LoadTestConfig) -> int:
+    # ThreadPoolExecutor's default size when --workers is not given.
+    return config.workers or min(32, (os.cpu_count() or 1) + 4)
+
+
+def _replace(stack: ExitStack, module, name: str, value) -> None:
+    stack.callback(setattr, module, name, getattr(module, name))
+    setattr(module, name, value)
+
+
+def run_load_test(config: LoadTestConfig) -> dict:
+    stubs = _Stubs(config)
+    workers = _workers(config)
+    with tempfile.TemporaryDirectory(prefix="opennote_loadtest_") as vault, ExitStack() as stack:
+        stack.enter_context(
+            override_settings(
+                OBSIDIAN_YT_PATH=f"{vault}/vault",
+                STATE_DIR=f"{vault}/state",
+                # The stubs allocate nothing, so memory admission would only queue on estimates.
+                ENABLE_ADMISSION_CONTROL=False,
+                ENABLE_SUMMARY=True,
+                # The summarizer stub is one opaque stage; there is no map phase to overlap.
+                ENABLE_STREAMING_SUMMARY=False,
+                # Every request comes from its own chat; let the scheduler use the whole pool.
+                SCHEDULER_MAX_ACTIVE_JOBS=workers,
+            )
+        )
+        # The bot resolves adapters and engines through the registry on every call.
+        for kind, stub in (
+            ("youtube", stubs.ingest_youtube),
+            ("audio", stubs.ingest_media_file),
+            ("document", stubs.ingest_document),
+        ):
+            function = registry.ADAPTERS[kind].partition(":")[2]
+            _replace(stack, registry.adapter_module(kind), function, stub)
+        _replace(stack, registry.engine("summarize"), "summarize_text", stubs.summarize_text)
+
+        tracemalloc.start()
+        try:
+            report = asyncio.run(_drive(config, workers))
+            _current, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+    report["memory"] = {
+        "peak_traced_bytes": peak,
+        "max_rss_bytes": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024,
+    }
+    return report
+
+
+def _format_latency(name: str, summary: dict) -> str:
+    return (
+        f"{name:<12} n={summary['count']:<5} p50={summary['p50']:.3f}s p90={summary['p90']:.3f}s "
+        f"p95={summary['p95']:.3f}s p99={summary['p99']:.3f}s max={summary['max']:.3f}s"
+    )
+
+
+def format_report(report: dict) -> str:
+    pool = report["thread_pool"]
+    memory = report["memory"]
+    lines = [
+        f"Requests: {report['config']['requests']} at {report['config']['rate']}/s "
+        f"(time scale {report['config']['time_scale']}), failed {report['failed']}",
+        f"Elapsed: {report['elapsed_seconds']:.2f}s, throughput {report['throughput_per_second']:.2f}/s",
+        "",
+        "Handler latency:",
+    ]
+    for name in ("all", *MODES):
+        lines.append("  " + _format_latency(name, report["latency"][name]))
+    lines.extend(
+        [
+            "",
+            "  " + _format_latency("loop lag", report["event_loop_lag"]),
+            "",
+            f"Thread pool: max_workers={pool['max_workers']} peak_active={pool['peak_active']} "
+            f"peak_queued={pool['peak_queued']} saturated={pool['saturated_fraction']:.1%}",
+            f"Memory: peak traced {memory['peak_traced_bytes'] / 2**20:.1f} MiB, "
+            f"max RSS {memory['max_rss_bytes'] / 2**20:.1f} MiB",
+        ]
+    )
+    return "\n".join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rate", type=float, default=2.0, help="Mean arrivals per second.")
+    parser.add_argument("--requests", type=int, default=200, help="Total updates to inject.")
+    parser.add_argument("--workers", type=int, default=None, help="Thread pool size for to_thread.")
+    parser.add_argument(
+        "--time-scale",
+        type=float,
+        default=0.01,
+        help="Multiplier applied to stub adapter/summarizer latencies.",
+    )
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Stub failure probability.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON.")
+    parser.add_argument("--verbose", action="store_true", help="Keep handler error logging.")
+    args = parser.parse_args(argv)
+    if not args.verbose:
+        logging.disable(logging.CRITICAL)
+
+    config = LoadTestConfig(
+        rate=args.rate,
+        requests=args.requests,
+        workers=args.workers,
+        time_scale=args.time_scale,
+        error_rate=args.error_rate,
+        seed=args.seed,
+    )
+    report = run_load_test(config)
+    print(json.dumps(report, indent=2) if args.json else format_report(report))
+
+
+if __name__ == "__main__":
+    main()
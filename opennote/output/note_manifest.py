@@ -0,0 +1,53 @@
+"""Sidecar manifests recording what each note was rendered from."""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict
+
+from opennote.output.vault_index import atomic_open
+
+MANIFEST_SUFFIX = ".note.json"
+
+# Keys that describe the rendering itself rather than its inputs.
+_RENDER_KEYS = {"template_version", "fingerprint"}
+_FILE_KEYS = ("segments", "transcript_json", "transcript")
+
+
+def manifest_path(markdown_path: Path) -> Path:
+    return markdown_path.with_name(markdown_path.stem + MANIFEST_SUFFIX)
+
+
+def markdown_path(manifest: Path) -> Path:
+    return manifest.with_name(manifest.name[: -len(MANIFEST_SUFFIX)] + ".md")
+
+
+def fingerprint(manifest: Dict[str, Any], vault_path: Path) -> str:
+    """Hash of the manifest's inputs plus the size and mtime of its transcript files."""
+    digest = hashlib.sha1()
+    inputs = {key: value for key, value in manifest.items() if key not in _RENDER_KEYS}
+    digest.update(json.dumps(inputs, sort_keys=True, ensure_ascii=False).encode("utf-8"))
+    for key in _FILE_KEYS:
+        name = manifest.get(key)
+        if not name:
+            continue
+        try:
+            stat = os.stat(vault_path / name)
+        except FileNotFoundError:
+            digest.update(f"{key}:missing".encode("utf-8"))
+            continue
+        digest.update(f"{key}:{stat.st_size}:{stat.st_mtime_ns}".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def read_manifest(path: Path) -> Dict[str, Any]:
+    with path.open("r", encoding="utf-8") as handle:
+        return json.load(handle)
+
+
+def write_manifest(path: Path, manifest: Dict[str, Any]) -> None:
+    with atomic_open(path) as handle:
+        json.dump(manifest, handle, ensure_ascii=False, indent=2)
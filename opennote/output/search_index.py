@@ -0,0 +1,172 @@
+"""Full-text search over vault transcripts with SQLite FTS5."""
+
+from __future__ import annotations
+
+import argparse
+import json
+import re
+import sqlite3
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+from config import settings
+from opennote.adapters.segments import SegmentArray
+
+_DATE_PREFIX = re.compile(r"^\d{4}-\d{2}-\d{2} – ")
+
+
+@dataclass(frozen=True)
+class SearchHit:
+    title: str
+    start_ms: Optional[int]
+    snippet: str
+    transcript_path: Path
+    note_path: Optional[Path]
+
+
+class SearchIndex:
+    def __init__(self, db_path: Path) -> None:
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(db_path), check_same_thread=False)
+        with self._db:
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS sources ("
+                "id INTEGER PRIMARY KEY, title TEXT, transcript_path TEXT UNIQUE, note_path TEXT)"
+            )
+            self._db.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS segments USING fts5("
+                "text, source_id UNINDEXED, start_ms UNINDEXED, "
+                "tokenize = 'unicode61 remove_diacritics 2')"
+            )
+
+    def add_transcript(
+        self,
+        title: str,
+        transcript_path: Path,
+        note_path: Optional[Path],
+        segments: Iterable[Dict[str, float | str]],
+        fallback_text: str = "",
+    ) -> None:
+        rows = [
+            (str(segment["text"]), int(float(segment["start"]) * 1000))
+            for segment in segments
+            if segment.get("text")
+        ]
+        if not rows:
+            rows = [(paragraph, None) for paragraph in re.split(r"\n\s*\n", fallback_text) if paragraph.strip()]
+
+        with self._lock, self._db:
+            self._remove(transcript_path)
+            cursor = self._db.execute(
+                "INSERT INTO sources (title, transcript_path, note_path) VALUES (?, ?, ?)",
+                (title, str(transcript_path), str(note_path) if note_path else None),
+            )
+            source_id = cursor.lastrowid
+            self._db.executemany(
+                "INSERT INTO segments (text, source_id, start_ms) VALUES (?, ?, ?)",
+                ((text, source_id, start_ms) for text, start_ms in rows),
+            )
+
+    def contains(self, transcript_path: Path) -> bool:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT 1 FROM sources WHERE transcript_path = ?", (str(transcript_path),)
+            ).fetchone()
+        return row is not None
+
+    def search(self, query: str, limit: int = 10) -> List[SearchHit]:
+        match = _fts_query(query)
+        if not match:
+            return []
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT sources.title, segments.start_ms, "
+                "snippet(segments, 0, '*', '*', '…', 16), "
+                "sources.transcript_path, sources.note_path "
+                "FROM segments JOIN sources ON sources.id = segments.source_id "
+                "WHERE segments MATCH ? ORDER BY rank LIMIT ?",
+                (match, limit),
+            ).fetchall()
+        return [
+            SearchHit(
+                title=title,
+                start_ms=start_ms,
+                snippet=snippet,
+                transcript_path=Path(transcript_path),
+                note_path=Path(note_path) if note_path else None,
+            )
+            for title, start_ms, snippet, transcript_path, note_path in rows
+        ]
+
+    def _remove(self, transcript_path: Path) -> None:
+        row = self._db.execute(
+            "SELECT id FROM sources WHERE transcript_path = ?", (str(transcript_path),)
+        ).fetchone()
+        if row is None:
+            return
+        self._db.execute("DELETE FROM segments WHERE source_id = ?", (row[0],))
+        self._db.execute("DELETE FROM sources WHERE id = ?", (row[0],))
+
+
+def _fts_query(query: str) -> str:
+    terms = re.findall(r"\w+", query)
+    return " ".join('"' + term + '"' for term in terms)
+
+
+_index: Optional[SearchIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_search_index() -> SearchIndex:
+    global _index
+    with _index_lock:
+        if _index is None:
+            state_dir = Path(settings.STATE_DIR).expanduser()
+            state_dir.mkdir(parents=True, exist_ok=True)
+            _index = SearchIndex(state_dir / "search.sqlite3")
+        return _index
+
+
+def _load_segments(transcript_path: Path) -> Iterable[Dict[str, float | str]]:
+    sidecar = transcript_path.with_suffix(".segments.bin")
+    if sidecar.exists():
+        return SegmentArray.load(sidecar)
+    json_path = transcript_path.with_suffix(".transcript.json")
+    if json_path.exists():
+        return json.loads(json_path.read_text(encoding="utf-8"))
+    return []
+
+
+def backfill(vault_path: Path, rebuild: bool = False) -> int:
+    index = get_search_index()
+    indexed = 0
+    for transcript_path in sorted(vault_path.glob("*.txt")):
+        if not rebuild and index.contains(transcript_path):
+            continue
+        note_path = transcript_path.with_suffix(".md")
+        segments = _load_segments(transcript_path)
+        index.add_transcript(
+            title=_DATE_PREFIX.sub("", transcript_path.stem),
+            transcript_path=transcript_path,
+            note_path=note_path if note_path.exists() else None,
+            segments=segments,
+            fallback_text="" if segments else transcript_path.read_text(encoding="utf-8"),
+        )
+        indexed += 1
+    return indexed
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Index existing vault transcripts for /search.")
+    parser.add_argument("--vault", default=settings.OBSIDIAN_YT_PATH, help="Vault folder to scan.")
+    parser.add_argument("--rebuild", action="store_true", help="Re-index already indexed files.")
+    args = parser.parse_args(argv)
+
+    vault_path = Path(args.vault).expanduser().resolve()
+    print(f"Indexed {backfill(vault_path, rebuild=args.rebuild)} transcripts from {vault_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+"""Persistent index of vault filenames for unique-name allocation."""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import IO, Dict, Iterator, Optional, Set, Tuple
+
+from config import settings
+
+# A reserved name whose file doesn't exist yet is kept this long by rescans, since
+# another process may be about to write it; after that it counts as abandoned.
+RESERVATION_GRACE_SECONDS = 3600.0
+
+
+class VaultIndex:
+    """Tracks every filename in the vault so new names never need ``exists()`` probes.
+
+    Names are held in memory and mirrored to SQLite, which is the arbiter
+    when several processes (the bot and ``pipeline.runner``) share a vault:
+    a name is only handed out once its row was inserted by this process.
+    The chosen name is also checked on disk once, which catches files
+    created in Obsidian since the last scan. On open, the vault is listed
+    (only if its mtime moved since the last scan, not counting changes made
+    inside :meth:`writing`) and the stored names are reconciled with what is
+    on disk, except names reserved within ``RESERVATION_GRACE_SECONDS``
+    whose files are still being written. Names are compared case-insensitively
+    because vaults commonly live on Windows drives.
+    """
+
+    def __init__(self, vault_path: Path, db_path: Path) -> None:
+        self.vault_path = vault_path
+        self._lock = threading.Lock()
+        self._next_counter: Dict[Tuple[str, str, str], int] = {}
+        self._db = sqlite3.connect(str(db_path), check_same_thread=False)
+        self._db.execute("CREATE TABLE IF NOT EXISTS names (name TEXT PRIMARY KEY, reserved REAL)")
+        columns = {row[1] for row in self._db.execute("PRAGMA table_info(names)")}
+        if "reserved" not in columns:
+            self._db.execute("ALTER TABLE names ADD COLUMN reserved REAL")
+        self._db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        self._names: Set[str] = {row[0] for row in self._db.execute("SELECT name FROM names")}
+        self.refresh()
+
+    def _vault_mtime(self) -> str:
+        return str(os.stat(self.vault_path).st_mtime_ns)
+
+    def _scanned_mtime(self) -> Optional[str]:
+        row = self._db.execute("SELECT value FROM meta WHERE key = 'vault_mtime_ns'").fetchone()
+        return row[0] if row is not None else None
+
+    def _store_mtime(self, mtime: str) -> None:
+        with self._db:
+            self._db.execute("INSERT OR REPLACE INTO meta VALUES ('vault_mtime_ns', ?)", (mtime,))
+
+    def refresh(self) -> None:
+        with self._lock:
+            mtime = self._vault_mtime()
+            if self._scanned_mtime() == mtime:
+                return
+
+            with os.scandir(self.vault_path) as entries:
+                on_disk = {entry.name.casefold() for entry in entries}
+            added = on_disk - self._names
+            removed = self._names - on_disk
+            cutoff = time.time() - RESERVATION_GRACE_SECONDS
+            with self._db:
+                self._db.executemany(
+                    "INSERT OR IGNORE INTO names (name) VALUES (?)", ((n,) for n in added)
+                )
+                self._db.executemany(
+                    "DELETE FROM names WHERE name = ? AND (reserved IS NULL OR reserved < ?)",
+                    ((n, cutoff) for n in removed),
+                )
+            pending = self._db.execute("SELECT name FROM names WHERE reserved >= ?", (cutoff,))
+            self._store_mtime(mtime)
+            self._names = on_disk | {row[0] for row in pending}
+            if removed:
+                self._next_counter.clear()
+
+    @contextmanager
+    def writing(self) -> Iterator[None]:
+        """Wrap writes to the vault so they don't force a rescan on the next open.
+
+        The stored mtime only follows along if nothing else changed the vault
+        since the last scan; otherwise the next open rescans as usual.
+        """
+        before = self._vault_mtime()
+        try:
+            yield
+        finally:
+            after = self._vault_mtime()
+            with self._lock:
+                if self._scanned_mtime() == before:
+                    self._store_mtime(after)
+
+    def reserve(self, stem: str, suffix: str, numbered: str = "{stem} ({n}){suffix}") -> Path:
+        with self._lock:
+            name = f"{stem}{suffix}"
+            key = (stem.casefold(), suffix.casefold(), numbered)
+            counter: Optional[int] = None
+            while not self._take(name):
+                counter = self._next_counter.get(key, 1) if counter is None else counter + 1
+                name = numbered.format(stem=stem, n=counter, suffix=suffix)
+            if counter is not None:
+                self._next_counter[key] = counter + 1
+        return self.vault_path / name
+
+    def claim(self, path: Path) -> Path:
+        with self._lock:
+            self._claim(path.name)
+        return path
+
+    def release(self, *paths: Path) -> None:
+        with self._lock:
+            for path in paths:
+                if path.exists():
+                    continue
+                name = path.name.casefold()
+                self._names.discard(name)
+                with self._db:
+                    self._db.execute("DELETE FROM names WHERE name = ?", (name,))
+            self._next_counter.clear()
+
+    def _take(self, name: str) -> bool:
+        folded = name.casefold()
+        if folded in self._names:
+            return False
+        self._names.add(folded)
+        try:
+            with self._db:
+                self._db.execute("INSERT INTO names VALUES (?, ?)", (folded, time.time()))
+        except sqlite3.IntegrityError:
+            # Reserved by another process sharing this vault.
+            return False
+        # Created in the vault since the last scan; the row stays, the name is taken.
+        return not (self.vault_path / name).exists()
+
+    def _claim(self, name: str) -> None:
+        folded = name.casefold()
+        self._names.add(folded)
+        with self._db:
+            self._db.execute(
+                "INSERT INTO names VALUES (?, ?) "
+                "ON CONFLICT (name) DO UPDATE SET reserved = excluded.reserved",
+                (folded, time.time()),
+            )
+
+
+_indexes: Dict[str, VaultIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_vault_index(vault_path: str) -> VaultIndex:
+    with _indexes_lock:
+        index = _indexes.get(vault_path)
+        if index is None:
+            resolved = Path(vault_path).expanduser().resolve()
+            resolved.mkdir(parents=True, exist_ok=True)
+            state_dir = Path(settings.STATE_DIR).expanduser()
+            state_dir.mkdir(parents=True, exist_ok=True)
+            digest = hashlib.sha1(str(resolved).encode("utf-8")).hexdigest()[:16]
+            index = VaultIndex(resolved, state_dir / f"vault-{digest}.sqlite3")
+            _indexes[vault_path] = index
+        return index
+
+
+@contextmanager
+def atomic_open(path: Path, mode: str = "w") -> Iterator[IO]:
+    temp_path = path.with_name(f".{path.name}.tmp")
+    encoding = None if "b" in mode else "utf-8"
+    try:
+        with temp_path.open(mode, encoding=encoding) as handle:
+            yield handle
+            handle.flush()
+            os.fsync(handle.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        temp_path.unlink(missing_ok=True)
+        raise
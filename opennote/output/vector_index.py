@@ -0,0 +1,211 @@
+"""Memory-mapped embedding index over processed sources."""
+
+from __future__ import annotations
+
+import os
+import sqlite3
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+from config import settings
+from opennote.engine.embeddings import EmbedFn, embed_texts
+
+
+@dataclass(frozen=True)
+class Chunk:
+    text: str
+    start_seconds: Optional[float]
+
+
+@dataclass(frozen=True)
+class RetrievedChunk:
+    title: str
+    transcript_path: Path
+    start_seconds: Optional[float]
+    text: str
+    score: float
+
+
+class VectorIndex:
+    """Unit-normalised float32 rows appended to a flat file, with an SQLite ID map.
+
+    Row ``i`` of ``vectors.f32`` is chunk ``i`` in the ``chunks`` table.
+    Re-indexing a transcript marks its old rows dead instead of rewriting the
+    matrix. The table is authoritative: vectors past its last row (a partial
+    or uncommitted append from a crash) are cut off before the next append
+    and never read.
+    """
+
+    def __init__(self, index_dir: Path) -> None:
+        index_dir.mkdir(parents=True, exist_ok=True)
+        self._vectors_path = index_dir / "vectors.f32"
+        self._vectors_path.touch(exist_ok=True)
+        self._lock = threading.Lock()
+        self._matrix: Optional[np.ndarray] = None
+        self._db = sqlite3.connect(str(index_dir / "chunks.sqlite3"), check_same_thread=False)
+        with self._db:
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS chunks ("
+                "row INTEGER PRIMARY KEY, title TEXT, transcript_path TEXT, "
+                "start_seconds REAL, text TEXT, live INTEGER DEFAULT 1)"
+            )
+            self._db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        row = self._db.execute("SELECT value FROM meta WHERE key = 'dim'").fetchone()
+        self._dim = int(row[0]) if row else 0
+
+    def _row_count(self) -> int:
+        if not self._dim:
+            return 0
+        (rows,) = self._db.execute("SELECT COALESCE(MAX(row) + 1, 0) FROM chunks").fetchone()
+        return min(rows, self._vectors_path.stat().st_size // (4 * self._dim))
+
+    def add(self, title: str, transcript_path: Path, chunks: List[Chunk], vectors: np.ndarray) -> None:
+        if not chunks:
+            return
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if vectors.shape[0] != len(chunks):
+            raise ValueError("Embedding count does not match chunk count.")
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        vectors = vectors / np.maximum(norms, 1e-12)
+
+        with self._lock, self._db:
+            if not self._dim:
+                self._dim = vectors.shape[1]
+                self._db.execute("INSERT OR REPLACE INTO meta VALUES ('dim', ?)", (str(self._dim),))
+            elif vectors.shape[1] != self._dim:
+                raise ValueError(
+                    f"Embedding dimension {vectors.shape[1]} does not match index dimension {self._dim}."
+                )
+
+            self._db.execute(
+                "UPDATE chunks SET live = 0 WHERE transcript_path = ?", (str(transcript_path),)
+            )
+            (first_row,) = self._db.execute(
+                "SELECT COALESCE(MAX(row) + 1, 0) FROM chunks"
+            ).fetchone()
+            with self._vectors_path.open("r+b") as handle:
+                handle.truncate(first_row * self._dim * 4)
+                handle.seek(0, 2)
+                handle.write(vectors.astype("<f4").tobytes())
+                handle.flush()
+                os.fsync(handle.fileno())
+            self._db.executemany(
+                "INSERT INTO chunks (row, title, transcript_path, start_seconds, text) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (
+                    (first_row + offset, title, str(transcript_path), chunk.start_seconds, chunk.text)
+                    for offset, chunk in enumerate(chunks)
+                ),
+            )
+            self._matrix = None
+
+    def _load_matrix(self) -> np.ndarray:
+        rows = self._row_count()
+        if self._matrix is None or self._matrix.shape[0] != rows:
+            if rows == 0:
+                self._matrix = np.empty((0, self._dim), dtype=np.float32)
+            else:
+                self._matrix = np.memmap(
+                    self._vectors_path, dtype="<f4", mode="r", shape=(rows, self._dim)
+                )
+        return self._matrix
+
+    def search(self, query_vector: np.ndarray, k: int) -> List[RetrievedChunk]:
+        query = np.asarray(query_vector, dtype=np.float32).ravel()
+        query = query / max(float(np.linalg.norm(query)), 1e-12)
+        with self._lock:
+            if not self._dim:
+                return []
+            matrix = self._load_matrix()
+            live = np.fromiter(
+                (row for (row,) in self._db.execute("SELECT row FROM chunks WHERE live = 1")),
+                dtype=np.int64,
+            )
+        live = live[live < matrix.shape[0]]
+        if live.size == 0:
+            return []
+
+        scores = matrix[live] @ query
+        top = min(k, live.size)
+        best = np.argpartition(-scores, top - 1)[:top]
+        best = best[np.argsort(-scores[best])]
+
+        results = []
+        with self._lock:
+            for position in best:
+                title, transcript_path, start_seconds, text = self._db.execute(
+                    "SELECT title, transcript_path, start_seconds, text FROM chunks WHERE row = ?",
+                    (int(live[position]),),
+                ).fetchone()
+                results.append(
+                    RetrievedChunk(
+                        title=title,
+                        transcript_path=Path(transcript_path),
+                        start_seconds=start_seconds,
+                        text=text,
+                        score=float(scores[position]),
+                    )
+                )
+        return results
+
+
+def chunk_for_embedding(
+    segments: Iterable[Dict[str, float | str]],
+    raw_text: str,
+    max_chars: int,
+) -> List[Chunk]:
+    chunks: List[Chunk] = []
+    parts: List[str] = []
+    size = 0
+    start: Optional[float] = None
+    for segment in segments:
+        text = str(segment["text"]).strip()
+        if not text:
+            continue
+        if parts and size + len(text) > max_chars:
+            chunks.append(Chunk(" ".join(parts), start))
+            parts, size = [], 0
+        if not parts:
+            start = float(segment["start"])
+        parts.append(text)
+        size += len(text) + 1
+    if parts:
+        chunks.append(Chunk(" ".join(parts), start))
+    if chunks:
+        return chunks
+    return [
+        Chunk(raw_text[offset : offset + max_chars], None)
+        for offset in range(0, len(raw_text), max_chars)
+        if raw_text[offset : offset + max_chars].strip()
+    ]
+
+
+def index_transcript(
+    title: str,
+    transcript_path: Path,
+    segments: Iterable[Dict[str, float | str]],
+    raw_text: str,
+    embed: EmbedFn = embed_texts,
+) -> int:
+    chunks = chunk_for_embedding(segments, raw_text, settings.EMBED_CHUNK_CHARS)
+    if not chunks:
+        return 0
+    vectors = embed([chunk.text for chunk in chunks])
+    get_vector_index().add(title, transcript_path, chunks, vectors)
+    return len(chunks)
+
+
+_index: Optional[VectorIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_vector_index() -> VectorIndex:
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = VectorIndex(Path(settings.STATE_DIR).expanduser() / "vectors")
+        return _index
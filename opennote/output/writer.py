@@ -2,14 +2,23 @@
 
 from __future__ import annotations
 
+import io
 import json
+import logging
 import re
-from dataclasses import dataclass
+from contextlib import ExitStack
+from dataclasses import asdict, dataclass
 from datetime import date
 from pathlib import Path
-from typing import Iterable, Optional
+from typing import Any, Callable, Dict, Iterable, List, Optional, TextIO
 
 from config import settings
+from opennote.adapters.segments import SegmentArray, write_segments_json
+from opennote.output.note_manifest import fingerprint, manifest_path, write_manifest
+from opennote.output.search_index import get_search_index
+from opennote.output.vault_index import atomic_open, get_vault_index
+
+logger = logging.getLogger(__name__)
 
 
 @dataclass(frozen=True)
@@ -17,6 +26,17 @@ class OutputPaths:
     transcript_path: Path
     transcript_json_path: Optional[Path]
     markdown_path: Optional[Path]
+    segments_path: Optional[Path] = None
+    manifest_path: Optional[Path] = None
+
+    def to_dict(self) -> Dict[str, Optional[str]]:
+        return {
+            name: str(value) if value is not None else None for name, value in asdict(self).items()
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Optional[str]]) -> "OutputPaths":
+        return cls(**{name: Path(value) if value else None for name, value in data.items()})
 
 
 def _sanitize_filename(name: str) -> str:
@@ -25,17 +45,6 @@ def _sanitize_filename(name: str) -> str:
     return safe or "untitled"
 
 
-def _next_available_path(base: Path) -> Path:
-    if not base.exists():
-        return base
-    counter = 1
-    while True:
-        candidate = base.with_name(f"{base.stem} ({counter}){base.suffix}")
-        if not candidate.exists():
-            return candidate
-        counter += 1
-
-
 def _build_base_filename(title: str) -> str:
     safe_title = _sanitize_filename(title)
     if settings.DATE_PREFIX_FILENAMES:
@@ -46,31 +55,235 @@ def _build_base_filename(title: str) -> str:
 
 def write_outputs(
     title: str,
-    transcript_text: str,
     segments: Iterable[dict],
-    markdown_text: Optional[str],
     mode: str,
+    render: Callable[[TextIO, Optional[TextIO]], None],
+    manifest: Optional[Dict[str, Any]] = None,
 ) -> OutputPaths:
-    obsidian_path = Path(settings.OBSIDIAN_YT_PATH).expanduser().resolve()
-    obsidian_path.mkdir(parents=True, exist_ok=True)
+    """Write the transcript, its sidecars and (unless transcript mode) the note.
 
-    base_name = _build_base_filename(title)
-    transcript_path = _next_available_path(obsidian_path / f"{base_name}.txt")
-    transcript_json_path = transcript_path.with_suffix(".transcript.json")
+    ``manifest`` holds what the note was rendered from; it is completed with
+    the sidecar file names and stored next to the note so the note can be
+    re-rendered later without recomputing anything.
+    """
+    index = get_vault_index(settings.OBSIDIAN_YT_PATH)
 
-    transcript_path.write_text(transcript_text, encoding="utf-8")
-    transcript_json_path.write_text(
-        json.dumps(list(segments), indent=2),
-        encoding="utf-8",
-    )
+    base_name = _build_base_filename(title)
+    transcript_path = index.reserve(base_name, ".txt")
+    transcript_json_path = index.claim(transcript_path.with_suffix(".transcript.json"))
+    reserved = [transcript_path, transcript_json_path]
 
     markdown_path = None
-    if markdown_text and mode != "transcript":
-        markdown_path = _next_available_path(obsidian_path / f"{base_name}.md")
-        markdown_path.write_text(markdown_text, encoding="utf-8")
+    if mode != "transcript":
+        markdown_path = index.reserve(base_name, ".md")
+        reserved.append(markdown_path)
+
+    segments_path = None
+    if settings.WRITE_SEGMENT_SIDECAR:
+        segments_path = index.claim(transcript_path.with_suffix(".segments.bin"))
+        reserved.append(segments_path)
 
-    return OutputPaths(
+    note_manifest_path = None
+    if markdown_path is not None and manifest is not None:
+        note_manifest_path = index.claim(manifest_path(markdown_path))
+        reserved.append(note_manifest_path)
+
+    outputs = OutputPaths(
         transcript_path=transcript_path,
         transcript_json_path=transcript_json_path,
         markdown_path=markdown_path,
+        segments_path=segments_path,
+        manifest_path=note_manifest_path,
     )
+    try:
+        with index.writing():
+            _write_files(outputs, segments, render, manifest)
+    except BaseException:
+        index.release(*reserved)
+        raise
+
+    _index_transcript(title, transcript_path, markdown_path, segments)
+    return outputs
+
+
+def rewrite_outputs(
+    previous: OutputPaths,
+    title: str,
+    segments: Iterable[dict],
+    render: Callable[[TextIO, Optional[TextIO]], None],
+    manifest: Optional[Dict[str, Any]] = None,
+) -> Optional[OutputPaths]:
+    """Write the outputs again over the files of an earlier run of the same job.
+
+    Used when a job is rerun (for instance after its summary failed), so the
+    vault keeps one set of files. Returns None, leaving the files alone, if
+    the earlier transcript is gone.
+    """
+    if not previous.transcript_path.exists():
+        return None
+    with get_vault_index(settings.OBSIDIAN_YT_PATH).writing():
+        _write_files(previous, segments, render, manifest)
+    _index_transcript(title, previous.transcript_path, previous.markdown_path, segments)
+    return previous
+
+
+def _write_files(
+    outputs: OutputPaths,
+    segments: Iterable[dict],
+    render: Callable[[TextIO, Optional[TextIO]], None],
+    manifest: Optional[Dict[str, Any]],
+) -> None:
+    with ExitStack() as stack:
+        transcript_file = stack.enter_context(atomic_open(outputs.transcript_path))
+        markdown_file = None
+        if outputs.markdown_path is not None:
+            markdown_file = stack.enter_context(atomic_open(outputs.markdown_path))
+        render(transcript_file, markdown_file)
+
+    if outputs.transcript_json_path is not None:
+        with atomic_open(outputs.transcript_json_path) as json_file:
+            write_segments_json(segments, json_file)
+
+    if outputs.segments_path is not None:
+        with atomic_open(outputs.segments_path, "wb") as segments_file:
+            SegmentArray.from_dicts(segments).write(segments_file)
+
+    if outputs.manifest_path is not None and manifest is not None:
+        manifest = {
+            **manifest,
+            "transcript": outputs.transcript_path.name,
+            "transcript_json": (
+                outputs.transcript_json_path.name if outputs.transcript_json_path else None
+            ),
+            "segments": outputs.segments_path.name if outputs.segments_path is not None else None,
+        }
+        manifest["fingerprint"] = fingerprint(manifest, outputs.transcript_path.parent)
+        write_manifest(outputs.manifest_path, manifest)
+
+
+def _index_transcript(
+    title: str, transcript_path: Path, markdown_path: Optional[Path], segments: Iterable[dict]
+) -> None:
+    if not settings.ENABLE_SEARCH_INDEX:
+        return
+    try:
+        get_search_index().add_transcript(
+            title=title,
+            transcript_path=transcript_path,
+            note_path=markdown_path,
+            segments=segments,
+            fallback_text=transcript_path.read_text(encoding="utf-8") if not segments else "",
+        )
+    except Exception:
+        logger.exception("Search indexing failed for %s", transcript_path)
+
+
+def _common_prefix(written: List[dict], segments: SegmentArray) -> int:
+    for index in range(min(len(written), len(segments))):
+        entry = written[index]
+        current = (float(segments.starts[index]), float(segments.ends[index]), segments.text(index))
+        if (entry.get("start"), entry.get("end"), entry.get("text")) != current:
+            return index
+    return min(len(written), len(segments))
+
+
+def _line_end(data: bytes, lines: int) -> int:
+    """Offset just past the first ``lines`` lines, without their final newline."""
+    position = -1
+    for _ in range(lines):
+        position = data.index(b"\n", position + 1)
+    return max(position, 0)
+
+
+def _replace_tail(path: Path, data: bytes, offset: int, write: Callable[[TextIO], None]) -> None:
+    """Replace ``path`` (holding ``data``) by its first ``offset`` bytes plus what ``write`` adds.
+
+    The kept prefix is copied into a temporary file, so a crash leaves the old file whole.
+    """
+    with atomic_open(path, "wb") as raw:
+        raw.write(memoryview(data)[:offset])
+        handle = io.TextIOWrapper(raw, encoding="utf-8", newline="")
+        write(handle)
+        handle.flush()
+        handle.detach()
+
+
+def update_outputs(
+    previous: OutputPaths,
+    title: str,
+    segments: Iterable[dict],
+    render: Callable[[Optional[TextIO], Optional[TextIO]], None],
+    write_transcript: Callable[[Iterable[dict], TextIO, str], bool],
+    manifest: Optional[Dict[str, Any]] = None,
+) -> Optional[OutputPaths]:
+    """Extend the outputs of an earlier run over the same, since grown, recording.
+
+    The transcript and its JSON keep everything up to the last segment that
+    is still the same and only the rest is rendered; the note and the
+    sidecars are rewritten. Every file is replaced atomically. Returns None,
+    leaving the files alone, if they are gone or no longer match what was
+    written (edited by hand, or an interrupted update).
+    """
+    transcript_path = previous.transcript_path
+    transcript_json_path = previous.transcript_json_path
+    if transcript_json_path is None:
+        return None
+    segments = SegmentArray.from_dicts(segments)
+    try:
+        json_data = transcript_json_path.read_bytes()
+        written = json.loads(json_data)
+        text = transcript_path.read_bytes()
+    except (OSError, ValueError):
+        return None
+    lines = text.count(b"\n") + 1 if text else 0
+    if not isinstance(written, list) or lines != len(written):
+        return None
+
+    keep = _common_prefix(written, segments)
+    # Both files hold one segment per line; the JSON has "[" on the line before.
+    text_end = _line_end(text, keep) if keep < lines else len(text)
+    try:
+        json_end = _line_end(json_data, keep + 1) if keep else 1
+    except ValueError:
+        return None
+    if json_data[json_end - 1 : json_end] == b",":
+        json_end -= 1
+    tail = [segments[index] for index in range(keep, len(segments))]
+
+    def append_text(handle: TextIO) -> None:
+        write_transcript(tail, handle, "\n" if keep else "")
+
+    def append_json(handle: TextIO) -> None:
+        separator = ",\n" if keep else "\n"
+        for segment in tail:
+            handle.write(separator)
+            json.dump(segment, handle, ensure_ascii=False)
+            separator = ",\n"
+        handle.write("]\n" if separator == "\n" else "\n]\n")
+
+    with get_vault_index(settings.OBSIDIAN_YT_PATH).writing():
+        _replace_tail(transcript_path, text, text_end, append_text)
+        _replace_tail(transcript_json_path, json_data, json_end, append_json)
+
+        if previous.markdown_path is not None:
+            with atomic_open(previous.markdown_path) as markdown_file:
+                render(None, markdown_file)
+
+        if previous.segments_path is not None:
+            with atomic_open(previous.segments_path, "wb") as segments_file:
+                segments.write(segments_file)
+
+        if previous.manifest_path is not None and manifest is not None:
+            segments_name = previous.segments_path.name if previous.segments_path else None
+            manifest = {
+                **manifest,
+                "transcript": transcript_path.name,
+                "transcript_json": transcript_json_path.name,
+                "segments": segments_name,
+            }
+            manifest["fingerprint"] = fingerprint(manifest, transcript_path.parent)
+            write_manifest(previous.manifest_path, manifest)
+
+    _index_transcript(title, transcript_path, previous.markdown_path, segments)
+    logger.info("Appended %d segments to %s (kept %d)", len(tail), transcript_path.name, keep)
+    return previous
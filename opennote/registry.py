@@ -0,0 +1,113 @@
+"""Input detection and lazily imported adapters and engines.
+
+The adapters pull in faster-whisper (CTranslate2, onnxruntime, PyAV) and
+pypdf, and the engines pull in requests and numpy. Importing all of that
+before the bot starts polling costs seconds on every restart, so callers
+resolve adapters and engines here on first use and the bot imports them
+in the background once it is already answering.
+"""
+
+from __future__ import annotations
+
+import importlib
+import logging
+import sys
+import time
+from pathlib import Path, PurePosixPath
+from types import ModuleType
+from typing import Any, Callable, Dict, Iterable, Optional
+from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)
+
+SUPPORTED_AUDIO_EXTENSIONS = {".wav", ".mp3", ".m4a", ".aac", ".flac", ".ogg"}
+SUPPORTED_VIDEO_EXTENSIONS = {".mp4", ".mkv", ".webm", ".mov", ".avi"}
+SUPPORTED_DOCUMENT_EXTENSIONS = {".pdf", ".txt", ".md"}
+
+# Input kind -> "module:function" taking (input_value, job) and returning an IngestResult.
+ADAPTERS: Dict[str, str] = {
+    "audio": "opennote.adapters.audio:ingest_media_file",
+    "document": "opennote.adapters.document:ingest_document",
+    "http": "opennote.adapters.http_media:ingest_http_media",
+    "youtube": "opennote.adapters.youtube:ingest_youtube",
+}
+
+ENGINES: Dict[str, str] = {
+    "compact": "opennote.engine.compact",
+    "format": "opennote.engine.format",
+    "ollama": "opennote.engine.ollama",
+    "retrieval": "opennote.engine.retrieval",
+    "summarize": "opennote.engine.summarize",
+    "search_index": "opennote.output.search_index",
+    "vector_index": "opennote.output.vector_index",
+    "writer": "opennote.output.writer",
+}
+
+
+def _is_url(value: str) -> bool:
+    return value.startswith("http://") or value.startswith("https://")
+
+
+def is_direct_media_url(url: str) -> bool:
+    suffix = PurePosixPath(urlparse(url).path).suffix.lower()
+    return suffix in SUPPORTED_AUDIO_EXTENSIONS | SUPPORTED_VIDEO_EXTENSIONS
+
+
+def detect_kind(input_value: str) -> str:
+    """Adapter kind for ``input_value``; raises ValueError for unsupported inputs."""
+    if _is_url(input_value):
+        return "http" if is_direct_media_url(input_value) else "youtube"
+
+    suffix = Path(input_value).expanduser().suffix.lower()
+    if suffix in SUPPORTED_DOCUMENT_EXTENSIONS:
+        return "document"
+    if suffix in SUPPORTED_AUDIO_EXTENSIONS | SUPPORTED_VIDEO_EXTENSIONS:
+        return "audio"
+    raise ValueError(f"Unsupported input type: {suffix or 'unknown'}")
+
+
+def _import(name: str) -> ModuleType:
+    loaded = sys.modules.get(name)
+    if loaded is not None:
+        return loaded
+    started = time.perf_counter()
+    loaded = importlib.import_module(name)
+    logger.debug("Imported %s in %.2fs", name, time.perf_counter() - started)
+    return loaded
+
+
+def adapter_module(kind: str) -> ModuleType:
+    return _import(ADAPTERS[kind].partition(":")[0])
+
+
+def adapter(kind: str) -> Callable[..., Any]:
+    # Looked up on every call rather than cached, so patching the module attribute works.
+    module_name, _, function = ADAPTERS[kind].partition(":")
+    return getattr(_import(module_name), function)
+
+
+def engine(name: str) -> ModuleType:
+    return _import(ENGINES[name])
+
+
+def prewarm(names: Optional[Iterable[str]] = None) -> Dict[str, float]:
+    """Import the given modules (default: every adapter and engine) if not loaded yet.
+
+    Returns the import time per module that was actually imported. Failures
+    are logged rather than raised; the same error surfaces again when a job
+    needs the module.
+    """
+    if names is None:
+        names = [spec.partition(":")[0] for spec in ADAPTERS.values()] + list(ENGINES.values())
+    timings: Dict[str, float] = {}
+    for name in names:
+        if name in sys.modules:
+            continue
+        started = time.perf_counter()
+        try:
+            importlib.import_module(name)
+        except Exception:
+            logger.exception("Prewarm import of %s failed", name)
+            continue
+        timings[name] = time.perf_counter() - started
+    return timings
@@ -0,0 +1,135 @@
+"""Rebuild vault notes from their stored manifests and segment sidecars.
+
+Usage: python -m opennote.rerender [--vault PATH] [--workers N] [--force] [--dry-run]
+
+Only notes whose manifest inputs, transcript files or template version
+changed since they were last rendered are rewritten. No transcription or
+LLM calls are made.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from config import settings
+from opennote.adapters.segments import SegmentArray
+from opennote.adapters.types import IngestResult
+from opennote.engine.format import TEMPLATE_VERSION, render_outputs
+from opennote.engine.summarize import SummaryContent
+from opennote.output.note_manifest import (
+    MANIFEST_SUFFIX,
+    fingerprint,
+    markdown_path,
+    read_manifest,
+    write_manifest,
+)
+from opennote.output.vault_index import atomic_open
+
+
+def _load_segments(vault: Path, manifest: dict) -> SegmentArray:
+    if manifest.get("segments") and (vault / manifest["segments"]).exists():
+        return SegmentArray.load(vault / manifest["segments"])
+    if manifest.get("transcript_json") and (vault / manifest["transcript_json"]).exists():
+        with (vault / manifest["transcript_json"]).open("r", encoding="utf-8") as handle:
+            return SegmentArray.from_dicts(json.load(handle))
+    return SegmentArray()
+
+
+def rerender_note(path: Path, force: bool = False, dry_run: bool = False) -> Tuple[str, str]:
+    """Re-render the note described by manifest ``path``; returns (status, note path)."""
+    vault = path.parent
+    note_path = markdown_path(path)
+    try:
+        manifest = read_manifest(path)
+        current = fingerprint(manifest, vault)
+        if (
+            not force
+            and manifest.get("template_version") == TEMPLATE_VERSION
+            and manifest.get("fingerprint") == current
+        ):
+            return "unchanged", str(note_path)
+        if not note_path.exists():
+            return "missing", str(note_path)
+        if dry_run:
+            return "stale", str(note_path)
+
+        segments = _load_segments(vault, manifest)
+        raw_text = None
+        if not len(segments):
+            transcript = manifest.get("transcript")
+            raw_text = (vault / transcript).read_text(encoding="utf-8") if transcript else ""
+        ingest_result = IngestResult(
+            segments=segments, metadata=manifest["metadata"], raw_text=raw_text
+        )
+        summary = SummaryContent(**manifest["summary"]) if manifest.get("summary") else None
+
+        with atomic_open(note_path) as handle:
+            render_outputs(ingest_result, manifest["mode"], summary, None, handle)
+
+        manifest["template_version"] = TEMPLATE_VERSION
+        manifest["fingerprint"] = current
+        write_manifest(path, manifest)
+    except Exception as exc:
+        return "error", f"{note_path}: {exc}"
+    return "rendered", str(note_path)
+
+
+def find_manifests(vault: Path) -> List[Path]:
+    with os.scandir(vault) as entries:
+        return sorted(
+            Path(entry.path)
+            for entry in entries
+            if entry.name.endswith(MANIFEST_SUFFIX) and entry.is_file()
+        )
+
+
+def rerender_vault(
+    vault: Path,
+    workers: Optional[int] = None,
+    force: bool = False,
+    dry_run: bool = False,
+) -> List[Tuple[str, str]]:
+    manifests = find_manifests(vault)
+    if not manifests:
+        return []
+    work = partial(rerender_note, force=force, dry_run=dry_run)
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        return [work(path) for path in manifests]
+    # Rendering one note takes about a millisecond, so batch to amortise IPC.
+    chunksize = max(1, len(manifests) // (workers * 8))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(work, manifests, chunksize=chunksize))
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Re-render vault notes from stored artifacts.")
+    parser.add_argument("--vault", default=settings.OBSIDIAN_YT_PATH)
+    parser.add_argument("--workers", type=int, default=None, help="Processes (default: CPU count).")
+    parser.add_argument("--force", action="store_true", help="Re-render even up-to-date notes.")
+    parser.add_argument("--dry-run", action="store_true", help="Only report stale notes.")
+    parser.add_argument("--verbose", action="store_true", help="List every note that was touched.")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    results = rerender_vault(Path(args.vault).expanduser(), args.workers, args.force, args.dry_run)
+    elapsed = time.perf_counter() - started
+
+    counts = Counter(status for status, _ in results)
+    for status, detail in results:
+        if status == "error" or (args.verbose and status != "unchanged"):
+            print(f"{status}: {detail}")
+    summary = ", ".join(f"{count} {status}" for status, count in sorted(counts.items()))
+    print(f"{len(results)} notes in {elapsed:.1f}s: {summary or 'nothing to do'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,309 @@
+"""Tune summarization chunk size, map concurrency, num_ctx and num_predict against Ollama."""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import random
+import statistics
+import tempfile
+import time
+from contextlib import ExitStack
+from dataclasses import asdict, dataclass, replace
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, ContextManager, Dict, List, Optional, Sequence
+
+from config import settings
+from config.overrides import override_settings
+from opennote.engine import summarize
+from opennote.engine.checkpoints import MapCheckpoint
+from opennote.engine.llm_tuning import save_tuning, tuning_path
+from opennote.engine.metrics import JobMetrics
+from opennote.engine.ollama import get_client
+
+# Sweep order: each parameter is tuned with the ones before it already at their best.
+PARAMETERS = ("chunk_chars", "map_concurrency", "num_ctx", "num_predict")
+# Relative difference in summary time below which two settings count as equally fast.
+_NOISE = 0.03
+
+_WORDS = (
+    "model latency window queue memory thread summary transcript segment vault "
+    "note chunk token signal budget request worker process stream buffer index "
+    "speaker question answer example result method data training evaluation"
+).split()
+
+
+@dataclass(frozen=True)
+class Candidate:
+    chunk_chars: int
+    map_concurrency: int
+    # None sizes the context to the chunk, as summarize does without tuning.
+    num_ctx: Optional[int]
+    num_predict: int
+
+    def label(self) -> str:
+        return (
+            f"chunk={self.chunk_chars} concurrency={self.map_concurrency} "
+            f"num_ctx={self.num_ctx or 'auto'} num_predict={self.num_predict}"
+        )
+
+
+@dataclass(frozen=True)
+class Trial:
+    candidate: Candidate
+    seconds: float
+    llm_calls: int
+    eval_tokens: int
+    # Decode speed of single calls, and generated tokens per wall-clock second overall.
+    decode_tokens_per_second: float
+    throughput_tokens_per_second: float
+    truncated_calls: int
+    error: Optional[str] = None
+
+    @property
+    def usable(self) -> bool:
+        # A faster run whose chunk summaries were cut off at num_predict is not a win.
+        return self.error is None and self.truncated_calls == 0
+
+
+@dataclass
+class TuneConfig:
+    text: str
+    grid: Dict[str, Sequence[Optional[int]]]
+    mode: str = "note"
+    repeats: int = 1
+
+
+def reference_text(path: Optional[str], chars: int, seed: int = 0) -> str:
+    """The transcript at ``path``, or ``chars`` of deterministic transcript-like lines."""
+    if path:
+        return Path(path).expanduser().read_text(encoding="utf-8")
+    rng = random.Random(seed)
+    lines: List[str] = []
+    total = 0
+    while total < chars:
+        line = " ".join(rng.choice(_WORDS) for _ in range(rng.randint(8, 24))).capitalize() + "."
+        lines.append(line)
+        total += len(line) + 1
+    return "\n".join(lines)[:chars]
+
+
+def _current() -> Candidate:
+    return Candidate(
+        chunk_chars=settings.SUMMARY_CHUNK_CHARS,
+        map_concurrency=settings.SUMMARY_MAP_CONCURRENCY,
+        num_ctx=settings.SUMMARY_NUM_CTX,
+        num_predict=settings.SUMMARY_NUM_PREDICT or settings.OLLAMA_NUM_PREDICT,
+    )
+
+
+def _patched(candidate: Candidate) -> ContextManager[None]:
+    return override_settings(
+        SUMMARY_CHUNK_CHARS=candidate.chunk_chars,
+        SUMMARY_MAP_CONCURRENCY=candidate.map_concurrency,
+        SUMMARY_NUM_CTX=candidate.num_ctx,
+        SUMMARY_NUM_PREDICT=candidate.num_predict,
+        # Measure exactly the candidate, not an earlier tuning result.
+        ENABLE_LLM_TUNING=False,
+    )
+
+
+def _feasible(candidate: Candidate) -> bool:
+    if candidate.num_ctx is None:
+        return True
+    with _patched(replace(candidate, num_ctx=None)):
+        # Smaller contexts would be raised to this anyway, so they only repeat a trial.
+        return candidate.num_ctx > summarize._map_context_size()
+
+
+def measure(candidate: Candidate, config: TuneConfig) -> Trial:
+    seconds: List[float] = []
+    totals: Dict[str, float] = {}
+    with _patched(candidate), tempfile.TemporaryDirectory(prefix="opennote_tune_") as scratch:
+        # Map checkpoints would let a repeated setting skip its LLM calls.
+        open_checkpoint = _scratch_checkpoints(Path(scratch))
+        # Load the model with this num_ctx first; the bot pays that once, not per summary.
+        get_client().generate(
+            "Reply with OK.", num_ctx=summarize._map_context_size(), num_predict=1
+        )
+        for _ in range(config.repeats):
+            metrics = JobMetrics(f"tune {candidate.label()}")
+            started = time.perf_counter()
+            try:
+                summarize.summarize_text(
+                    config.text,
+                    "Tuning reference",
+                    config.mode,
+                    metrics,
+                    open_checkpoint=open_checkpoint,
+                )
+            except Exception as exc:
+                return Trial(candidate, 0.0, 0, 0, 0.0, 0.0, 0, error=str(exc))
+            seconds.append(time.perf_counter() - started)
+            for name, value in metrics.snapshot().items():
+                if isinstance(value, (int, float)):
+                    totals[name] = totals.get(name, 0) + value
+
+    eval_tokens = int(totals.get("llm_eval_tokens", 0))
+    eval_seconds = totals.get("llm_eval_seconds", 0.0)
+    return Trial(
+        candidate=candidate,
+        seconds=statistics.median(seconds),
+        llm_calls=int(totals.get("llm_calls", 0)) // config.repeats,
+        eval_tokens=eval_tokens // config.repeats,
+        decode_tokens_per_second=eval_tokens / eval_seconds if eval_seconds else 0.0,
+        throughput_tokens_per_second=eval_tokens / sum(seconds) if seconds else 0.0,
+        truncated_calls=int(totals.get("llm_truncated", 0)),
+    )
+
+
+def tune(config: TuneConfig, log: Callable[[str], None] = print) -> dict:
+    """Sweep one parameter at a time from the current settings and keep the fastest value.
+
+    A full grid over four parameters would take hours against a real model;
+    a coordinate sweep needs one summary per grid value.
+    """
+    best = _current()
+    trials: Dict[Candidate, Trial] = {}
+
+    def run(candidate: Candidate) -> Trial:
+        if candidate not in trials:
+            trial = measure(candidate, config)
+            trials[candidate] = trial
+            status = trial.error or (
+                f"{trial.seconds:.2f}s {trial.llm_calls} calls "
+                f"{trial.decode_tokens_per_second:.1f} tok/s decode "
+                f"{trial.throughput_tokens_per_second:.1f} tok/s overall"
+                + (f" ({trial.truncated_calls} truncated)" if trial.truncated_calls else "")
+            )
+            log(f"  {candidate.label()}: {status}")
+        return trials[candidate]
+
+    log(f"Baseline: {best.label()}")
+    baseline = run(best)
+    for parameter in PARAMETERS:
+        log(f"Sweeping {parameter}:")
+        options = [replace(best, **{parameter: value}) for value in config.grid[parameter]]
+        results = [run(candidate) for candidate in options if _feasible(candidate)]
+        usable = [trial for trial in [trials[best]] + results if trial.usable]
+        if not usable:
+            continue
+        # Within timing noise of the fastest, keep the current value, else the earliest
+        # (smallest) grid value: more concurrency or context is only worth a real gain.
+        cutoff = min(trial.seconds for trial in usable) * (1 + _NOISE)
+        best = next(trial for trial in usable if trial.seconds <= cutoff).candidate
+
+    chosen = trials[best]
+    return {
+        "best": asdict(best),
+        "seconds": chosen.seconds,
+        "baseline_seconds": baseline.seconds,
+        "decode_tokens_per_second": chosen.decode_tokens_per_second,
+        "throughput_tokens_per_second": chosen.throughput_tokens_per_second,
+        "reference_chars": len(config.text),
+        "mode": config.mode,
+        "trials": [
+            {**asdict(trial)["candidate"], **asdict(trial), "candidate": trial.candidate.label()}
+            for trial in trials.values()
+        ],
+    }
+
+
+def _scratch_checkpoints(root: Path):
+    counter = iter(range(1 << 30))
+
+    def open_checkpoint(_job_key: str) -> MapCheckpoint:
+        return MapCheckpoint(root / f"map-{next(counter)}.jsonl")
+
+    return open_checkpoint
+
+
+def _int_list(value: str) -> List[Optional[int]]:
+    # "auto" (or 0) for num_ctx means: size it to the chunk.
+    return [None if item in {"auto", "0"} else int(item) for item in value.split(",") if item]
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--transcript", help="Reference transcript (text file); synthetic if unset.")
+    parser.add_argument("--reference-chars", type=int, default=40000)
+    parser.add_argument("--mode", default="note", help="Summary mode used for the reduce step.")
+    parser.add_argument("--chunk-chars", type=_int_list, default=[2000, 4000, 8000, 12000])
+    parser.add_argument("--concurrency", type=_int_list, default=[1, 2, 4])
+    parser.add_argument("--num-ctx", type=_int_list, default=[None, 8192, 16384])
+    parser.add_argument("--num-predict", type=_int_list, default=[192, 256, 512])
+    parser.add_argument("--repeats", type=int, default=1, help="Runs per setting (median).")
+    parser.add_argument("--url", help="Ollama URL to tune against (default: the configured ones).")
+    parser.add_argument("--model", default=settings.OLLAMA_MODEL)
+    parser.add_argument(
+        "--output",
+        type=Path,
+        help=f"Tuning file to update (default {tuning_path()}; not written with --fake).",
+    )
+    parser.add_argument("--dry-run", action="store_true", help="Only print the results.")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON.")
+    fake = parser.add_argument_group("stub server")
+    fake.add_argument("--fake", action="store_true", help="Tune against opennote.fake_ollama.")
+    fake.add_argument("--fake-latency", type=float, default=0.2)
+    fake.add_argument("--fake-tokens-per-second", type=float, default=40.0)
+    fake.add_argument("--fake-prompt-tokens-per-second", type=float, default=2000.0)
+    fake.add_argument("--fake-parallel", type=int, default=2)
+    fake.add_argument("--fake-load-seconds", type=float, default=1.0)
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.WARNING)
+
+    config = TuneConfig(
+        text=reference_text(args.transcript, args.reference_chars),
+        grid={
+            "chunk_chars": args.chunk_chars,
+            "map_concurrency": args.concurrency,
+            "num_ctx": args.num_ctx,
+            "num_predict": args.num_predict,
+        },
+        mode=args.mode,
+        repeats=max(1, args.repeats),
+    )
+
+    with ExitStack() as stack:
+        url = args.url
+        if args.fake:
+            from opennote.fake_ollama import FakeOllamaServer
+
+            server = stack.enter_context(
+                FakeOllamaServer(
+                    latency=args.fake_latency,
+                    tokens_per_second=args.fake_tokens_per_second,
+                    prompt_tokens_per_second=args.fake_prompt_tokens_per_second,
+                    parallel=args.fake_parallel,
+                    load_seconds=args.fake_load_seconds,
+                )
+            )
+            url = server.url
+        overrides = {"OLLAMA_MODEL": args.model}
+        if url:
+            overrides.update(OLLAMA_URL=url, OLLAMA_BACKENDS=[])
+        stack.enter_context(override_settings(**overrides))
+        report = tune(config, log=(lambda _line: None) if args.json else print)
+
+    report["model"] = args.model
+    report["backend"] = url or settings.OLLAMA_URL
+    report["tuned_at"] = datetime.now(timezone.utc).isoformat(timespec="seconds")
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(
+            f"Best: {Candidate(**report['best']).label()} "
+            f"{report['seconds']:.2f}s (baseline {report['baseline_seconds']:.2f}s)"
+        )
+
+    if args.dry_run or (args.fake and args.output is None):
+        return
+    path = save_tuning(args.model, report["best"], report, args.output)
+    if not args.json:
+        print(f"Wrote {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,15 +2,14 @@
 
 from __future__ import annotations
 
-import json
 import logging
-import subprocess
 import time
 from dataclasses import dataclass
 from pathlib import Path
 from typing import Iterable
 
 from config import settings
+from opennote.engine.probe_cache import is_whisper_ready, probe_media
 
 logger = logging.getLogger(__name__)
 
@@ -22,31 +21,6 @@ def _is_url(value: str) -> bool:
     return value.startswith("http://") or value.startswith("https://")
 
 
-def _probe_media(path: Path) -> dict:
-    completed = subprocess.run(
-        [
-            "ffprobe",
-            "-v",
-            "error",
-            "-show_entries",
-            "format=duration:format_tags=title",
-            "-of",
-            "json",
-            str(path),
-        ],
-        capture_output=True,
-        text=True,
-        check=False,
-    )
-    if completed.returncode != 0:
-        raise RuntimeError(
-            f"ffprobe failed: {completed.stderr.strip() or 'unknown error'}"
-        )
-    if not completed.stdout:
-        raise RuntimeError("ffprobe returned no output; ensure ffmpeg is installed.")
-    return json.loads(completed.stdout)
-
-
 def _extract_title(path: Path, probe_data: dict) -> str:
     tags = probe_data.get("format", {}).get("tags", {})
     title = tags.get("title") if isinstance(tags, dict) else None
@@ -95,6 +69,8 @@ class MediaInfo:
     title: str
     duration_seconds: float
     is_video: bool
+    # Already 16 kHz mono PCM/FLAC, so extraction and normalization can be skipped.
+    whisper_ready: bool = False
 
 
 def resolve_media(input_value: str) -> MediaInfo:
@@ -110,11 +86,17 @@ def resolve_media(input_value: str) -> MediaInfo:
     if suffix not in _supported_extensions():
         raise ValueError(f"Unsupported media format: {suffix}")
 
-    probe_data = _probe_media(path)
+    probe_data = probe_media(path)
     duration = _extract_duration(probe_data)
     if duration > settings.MAX_MEDIA_LENGTH_SECONDS:
         raise ValueError("Media exceeds max length configured in settings.")
 
     title = _extract_title(path, probe_data)
     is_video = suffix in SUPPORTED_VIDEO_EXTENSIONS
-    return MediaInfo(path=path, title=title, duration_seconds=duration, is_video=is_video)
+    return MediaInfo(
+        path=path,
+        title=title,
+        duration_seconds=duration,
+        is_video=is_video,
+        whisper_ready=is_whisper_ready(probe_data),
+    )
@@ -4,10 +4,11 @@ from __future__ import annotations
 
 import subprocess
 from pathlib import Path
+from typing import Optional
 
 
-def normalize_audio(audio_path: Path) -> Path:
-    output_path = audio_path.with_suffix(".normalized.wav")
+def normalize_audio(audio_path: Path, output_path: Optional[Path] = None) -> Path:
+    output_path = output_path or audio_path.with_suffix(".normalized.wav")
     command = [
         "ffmpeg",
         "-y",
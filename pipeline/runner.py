@@ -7,6 +7,8 @@ from pathlib import Path
 from typing import Optional
 
 from config import settings
+from opennote.adapters.segments import SegmentArray
+from opennote.engine.jobs import Job, collect_configured_garbage, open_job
 from pipeline.extract_audio import extract_audio
 from pipeline.media_resolver import MediaInfo, resolve_media
 from pipeline.normalize_audio import normalize_audio
@@ -16,6 +18,8 @@ from pipeline.writer import write_outputs
 
 logger = logging.getLogger(__name__)
 
+STAGES = ("audio", "transcript", "summary")
+
 
 class PipelineResult:
     def __init__(
@@ -31,23 +35,82 @@ class PipelineResult:
         self.summary_markdown = summary_markdown
 
 
-def run_transcription(input_value: str) -> tuple[MediaInfo, TranscriptResult]:
+def _decode_audio(media: MediaInfo, job: Job, output_path: Path) -> Path:
+    audio_path = extract_audio(media, job.directory)
+    try:
+        return normalize_audio(audio_path, output_path)
+    finally:
+        if audio_path != media.path:
+            audio_path.unlink(missing_ok=True)
+
+
+def _save_transcript(audio_path: Path, path: Path) -> TranscriptResult:
+    transcript = transcribe_audio(audio_path)
+    transcript.segments.save(path)
+    return transcript
+
+
+def _load_transcript(path: Path) -> TranscriptResult:
+    segments = SegmentArray.load(path)
+    text = "\n".join(text.strip() for text in segments.texts()).strip()
+    return TranscriptResult(text=text, segments=segments)
+
+
+def run_transcription(
+    input_value: str, job: Optional[Job] = None
+) -> tuple[MediaInfo, TranscriptResult]:
     media = resolve_media(input_value)
-    work_dir = Path("/tmp/opennote")
-    audio_path = extract_audio(media, work_dir)
-    normalized_audio = normalize_audio(audio_path)
-    transcript = transcribe_audio(normalized_audio)
-    return media, transcript
+    if job is None:
+        with open_job(str(media.path)) as owned_job:
+            return media, _transcribe(media, owned_job)
+    return media, _transcribe(media, job)
+
+
+def _transcribe(media: MediaInfo, job: Job) -> TranscriptResult:
+    audio_path = media.path if media.whisper_ready else job.artifact("audio.16k.wav")
+    if audio_path != media.path and not job.done("transcript"):
+        job.run_stage(
+            "audio", audio_path.name, lambda path: _decode_audio(media, job, path), lambda path: path
+        )
+    transcript = job.run_stage(
+        "transcript",
+        "segments.transcript.bin",
+        lambda path: _save_transcript(audio_path, path),
+        _load_transcript,
+    )
+    job.discard("audio.16k.wav")
+    return transcript
+
+
+def _write_summary(path: Path, markdown: str) -> str:
+    path.write_text(markdown, encoding="utf-8")
+    return markdown
 
 
-def run_summary(media: MediaInfo, transcript: TranscriptResult) -> Optional[str]:
+def run_summary(
+    media: MediaInfo, transcript: TranscriptResult, job: Optional[Job] = None
+) -> Optional[str]:
     if not settings.ENABLE_SUMMARY:
         return None
-    return summarize_transcript(media.title, transcript.text).markdown
+    if job is None:
+        return summarize_transcript(media.title, transcript.text).markdown
+    return job.run_stage(
+        "summary",
+        "summary.md",
+        lambda path: _write_summary(
+            path, summarize_transcript(media.title, transcript.text).markdown
+        ),
+        lambda path: path.read_text(encoding="utf-8"),
+    )
 
 
 def run_pipeline(input_value: str, generate_summary: bool) -> PipelineResult:
-    media, transcript = run_transcription(input_value)
-    summary_markdown = run_summary(media, transcript) if generate_summary else None
-    outputs = write_outputs(media.title, transcript, summary_markdown)
+    collect_configured_garbage()
+    with open_job(input_value) as job:
+        resume_from = job.next_stage(STAGES)
+        if resume_from != STAGES[0]:
+            logger.info("Resuming %s at stage %s", input_value, resume_from or "write")
+        media, transcript = run_transcription(input_value, job)
+        summary_markdown = run_summary(media, transcript, job) if generate_summary else None
+        outputs = write_outputs(media.title, transcript, summary_markdown)
     return PipelineResult(media, transcript, outputs, summary_markdown)
@@ -6,9 +6,7 @@ import textwrap
 from dataclasses import dataclass
 from typing import Iterable, List
 
-import requests
-
-from config import settings
+from opennote.engine.ollama import get_client
 
 
 @dataclass(frozen=True)
@@ -24,18 +22,7 @@ def _chunk_text(text: str, max_chars: int = 4000) -> Iterable[str]:
 
 
 def _ollama_generate(prompt: str) -> str:
-    response = requests.post(
-        "http://localhost:11434/api/generate",
-        json={
-            "model": settings.OLLAMA_MODEL,
-            "prompt": prompt,
-            "stream": False,
-        },
-        timeout=180,
-    )
-    response.raise_for_status()
-    data = response.json()
-    return data.get("response", "").strip()
+    return get_client().generate(prompt)
 
 
 def _summarize_chunks(chunks: Iterable[str]) -> List[str]:
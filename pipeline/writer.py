@@ -2,57 +2,63 @@
 
 from __future__ import annotations
 
-import json
 import re
-from dataclasses import asdict
-from pathlib import Path
 from typing import Optional
 
 from config import settings
+from opennote.adapters.segments import write_segments_json
+from opennote.output.vault_index import atomic_open, get_vault_index
 from pipeline.transcribe import TranscriptResult
 
+_NUMBERED_NAME = "{stem}_{n}{suffix}"
+
 
 def _sanitize_filename(name: str) -> str:
     safe = re.sub(r"[^A-Za-z0-9._-]+", "_", name).strip("_")
     return safe or "untitled"
 
 
-def _next_available_path(base: Path) -> Path:
-    if not base.exists():
-        return base
-    counter = 1
-    while True:
-        candidate = base.with_name(f"{base.stem}_{counter}{base.suffix}")
-        if not candidate.exists():
-            return candidate
-        counter += 1
-
-
 def write_outputs(
     title: str,
     transcript: TranscriptResult,
     summary_markdown: Optional[str] = None,
 ) -> dict:
-    obsidian_path = Path(settings.OBSIDIAN_YT_PATH).expanduser().resolve()
-    obsidian_path.mkdir(parents=True, exist_ok=True)
+    index = get_vault_index(settings.OBSIDIAN_YT_PATH)
 
     safe_title = _sanitize_filename(title)
-    transcript_path = _next_available_path(obsidian_path / f"{safe_title}.txt")
-    transcript_json_path = transcript_path.with_suffix(".transcript.json")
+    transcript_path = index.reserve(safe_title, ".txt", _NUMBERED_NAME)
+    transcript_json_path = index.claim(transcript_path.with_suffix(".transcript.json"))
+    reserved = [transcript_path, transcript_json_path]
 
-    transcript_path.write_text(transcript.text, encoding="utf-8")
-    transcript_json_path.write_text(
-        json.dumps([asdict(segment) for segment in transcript.segments], indent=2),
-        encoding="utf-8",
-    )
+    segments_path = None
+    if settings.WRITE_SEGMENT_SIDECAR:
+        segments_path = index.claim(transcript_path.with_suffix(".segments.bin"))
+        reserved.append(segments_path)
 
     note_path = None
     if summary_markdown is not None:
-        note_path = _next_available_path(obsidian_path / f"{safe_title}.md")
-        note_path.write_text(summary_markdown, encoding="utf-8")
+        note_path = index.reserve(safe_title, ".md", _NUMBERED_NAME)
+        reserved.append(note_path)
+
+    try:
+        with index.writing():
+            with atomic_open(transcript_path) as transcript_file:
+                transcript_file.write(transcript.text)
+            with atomic_open(transcript_json_path) as json_file:
+                write_segments_json(transcript.segments, json_file)
+            if segments_path is not None:
+                with atomic_open(segments_path, "wb") as segments_file:
+                    transcript.segments.write(segments_file)
+            if note_path is not None:
+                with atomic_open(note_path) as note_file:
+                    note_file.write(summary_markdown)
+    except BaseException:
+        index.release(*reserved)
+        raise
 
     return {
         "transcript_path": transcript_path,
         "transcript_json_path": transcript_json_path,
+        "segments_path": segments_path,
         "note_path": note_path,
     }
@@ -0,0 +1,55 @@
+"""Shared fixtures: every test gets its own state directory and vault."""
+
+from __future__ import annotations
+
+import importlib
+from pathlib import Path
+from typing import Iterator
+
+import pytest
+
+from config import settings
+from opennote.fake_ollama import FakeOllamaServer
+
+# Module-level singletons that capture STATE_DIR or the vault path on first use.
+_SINGLETONS = {
+    "opennote.engine.admission": "_controller",
+    "opennote.engine.fingerprint": "_index",
+    "opennote.engine.llm_pool": "_pool",
+    "opennote.engine.ollama": "_client",
+    "opennote.engine.probe_cache": "_cache",
+    "opennote.engine.recordings": "_store",
+    "opennote.engine.scheduler": "_scheduler",
+    "opennote.output.search_index": "_index",
+    "opennote.output.vector_index": "_index",
+}
+
+
+@pytest.fixture(autouse=True)
+def isolated_state(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    state_dir = tmp_path / "state"
+    vault = tmp_path / "vault"
+    state_dir.mkdir()
+    vault.mkdir()
+    monkeypatch.setattr(settings, "STATE_DIR", str(state_dir))
+    monkeypatch.setattr(settings, "OBSIDIAN_YT_PATH", str(vault))
+    for module_name, attribute in _SINGLETONS.items():
+        monkeypatch.setattr(importlib.import_module(module_name), attribute, None)
+    monkeypatch.setattr(importlib.import_module("opennote.output.vault_index"), "_indexes", {})
+    return tmp_path
+
+
+@pytest.fixture
+def vault(isolated_state: Path) -> Path:
+    return isolated_state / "vault"
+
+
+@pytest.fixture
+def state_dir(isolated_state: Path) -> Path:
+    return isolated_state / "state"
+
+
+@pytest.fixture
+def fake_ollama() -> Iterator[FakeOllamaServer]:
+    with FakeOllamaServer(tokens_per_second=100000.0) as server:
+        yield server
@@ -0,0 +1,77 @@
+import asyncio
+
+from opennote.engine.admission import (
+    AdmissionController,
+    Demand,
+    WHISPER_MODEL_BYTES,
+    estimate_bytes,
+    whisper_model_bytes,
+)
+
+_GB = 1024**3
+LONG_TALK = Demand(kind="media", duration_seconds=3600, whisper_model="large-v3")
+
+
+def _controller(available_gb: float, downgrade=()) -> AdmissionController:
+    return AdmissionController(
+        reserve_bytes=0,
+        downgrade_models=downgrade,
+        recheck_seconds=0.01,
+        available=lambda: int(available_gb * _GB),
+        rss=lambda: 0,
+    )
+
+
+def test_estimates_grow_with_model_and_duration():
+    short = Demand(kind="media", duration_seconds=60, whisper_model="small")
+
+    assert estimate_bytes(LONG_TALK) > estimate_bytes(short)
+    assert whisper_model_bytes("large-v3", "int8") < whisper_model_bytes("large-v3", "float16")
+    assert estimate_bytes(Demand(kind="document", document_bytes=1000, document_suffix=".pdf")) > (
+        estimate_bytes(Demand(kind="document", document_bytes=1000, document_suffix=".txt"))
+    )
+
+
+def test_fitting_job_is_admitted():
+    ticket = asyncio.run(_controller(64).admit(LONG_TALK))
+
+    assert ticket.action == "admit"
+    assert ticket.whisper_model == "large-v3"
+
+
+def test_job_that_does_not_fit_gets_a_smaller_model():
+    controller = _controller((estimate_bytes(LONG_TALK) - 1) / _GB, downgrade=["medium", "small"])
+
+    ticket = asyncio.run(controller.admit(LONG_TALK))
+
+    assert ticket.action == "downgrade"
+    assert WHISPER_MODEL_BYTES[ticket.whisper_model] < WHISPER_MODEL_BYTES["large-v3"]
+
+
+def test_lone_oversized_job_is_overcommitted():
+    ticket = asyncio.run(_controller(0.5).admit(LONG_TALK))
+
+    assert ticket.action == "overcommit"
+
+
+def test_job_waits_until_memory_is_released():
+    statuses = []
+
+    async def run():
+        controller = _controller(estimate_bytes(LONG_TALK) * 1.5 / _GB)
+        first = await controller.admit(LONG_TALK)
+
+        async def on_status(message):
+            statuses.append(message)
+
+        second = asyncio.create_task(controller.admit(LONG_TALK, on_status))
+        await asyncio.sleep(0.05)
+        assert not second.done()
+        await controller.release(first)
+        return await asyncio.wait_for(second, 1)
+
+    ticket = asyncio.run(run())
+
+    assert ticket.action == "admit"
+    assert ticket.waited_seconds > 0
+    assert len(statuses) == 1 and statuses[0].startswith("Queued until memory frees up")
@@ -0,0 +1,141 @@
+import asyncio
+
+import pytest
+
+from config import settings
+from opennote.adapters.segments import SegmentArray
+from opennote.adapters.types import IngestResult
+from opennote.bot import commands
+from opennote.engine import summarize
+from opennote.engine.checkpoints import MapCheckpoint, content_key, lines_key, map_checkpoint
+from opennote.engine.jobs import open_job
+from opennote.engine.metrics import JobMetrics
+
+TEXT = "\n".join(f"line {index} " + "x" * 40 for index in range(20))
+
+
+class FlakyLLM:
+    """Stands in for ``_ollama_generate``; map calls for ``broken`` chunks fail."""
+
+    def __init__(self, broken: str = "") -> None:
+        self.broken = broken
+        self.map_calls = []
+
+    def __call__(self, prompt, system=None, num_ctx=None, metrics=None, num_predict=None):
+        if system is None:
+            return "Summary: combined\nKey Takeaways:\n- one"
+        self.map_calls.append(prompt)
+        if self.broken and self.broken in prompt:
+            raise TimeoutError("LLM timed out")
+        return f"summary {len(self.map_calls)}"
+
+
+@pytest.fixture(autouse=True)
+def small_chunks(monkeypatch):
+    monkeypatch.setattr(settings, "SUMMARY_CHUNK_CHARS", 200)
+    monkeypatch.setattr(settings, "SUMMARY_RETRY_BACKOFF_SECONDS", 0.0)
+    monkeypatch.setattr(settings, "EXTRACTIVE_KEEP_RATIO", 1.0)
+
+
+def test_lines_key_matches_joined_content_key():
+    lines = ["a", "b", "c"]
+
+    assert lines_key(lines, "model") == content_key("model", "a\nb\nc")
+
+
+def test_checkpoint_survives_reload_and_ignores_a_torn_line(state_dir):
+    checkpoint = map_checkpoint("job")
+    checkpoint.put("chunk one", "first")
+    with checkpoint.path.open("a", encoding="utf-8") as handle:
+        handle.write('{"chunk": "torn')
+
+    reloaded = MapCheckpoint(checkpoint.path)
+
+    assert len(reloaded) == 1
+    assert reloaded.get("chunk one") == "first"
+    reloaded.discard()
+    assert not checkpoint.path.exists()
+
+
+def test_failed_map_resumes_from_completed_chunks(monkeypatch, state_dir):
+    monkeypatch.setattr(settings, "SUMMARY_CHUNK_ATTEMPTS", 2)
+    flaky = FlakyLLM(broken="line 12 ")
+    monkeypatch.setattr(summarize, "_ollama_generate", flaky)
+
+    with pytest.raises(TimeoutError):
+        summarize.summarize_text(TEXT, "Talk", "summary")
+    chunks = list(summarize._chunk_text(TEXT.splitlines()))
+    failed_at = next(index for index, chunk in enumerate(chunks) if "line 12 " in chunk)
+    # Every chunk before the failing one ran once; the failing one ran once per attempt.
+    assert len(flaky.map_calls) == failed_at + 2
+
+    retry = FlakyLLM()
+    monkeypatch.setattr(summarize, "_ollama_generate", retry)
+    result = summarize.summarize_text(TEXT, "Talk", "summary")
+
+    assert result.summary == "combined"
+    assert len(retry.map_calls) == len(chunks) - failed_at
+    assert not list((state_dir / "checkpoints").iterdir())
+
+
+def test_transient_failure_is_retried(monkeypatch):
+    calls = []
+
+    def flaky():
+        calls.append(1)
+        if len(calls) < 3:
+            raise ConnectionError("reset")
+        return "ok"
+
+    assert summarize._with_retries(flaky, "Map chunk") == "ok"
+    assert len(calls) == 3
+
+
+class _Message:
+    chat_id = 1
+
+    def __init__(self) -> None:
+        self.replies = []
+
+    async def reply_text(self, text: str) -> None:
+        self.replies.append(text)
+
+
+class _Update:
+    def __init__(self) -> None:
+        self.message = _Message()
+
+
+def _ingest() -> IngestResult:
+    segments = SegmentArray()
+    segments.append(0.0, 2.0, "Hello there.")
+    return IngestResult(segments, {"title": "Talk", "source_type": "http", "date": "2026-01-01"})
+
+
+def test_rerun_after_a_failed_summary_rewrites_the_same_files(vault):
+    ingest = _ingest()
+    summary = summarize.SummaryContent(summary="Combined.", key_takeaways=None, body=None)
+    with open_job("https://example.com/talk.mp3") as job:
+        failed = commands._write_outputs(job, ingest, "summary", False, None, None, False)
+        retried = commands._write_outputs(job, ingest, "summary", False, summary, None, True)
+
+    assert retried == failed
+    assert len(list(vault.glob("*.md"))) == 1
+    assert len(list(vault.glob("*.txt"))) == 1
+    assert "Combined." in retried.markdown_path.read_text(encoding="utf-8")
+
+
+def test_retry_of_a_finished_job_is_refused(vault):
+    update = _Update()
+    with open_job("https://example.com/talk.mp3") as job:
+        outputs = commands._write_outputs(job, _ingest(), "summary", False, None, None, True)
+        asyncio.run(
+            commands._run_stages(
+                update, "summary", job.source, False, "http", job, JobMetrics("retry"), None, True
+            )
+        )
+
+    (reply,) = update.message.replies
+    assert reply.startswith("The last run already finished")
+    assert str(outputs.markdown_path) in reply
+    assert len(list(vault.glob("*.md"))) == 1
@@ -0,0 +1,69 @@
+from opennote.engine.compact import Compactor, clean_text, compact_segments
+
+
+def _segments(*rows):
+    return [{"start": start, "end": end, "text": text} for start, end, text in rows]
+
+
+def test_clean_text_strips_filler_and_stutters():
+    assert clean_text("Um, so so so the the model, uh, works") == "so the model, works"
+
+
+def test_hallucination_loop_is_dropped():
+    result = compact_segments(
+        _segments(
+            (0.0, 2.0, "Thanks for watching."),
+            (2.0, 4.0, "Thanks for watching."),
+            (4.0, 6.0, "Thanks for watching."),
+        )
+    )
+
+    assert list(result.segments.texts()) == ["Thanks for watching."]
+    assert result.source_ranges == [(0, 2)]
+    assert float(result.segments.ends[0]) == 6.0
+
+
+def test_line_repeated_much_later_is_kept():
+    result = compact_segments(
+        _segments(
+            (0.0, 2.0, "Let's get started."),
+            (2.5, 4.0, "First, the setup."),
+            (60.0, 62.0, "Let's get started."),
+        )
+    )
+
+    assert list(result.segments.texts()) == [
+        "Let's get started. First, the setup.",
+        "Let's get started.",
+    ]
+    assert result.source_ranges == [(0, 1), (2, 2)]
+
+
+def test_dropped_repeat_never_stretches_across_a_gap():
+    compactor = Compactor(min_words=50, max_gap_seconds=2.0, loop_gap_seconds=10.0)
+    compactor.add(0.0, 2.0, "Right.")
+    # A repeat inside the loop window, but after a pause: dropped, and not merged.
+    compactor.add(8.0, 9.0, "Right.")
+    compactor.finish()
+    result = compactor.result()
+
+    assert list(result.segments.texts()) == ["Right."]
+    assert float(result.segments.ends[0]) == 2.0
+    assert result.source_ranges == [(0, 0)]
+
+
+def test_incremental_matches_batch():
+    rows = _segments(
+        (0.0, 1.0, "Um hello there."),
+        (1.0, 2.0, "Hello there."),
+        (5.0, 6.0, "A new topic starts after a pause."),
+        (6.0, 7.0, "uh"),
+        (30.0, 31.0, "Hello there."),
+    )
+    compactor = Compactor()
+    emitted = [compactor.add(row["start"], row["end"], row["text"]) for row in rows]
+    emitted.append(compactor.finish())
+    batch = compact_segments(rows)
+
+    assert [text for text in emitted if text] == list(batch.segments.texts())
+    assert compactor.result().source_ranges == batch.source_ranges
@@ -0,0 +1,39 @@
+from opennote.engine.extractive import extract_text, score_sentences, split_sentences
+from opennote.engine.summarize import summarize_extractive
+
+TEXT = (
+    "Um yeah okay. "
+    "Latency budgets decide how large a batch the GPU can take. "
+    "The weather was nice. "
+    "A bigger batch raises GPU latency but lowers the cost per token. "
+    "So anyway."
+)
+
+
+def test_sentences_split_on_punctuation_and_newlines():
+    assert split_sentences("One. Two!\nThree?  Four") == ["One.", "Two!", "Three?", "Four"]
+
+
+def test_filler_scores_below_content():
+    sentences = split_sentences(TEXT)
+    scores = score_sentences(sentences)
+
+    assert scores[0] == 0.0
+    assert scores[1] > scores[2]
+    assert scores[3] > scores[4]
+
+
+def test_extract_keeps_the_best_sentences_in_order():
+    extracted = extract_text(TEXT, 0.4)
+
+    assert extracted == split_sentences(TEXT)[1] + " " + split_sentences(TEXT)[3]
+    assert extract_text(TEXT, 1.0) == TEXT
+    assert extract_text("Too short.", 0.1) == "Too short."
+
+
+def test_fast_summary_needs_no_llm():
+    summary = summarize_extractive(TEXT, summary_sentences=1, takeaways=1)
+
+    assert summary.summary in split_sentences(TEXT)[1::2]
+    assert len(summary.key_takeaways) == 1
+    assert summarize_extractive("").summary is None
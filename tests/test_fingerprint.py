@@ -0,0 +1,115 @@
+import wave
+
+import numpy as np
+
+from opennote.engine.fingerprint import (
+    Fingerprint,
+    FingerprintIndex,
+    fingerprint_file,
+    frames_to_seconds,
+)
+
+
+def _fingerprint(seed: int, count: int = 2000, shift: int = 0) -> Fingerprint:
+    rng = np.random.default_rng(seed)
+    hashes = rng.integers(0, 1 << 22, count)
+    frames = np.sort(rng.integers(0, 20000, count)) + shift
+    return Fingerprint(hashes, frames, duration_seconds=640.0)
+
+
+def _index(tmp_path) -> FingerprintIndex:
+    index = FingerprintIndex(tmp_path / "fingerprints.sqlite3")
+    index.add("talk", "talk.mp4", _fingerprint(1))
+    index.add("other", "other.mp4", _fingerprint(2))
+    return index
+
+
+def test_shifted_copy_matches_at_its_offset(tmp_path):
+    (match,) = _index(tmp_path).matches(_fingerprint(1, shift=50), min_score=0.2)
+
+    assert match.job_key == "talk"
+    assert match.score == 1.0
+    assert match.offset_seconds == frames_to_seconds(50)
+
+
+def test_one_frame_jitter_still_lines_up(tmp_path):
+    query = _fingerprint(1)
+    frames = query.frames.copy()
+    frames[::3] += 1
+    (match,) = _index(tmp_path).matches(Fingerprint(query.hashes, frames, 640.0), 0.5)
+
+    assert match.job_key == "talk"
+    assert match.score == 1.0
+    assert match.offset_seconds == 0.0
+
+
+def test_unrelated_and_partial_audio_do_not_match(tmp_path):
+    index = _index(tmp_path)
+    clip = _fingerprint(1)
+
+    assert index.matches(_fingerprint(3), min_score=0.2) == []
+    assert index.matches(Fingerprint(clip.hashes[:200], clip.frames[:200], 64.0), 0.2) == []
+
+
+def test_results_are_limited_and_best_first(tmp_path):
+    index = _index(tmp_path)
+    base = _fingerprint(1)
+    index.add("half", "half.mp4", Fingerprint(base.hashes[:1600], base.frames[:1600], 500.0))
+
+    matches = index.matches(base, min_score=0.2)
+    assert [match.job_key for match in matches] == ["talk", "half"]
+    assert [match.job_key for match in index.matches(base, 0.2, limit=1)] == ["talk"]
+    index.forget("talk")
+    assert [match.job_key for match in index.matches(base, 0.2)] == ["half"]
+
+
+def test_reencoded_audio_fingerprints_alike(tmp_path):
+    rng = np.random.default_rng(0)
+    seconds = np.arange(16000 * 20) / 16000
+    tones = sum(
+        np.sin(2 * np.pi * frequency * seconds) * (np.sin(seconds * rate) > 0)
+        for frequency, rate in [(440, 3.1), (880, 5.3), (1500, 2.2), (2500, 7.7)]
+    )
+    paths = []
+    # Same signal at a lower level with a little hiss, as a second encoding would give.
+    for name, gain, noise in [("a.wav", 0.2, 0.0), ("b.wav", 0.1, 0.0005)]:
+        samples = gain * tones + noise * rng.standard_normal(len(seconds))
+        path = tmp_path / name
+        with wave.open(str(path), "wb") as writer:
+            writer.setnchannels(1)
+            writer.setsampwidth(2)
+            writer.setframerate(16000)
+            writer.writeframes((samples * 32767).astype("<i2").tobytes())
+        paths.append(path)
+    index = FingerprintIndex(tmp_path / "fingerprints.sqlite3")
+    index.add("a", "a.wav", fingerprint_file(paths[0]))
+
+    (match,) = index.matches(fingerprint_file(paths[1]), min_score=0.2)
+
+    assert match.job_key == "a"
+    assert abs(match.offset_seconds) < 0.1
+
+
+def test_sources_of_a_very_different_length_are_not_joined(tmp_path):
+    index = FingerprintIndex(tmp_path / "fingerprints.sqlite3")
+    base = _fingerprint(1)
+    # Same hashes, but ten times longer: it could never score 0.2 in a real index.
+    index.add("long", "long.mp4", Fingerprint(base.hashes, base.frames, 6400.0))
+
+    assert index.matches(base, min_score=0.2) == []
+    assert [match.job_key for match in index.matches(base, min_score=0.05)] == ["long"]
+
+
+def test_fingerprints_keep_the_same_fraction_of_hash_values(tmp_path):
+    rng = np.random.default_rng(0)
+    path = tmp_path / "noise.wav"
+    with wave.open(str(path), "wb") as writer:
+        writer.setnchannels(1)
+        writer.setsampwidth(2)
+        writer.setframerate(16000)
+        writer.writeframes((0.3 * rng.standard_normal(16000 * 10) * 32767).astype("<i2").tobytes())
+
+    hashes = fingerprint_file(path).hashes
+
+    assert len(hashes)
+    assert ((hashes * 2654435761 >> 16) % 4 == 0).all()
@@ -0,0 +1,59 @@
+import io
+
+from opennote.adapters.segments import SegmentArray
+from opennote.adapters.types import IngestResult
+from opennote.engine.format import build_markdown, build_transcript_text, render_outputs
+from opennote.engine.summarize import SummaryContent
+
+METADATA = {
+    "title": "Talk",
+    "source_url": None,
+    "duration_seconds": 75.0,
+    "source_type": "audio",
+    "date": "2026-01-01",
+}
+
+
+def _ingest() -> IngestResult:
+    segments = SegmentArray()
+    segments.append(0.0, 4.0, "Hello there.")
+    segments.append(65.0, 70.0, "One minute in.")
+    return IngestResult(segments, METADATA)
+
+
+def _summary() -> SummaryContent:
+    return SummaryContent(summary="A greeting.", key_takeaways=["Say hello"], body=None)
+
+
+def test_transcript_and_note_are_rendered_in_one_pass():
+    ingest = _ingest()
+    transcript, note = io.StringIO(), io.StringIO()
+
+    render_outputs(ingest, "note", _summary(), transcript, note)
+
+    assert transcript.getvalue() == "[00:00:00] Hello there.\n[00:01:05] One minute in."
+    assert transcript.getvalue() == build_transcript_text(ingest)
+    markdown = note.getvalue()
+    assert "## Summary\nA greeting." in markdown
+    assert "- Say hello" in markdown
+    assert "<summary>Show transcript</summary>\n\n" + transcript.getvalue() in markdown
+    assert markdown.endswith("</details>\n")
+    assert markdown == build_markdown(ingest, "note", _summary())
+
+
+def test_summary_mode_leaves_the_transcript_out_of_the_note():
+    transcript, note = io.StringIO(), io.StringIO()
+
+    render_outputs(_ingest(), "summary", _summary(), transcript, note)
+
+    assert "Hello there." in transcript.getvalue()
+    assert "Hello there." not in note.getvalue()
+
+
+def test_raw_text_is_used_without_segments():
+    ingest = IngestResult(SegmentArray(), {**METADATA, "source_type": "document"}, "Plain text.")
+    transcript = io.StringIO()
+
+    render_outputs(ingest, "transcript", None, transcript, None)
+
+    assert transcript.getvalue() == "Plain text."
@@ -0,0 +1,83 @@
+import io
+import threading
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pytest
+
+from opennote.adapters import http_media
+from opennote.adapters.segments import SegmentArray
+
+
+class _QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, *_args) -> None:
+        pass
+
+
+@pytest.fixture
+def media_server(tmp_path):
+    root = tmp_path / "www"
+    root.mkdir()
+    (root / "talk.m4a").write_bytes(b"moov-at-the-end" * 100)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), partial(_QuietHandler, directory=str(root)))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def test_stream_body_copies_the_response(media_server):
+    sink = io.BytesIO()
+
+    received = http_media.stream_body(f"{media_server}/talk.m4a", sink, threading.Event())
+
+    assert received == len(sink.getvalue()) == 1500
+
+
+def test_windows_cover_every_sample():
+    pcm = (np.arange(16000 * 5) % 100).astype("<i2").tobytes()
+
+    windows = list(http_media.iter_windows(io.BytesIO(pcm), window_seconds=2.0))
+
+    assert sum(len(samples) for _offset, samples in windows) == 16000 * 5
+    assert [offset for offset, _samples in windows][0] == 0.0
+
+
+def test_unstreamable_media_is_downloaded_and_decoded_from_disk(
+    media_server, tmp_path, monkeypatch
+):
+    calls = []
+
+    def transcribe(url, model_name, on_segments, local_path=None):
+        calls.append(local_path)
+        if local_path is None:
+            raise http_media._NotStreamableError("moov atom not found")
+        segments = SegmentArray()
+        segments.append(0.0, 1.0, f"{local_path.stat().st_size} bytes")
+        return segments, 1.0, None
+
+    monkeypatch.setattr(http_media, "_transcribe_stream", transcribe)
+    download = tmp_path / "download.m4a"
+
+    segments, duration, _title = http_media._transcribe_url(
+        f"{media_server}/talk.m4a", "tiny", lambda _s: None, download
+    )
+
+    assert calls == [None, download]
+    assert list(segments.texts()) == ["1500 bytes"]
+    assert duration == 1.0
+    assert not download.exists()
+
+
+def test_other_decode_failures_are_not_retried(monkeypatch, tmp_path):
+    def transcribe(url, model_name, on_segments, local_path=None):
+        raise RuntimeError("ffmpeg decode failed")
+
+    monkeypatch.setattr(http_media, "_transcribe_stream", transcribe)
+
+    with pytest.raises(RuntimeError):
+        http_media._transcribe_url(
+            "http://127.0.0.1:9/x.mp3", "tiny", lambda _s: None, tmp_path / "download.mp3"
+        )
@@ -0,0 +1,91 @@
+import os
+import time
+
+from opennote.adapters.segments import SegmentArray
+from opennote.adapters.types import IngestResult
+from opennote.engine.jobs import _directory_size, collect_garbage, open_job, source_key
+
+STAGES = ("probe", "ingest", "summary")
+
+
+def _segments() -> SegmentArray:
+    segments = SegmentArray()
+    segments.append(0.0, 1.5, "Hello there.")
+    segments.append(1.5, 3.0, "General remarks.")
+    return segments
+
+
+def test_restarted_job_picks_up_at_the_first_incomplete_stage():
+    with open_job("https://example.com/talk") as job:
+        probe = job.json_stage("probe", lambda: {"duration": 3.0})
+        job.ingest_stage(lambda: IngestResult(_segments(), {"title": "Talk"}))
+        assert job.next_stage(STAGES) == "summary"
+
+    calls = []
+    with open_job("https://example.com/talk") as job:
+        assert job.next_stage(STAGES) == "summary"
+        assert job.json_stage("probe", lambda: calls.append("probe")) == probe
+        result = job.ingest_stage(lambda: calls.append("ingest"))
+
+    assert calls == []
+    assert list(result.segments.texts()) == ["Hello there.", "General remarks."]
+    assert result.raw_text == "Hello there.\nGeneral remarks."
+    assert result.metadata == {"title": "Talk"}
+
+
+def test_stage_with_a_missing_artifact_reruns():
+    with open_job("source") as job:
+        job.json_stage("probe", lambda: {"duration": 1.0})
+        job.discard("probe.json")
+
+        assert not job.done("probe")
+        assert job.next_stage(STAGES) == "probe"
+
+
+def test_concurrent_run_gets_a_private_directory():
+    with open_job("source") as first:
+        with open_job("source") as second:
+            assert second.private
+            assert second.directory != first.directory
+            private = second.directory
+        assert not private.exists()
+
+
+def test_replaced_file_gets_a_new_key(tmp_path):
+    path = tmp_path / "talk.mp3"
+    path.write_bytes(b"one")
+    before = source_key(str(path))
+    path.write_bytes(b"longer")
+
+    assert source_key(str(path)) != before
+
+
+def test_garbage_collection_by_age_skips_open_jobs(state_dir):
+    with open_job("old") as job:
+        job.json_stage("probe", lambda: {})
+        old = job.directory
+    past = time.time() - 3600
+    os.utime(old / "manifest.json", (past, past))
+
+    with open_job("open") as busy:
+        busy.json_stage("probe", lambda: {})
+        os.utime(busy.directory / "manifest.json", (past, past))
+
+        assert collect_garbage(max_age_seconds=60, max_bytes=1 << 30) == 1
+        assert not old.exists()
+        assert busy.directory.exists()
+
+
+def test_garbage_collection_by_size_removes_least_recent_first():
+    directories = []
+    for index, source in enumerate(["a", "b", "c"]):
+        with open_job(source) as job:
+            job.json_stage("probe", lambda: {"padding": "x" * 1000})
+            stamp = time.time() - 100 + index
+            os.utime(job.artifact("manifest.json"), (stamp, stamp))
+            directories.append(job.directory)
+
+    newest_two = sum(_directory_size(directory) for directory in directories[1:])
+
+    assert collect_garbage(max_age_seconds=3600, max_bytes=newest_two) == 1
+    assert [directory.exists() for directory in directories] == [False, True, True]
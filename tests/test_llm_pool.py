@@ -0,0 +1,77 @@
+import pytest
+
+from opennote.engine.llm_pool import BackendPool, NoHealthyBackendError
+
+
+def _fail(url: str) -> str:
+    raise ConnectionError(url)
+
+
+def test_least_loaded_backend_wins_by_weight():
+    pool = BackendPool([("http://a", 1.0), ("http://b", 3.0)])
+
+    picked = [pool.acquire().url for _ in range(4)]
+
+    assert picked.count("http://b") == 3
+    assert picked.count("http://a") == 1
+
+
+def test_failed_call_is_retried_on_another_backend():
+    pool = BackendPool([("http://a", 1.0), ("http://b", 1.0)])
+    calls = []
+
+    def fn(url: str) -> str:
+        calls.append(url)
+        if len(calls) == 1:
+            raise ConnectionError("down")
+        return url
+
+    result = pool.call(fn)
+
+    assert result == calls[1] != calls[0]
+    assert all(backend.outstanding == 0 for backend in pool.backends)
+
+
+def test_circuit_opens_after_consecutive_failures_and_closes_on_success():
+    pool = BackendPool(
+        [("http://a", 1.0), ("http://b", 1.0)], failure_threshold=2, cooldown_seconds=60
+    )
+
+    for _ in range(2):
+        with pytest.raises(ConnectionError):
+            pool.call(_fail)
+    # The first backend to reach the threshold opens; the last one left stays in use.
+    (opened,) = [backend for backend in pool.backends if backend.open_until]
+    (remaining,) = [backend for backend in pool.backends if not backend.open_until]
+    with pytest.raises(NoHealthyBackendError):
+        pool.acquire(exclude=[remaining.url])
+
+    # Half-open once the cooldown has passed; one success closes the circuit.
+    opened.open_until = 1.0
+    pool.release(pool.acquire(exclude=[remaining.url]), ok=True)
+    assert opened.consecutive_failures == 0
+    assert opened.open_until == 0.0
+
+
+def test_last_available_backend_is_never_cut_off():
+    pool = BackendPool([("http://a", 1.0)], failure_threshold=2, cooldown_seconds=60)
+
+    for _ in range(5):
+        with pytest.raises(ConnectionError):
+            pool.call(_fail)
+
+    (backend,) = pool.backends
+    assert backend.consecutive_failures == 5
+    assert pool.acquire() is backend
+
+
+def test_probe_against_a_fake_server(fake_ollama):
+    pool = BackendPool([(fake_ollama.url, 1.0), ("http://127.0.0.1:9", 1.0)], failure_threshold=1)
+
+    assert pool.probe_all() == [True, False]
+    fake_ollama.down = True
+    assert pool.probe_all() == [False, False]
+    # The unreachable backend is cut off; the fake one is all that is left.
+    assert pool.acquire().url == fake_ollama.url
+    with pytest.raises(NoHealthyBackendError):
+        pool.acquire(exclude=[fake_ollama.url])
@@ -0,0 +1,68 @@
+import json
+
+from config import settings
+from opennote import tune_llm
+from opennote.engine import summarize
+from opennote.engine.llm_tuning import load_tuning, save_tuning, tuning_path
+
+
+def test_saved_tuning_is_loaded_per_model(monkeypatch):
+    save_tuning("llama3:8b", {"chunk_chars": 8000, "map_concurrency": 2, "num_ctx": None}, {})
+    save_tuning("other", {"chunk_chars": 2000}, {})
+
+    assert load_tuning("llama3:8b") == {"chunk_chars": 8000, "map_concurrency": 2}
+    assert load_tuning("other") == {"chunk_chars": 2000}
+    assert load_tuning("never-tuned") == {}
+    monkeypatch.setattr(settings, "ENABLE_LLM_TUNING", False)
+    assert load_tuning("llama3:8b") == {}
+
+
+def test_summaries_use_the_tuned_chunk_size(monkeypatch):
+    monkeypatch.setattr(settings, "OLLAMA_MODEL", "tuned-model")
+    assert summarize._chunk_chars() == settings.SUMMARY_CHUNK_CHARS
+
+    save_tuning("tuned-model", {"chunk_chars": 1234, "map_concurrency": 3}, {})
+
+    assert summarize._chunk_chars() == 1234
+    assert summarize._map_concurrency() == 3
+
+
+def test_reference_text_is_deterministic():
+    text = tune_llm.reference_text(None, 5000)
+
+    assert len(text) == 5000
+    assert text == tune_llm.reference_text(None, 5000)
+
+
+def test_tuning_against_the_fake_server(tmp_path, state_dir, capsys):
+    output = tmp_path / "tuning.json"
+
+    tune_llm.main(
+        [
+            "--fake",
+            "--fake-latency=0",
+            "--fake-tokens-per-second=100000",
+            "--fake-load-seconds=0",
+            "--reference-chars=3000",
+            "--chunk-chars=1000,2000",
+            "--concurrency=1,2",
+            "--num-ctx=auto",
+            "--num-predict=64,128",
+            "--model=fake",
+            f"--output={output}",
+            "--json",
+        ]
+    )
+
+    report = json.loads(capsys.readouterr().out)
+    # The baseline settings compete too and win ties within timing noise.
+    assert report["best"]["chunk_chars"] in {1000, 2000, settings.SUMMARY_CHUNK_CHARS}
+    assert {trial["chunk_chars"] for trial in report["trials"]} >= {1000, 2000}
+    assert report["backend"].startswith("http://127.0.0.1:")
+    assert all(trial["error"] is None for trial in report["trials"])
+    saved = json.loads(output.read_text(encoding="utf-8"))
+    assert saved["fake"]["chunk_chars"] == report["best"]["chunk_chars"]
+    assert not tuning_path().exists()
+    # Trials keep their checkpoints in scratch directories and leave the settings alone.
+    assert not (state_dir / "checkpoints").exists()
+    assert settings.OLLAMA_MODEL != "fake"
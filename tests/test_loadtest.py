@@ -0,0 +1,42 @@
+import pytest
+
+from config import settings
+from config.overrides import override_settings
+from opennote import registry
+from opennote.loadtest import LoadTestConfig, format_report, run_load_test
+
+
+def _config(**overrides) -> LoadTestConfig:
+    return LoadTestConfig(rate=50.0, requests=10, time_scale=0.0005, **overrides)
+
+
+def test_all_requests_complete_without_failures():
+    report = run_load_test(_config())
+
+    assert report["failed"] == 0
+    assert report["latency"]["all"]["count"] == 10
+    assert "failed 0" in format_report(report)
+
+
+def test_stub_failures_are_reported():
+    report = run_load_test(_config(error_rate=1.0))
+
+    assert report["failed"] == 10
+
+
+def test_settings_and_stubs_are_restored_afterwards():
+    summarize = registry.engine("summarize")
+    state_dir, summarize_text = settings.STATE_DIR, summarize.summarize_text
+
+    report = run_load_test(_config(workers=3))
+
+    assert report["thread_pool"]["max_workers"] == report["config"]["workers"] == 3
+    assert settings.STATE_DIR == state_dir
+    assert settings.SCHEDULER_MAX_ACTIVE_JOBS != 3
+    assert summarize.summarize_text is summarize_text
+
+
+def test_unknown_setting_is_rejected():
+    with pytest.raises(AttributeError):
+        with override_settings(NO_SUCH_SETTING=1):
+            pass
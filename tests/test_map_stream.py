@@ -0,0 +1,96 @@
+import pytest
+
+from config import settings
+from opennote.adapters.segments import SegmentArray
+from opennote.adapters.types import IngestResult
+from opennote.bot.commands import _SegmentFeed
+from opennote.engine import summarize
+from opennote.engine.compact import compact_segments
+from opennote.engine.metrics import JobMetrics
+
+LINES = [f"Line {index} of a transcript that is still being made." for index in range(30)]
+
+
+class RecordingLLM:
+    def __init__(self, fail_reduce: bool = False) -> None:
+        self.fail_reduce = fail_reduce
+        self.map_prompts = []
+        self.reduce_prompts = []
+
+    def __call__(self, prompt, system=None, num_ctx=None, metrics=None, num_predict=None):
+        if system is None:
+            self.reduce_prompts.append(prompt)
+            if self.fail_reduce:
+                raise TimeoutError("reduce timed out")
+            return "Summary: all of it"
+        self.map_prompts.append(prompt)
+        return f"summary of {prompt[-12:]}"
+
+
+@pytest.fixture(autouse=True)
+def small_chunks(monkeypatch):
+    monkeypatch.setattr(settings, "SUMMARY_CHUNK_CHARS", 120)
+    monkeypatch.setattr(settings, "SUMMARY_CHUNK_ATTEMPTS", 1)
+    monkeypatch.setattr(settings, "EXTRACTIVE_KEEP_RATIO", 1.0)
+
+
+def _use(monkeypatch, llm: RecordingLLM) -> RecordingLLM:
+    monkeypatch.setattr(summarize, "_ollama_generate", llm)
+    return llm
+
+
+def test_stream_sends_the_same_prompts_as_a_summary_of_the_whole_text(monkeypatch):
+    batch = _use(monkeypatch, RecordingLLM())
+    expected = summarize.summarize_text("\n".join(LINES), "Talk", "summary")
+
+    streamed = _use(monkeypatch, RecordingLLM())
+    stream = summarize.MapStream("job-1")
+    for line in LINES:
+        stream.feed(line)
+
+    assert stream.summarize("Talk", "summary") == expected
+    assert streamed.map_prompts == batch.map_prompts
+    assert streamed.reduce_prompts == batch.reduce_prompts
+
+
+def test_failed_reduce_resumes_through_summarize_text(monkeypatch, state_dir):
+    _use(monkeypatch, RecordingLLM(fail_reduce=True))
+    stream = summarize.MapStream("job-1")
+    for line in LINES:
+        stream.feed(line)
+    with pytest.raises(TimeoutError):
+        stream.summarize("Talk", "summary")
+
+    retry = _use(monkeypatch, RecordingLLM())
+    summarize.summarize_text("\n".join(LINES), "Talk", "summary")
+
+    assert retry.map_prompts == []
+    assert len(retry.reduce_prompts) == 1
+
+
+def test_segment_feed_compacts_like_the_finished_transcript(monkeypatch):
+    monkeypatch.setattr(settings, "ENABLE_COMPACTION", True)
+    segments = SegmentArray()
+    for index in range(20):
+        text = "Um, thanks for watching." if index % 7 == 3 else f"Point {index} is, uh, key."
+        segments.append(float(index), index + 1.0, text)
+    compacted = compact_segments(
+        segments,
+        min_words=settings.COMPACT_MIN_WORDS,
+        max_gap_seconds=settings.COMPACT_MAX_GAP_SECONDS,
+    )
+    batch = _use(monkeypatch, RecordingLLM())
+    summarize.summarize_text(compacted.text, "Talk", "summary")
+
+    streamed = _use(monkeypatch, RecordingLLM())
+    feed = _SegmentFeed(summarize.MapStream("job-1"), JobMetrics("test"))
+    growing = SegmentArray()
+    for index in range(len(segments)):
+        start, end = float(segments.starts[index]), float(segments.ends[index])
+        growing.append(start, end, segments.text(index))
+        if index % 6 == 5:
+            feed(growing)
+
+    feed.summarize(IngestResult(growing, {"title": "Talk"}), "summary")
+
+    assert streamed.map_prompts == batch.map_prompts
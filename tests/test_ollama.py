@@ -0,0 +1,73 @@
+import pytest
+
+from opennote.engine.llm_pool import BackendPool
+from opennote.engine.metrics import JobMetrics
+from opennote.engine.ollama import OllamaClient
+
+
+def _client(*urls: str, num_predict: int = 128) -> OllamaClient:
+    pool = BackendPool([(url, 1.0) for url in urls], failure_threshold=1)
+    return OllamaClient(pool, model="fake", keep_alive="5m", num_predict=num_predict, timeout=5)
+
+
+def test_warm_up_loads_every_reachable_backend(fake_ollama):
+    loaded = _client(fake_ollama.url, "http://127.0.0.1:9").warm_up()
+
+    assert list(loaded) == [fake_ollama.url]
+    assert fake_ollama.requests == 1
+
+
+def test_context_size_rounds_up_to_the_step():
+    client = _client("http://127.0.0.1:9", num_predict=512)
+
+    assert client.context_size(4) == 2048
+    assert client.context_size(4 * 4000) == 6144
+    assert client.context_size(4 * 4000, num_predict=0) == 4096
+    # Without a cap, room for a long answer is left anyway.
+    assert client.context_size(4 * 1000, num_predict=-1) == 4096
+
+
+def test_generate_streams_text_and_records_latency(fake_ollama):
+    client = _client(fake_ollama.url)
+    metrics = JobMetrics("test")
+
+    text = client.generate("Summarize this.", system="You are terse.", metrics=metrics)
+
+    assert text.startswith("Summary:")
+    (stats,) = client.recent_stats()
+    assert 0 < stats.ttft_seconds <= stats.total_seconds
+    assert stats.prompt_tokens == (len("Summarize this.") + len("You are terse.")) // 4
+    assert not stats.truncated
+    values = metrics.snapshot()
+    assert values["llm_calls"] == 1
+    assert values["llm_eval_tokens"] == stats.eval_tokens
+    assert "llm_truncated" not in values
+
+
+def test_generation_cut_at_num_predict_is_flagged(fake_ollama):
+    client = _client(fake_ollama.url)
+    metrics = JobMetrics("test")
+
+    text = client.generate("Summarize this.", num_predict=3, metrics=metrics)
+
+    assert len(text.split(" ")) == 3
+    assert client.recent_stats()[-1].truncated
+    assert metrics.snapshot()["llm_truncated"] == 1
+
+
+def test_uncapped_generation_runs_to_the_end(fake_ollama):
+    client = _client(fake_ollama.url)
+    metrics = JobMetrics("test")
+
+    text = client.generate("Combine these.", num_predict=-1, metrics=metrics)
+
+    assert text.endswith("Third point")
+    assert not client.recent_stats()[-1].truncated
+    assert "llm_truncated" not in metrics.snapshot()
+
+
+def test_server_error_is_raised(fake_ollama):
+    fake_ollama.down = True
+
+    with pytest.raises(Exception):
+        _client(fake_ollama.url).generate("Summarize this.")
@@ -0,0 +1,65 @@
+import itertools
+import os
+
+from opennote.engine import probe_cache
+from opennote.engine.probe_cache import ProbeCache, is_whisper_ready
+
+
+def _probe(codec="pcm_s16le", sample_rate="16000", channels=1, extra_streams=()):
+    stream = {
+        "index": 0,
+        "codec_type": "audio",
+        "codec_name": codec,
+        "sample_rate": sample_rate,
+        "channels": channels,
+    }
+    return {"format": {"duration": "12.5"}, "streams": [stream, *extra_streams]}
+
+
+def test_whisper_ready_audio_skips_normalization():
+    assert is_whisper_ready(_probe())
+    assert is_whisper_ready(_probe(codec="flac"))
+    assert not is_whisper_ready(_probe(sample_rate="44100"))
+    assert not is_whisper_ready(_probe(channels=2))
+    assert not is_whisper_ready(_probe(codec="mp3"))
+    assert not is_whisper_ready(_probe(extra_streams=[{"codec_type": "video"}]))
+    assert not is_whisper_ready({"format": {}})
+
+
+def test_cache_entry_is_invalidated_when_the_file_changes(tmp_path):
+    media = tmp_path / "talk.wav"
+    media.write_bytes(b"RIFF")
+    cache = ProbeCache(tmp_path / "probes.sqlite3", max_entries=10)
+    cache.put(media, _probe())
+
+    assert cache.get(media) == _probe()
+    media.write_bytes(b"RIFF and more")
+    assert cache.get(media) is None
+
+
+def test_least_recently_used_entries_are_dropped(tmp_path, monkeypatch):
+    clock = itertools.count()
+    monkeypatch.setattr(probe_cache.time, "time", lambda: float(next(clock)))
+    cache = ProbeCache(tmp_path / "probes.sqlite3", max_entries=2)
+    paths = []
+    for index in range(3):
+        path = tmp_path / f"{index}.wav"
+        path.write_bytes(b"x")
+        cache.put(path, _probe())
+        paths.append(path)
+
+    assert cache.get(paths[0]) is None
+    assert cache.get(paths[2]) is not None
+
+
+def test_probe_media_runs_ffprobe_once(tmp_path, monkeypatch):
+    media = tmp_path / "talk.wav"
+    media.write_bytes(b"RIFF")
+    link = tmp_path / "link.wav"
+    os.symlink(media, link)
+    calls = []
+    monkeypatch.setattr(probe_cache, "run_ffprobe", lambda path: calls.append(path) or _probe())
+
+    assert probe_cache.probe_media(media) == _probe()
+    assert probe_cache.probe_media(link) == _probe()
+    assert calls == [media.resolve()]
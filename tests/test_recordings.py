@@ -0,0 +1,155 @@
+import os
+import time
+from functools import partial
+
+import pytest
+
+from config import settings
+from opennote.adapters.segments import SegmentArray
+from opennote.adapters.types import IngestResult
+from opennote.engine import format as formatter
+from opennote.engine import summarize
+from opennote.engine.checkpoints import MapCheckpoint
+from opennote.engine.recordings import RecordingStore
+from opennote.output import writer
+
+METADATA = {
+    "title": "Stream",
+    "source_url": None,
+    "duration_seconds": None,
+    "source_type": "audio",
+    "date": "2026-01-01",
+}
+
+
+def _segments(count: int, changed: int = -1) -> SegmentArray:
+    segments = SegmentArray()
+    for index in range(count):
+        text = f"Sentence number {index}" + (", completed." if index == changed else ".")
+        segments.append(index * 2.0, index * 2.0 + 2.0, text)
+    return segments
+
+
+def _render(segments: SegmentArray):
+    return partial(formatter.render_outputs, IngestResult(segments, METADATA), "note", None)
+
+
+def _manifest(segments: SegmentArray) -> dict:
+    return formatter.render_manifest(IngestResult(segments, METADATA), "note", None)
+
+
+def _write_outputs(title: str, segments: SegmentArray) -> writer.OutputPaths:
+    return writer.write_outputs(title, segments, "note", _render(segments), _manifest(segments))
+
+
+def _grow(path, size: int) -> None:
+    with path.open("ab") as handle:
+        handle.write(bytes(range(256)) * (size // 256))
+
+
+def test_grown_recording_resumes_before_its_last_segment(tmp_path):
+    media = tmp_path / "capture.mkv"
+    _grow(media, 512 * 1024)
+    store = RecordingStore(tmp_path / "recordings", max_entries=10)
+    store.record(media, _segments(5), "job", resumed=False)
+
+    _grow(media, 256 * 1024)
+    resume = store.resume(media)
+
+    assert len(resume.segments) == 4
+    assert resume.resume_seconds == 8.0
+
+
+def test_rewritten_recording_starts_over(tmp_path):
+    media = tmp_path / "capture.mkv"
+    _grow(media, 512 * 1024)
+    store = RecordingStore(tmp_path / "recordings", max_entries=10)
+    store.record(media, _segments(5), "job", resumed=False)
+
+    media.write_bytes(b"\0" * 600 * 1024)
+
+    assert store.resume(media) is None
+
+
+def test_only_the_most_recent_recordings_are_kept(tmp_path):
+    store = RecordingStore(tmp_path / "recordings", max_entries=2)
+    for name in ("a.mkv", "b.mkv", "c.mkv"):
+        media = tmp_path / name
+        _grow(media, 256 * 1024)
+        store.record(media, _segments(2), name, resumed=False)
+
+    assert store.resume(tmp_path / "a.mkv") is None
+    assert len(list((tmp_path / "recordings").iterdir())) == 2
+
+
+def test_only_files_that_may_still_grow_are_followed(tmp_path):
+    store = RecordingStore(tmp_path / "recordings", max_entries=10, recent_seconds=600)
+    live, finished = tmp_path / "live.mkv", tmp_path / "finished.mkv"
+    for media in (live, finished):
+        _grow(media, 256 * 1024)
+    hour_ago = time.time() - 3600
+    os.utime(finished, (hour_ago, hour_ago))
+
+    assert store.follows(live)
+    assert not store.follows(finished)
+
+    # A recording that was followed while it grew stays followed once it stops.
+    store.record(live, _segments(2), "job", resumed=False)
+    os.utime(live, (hour_ago, hour_ago))
+    assert store.follows(live)
+
+
+def test_update_extends_the_outputs_like_a_fresh_write(vault):
+    first = _write_outputs("Stream", _segments(3))
+    # The last segment of the first run was cut off and has since changed.
+    grown = _segments(6, changed=2)
+
+    updated = writer.update_outputs(
+        first, "Stream", grown, _render(grown), formatter.write_transcript, _manifest(grown)
+    )
+    fresh = _write_outputs("Fresh", grown)
+
+    assert updated == first
+    for name in ("transcript_path", "transcript_json_path", "segments_path"):
+        assert getattr(updated, name).read_bytes() == getattr(fresh, name).read_bytes()
+    assert not list(vault.glob(".*.tmp"))
+
+
+def test_failed_update_leaves_the_old_files_whole(vault):
+    first = _write_outputs("Stream", _segments(3))
+    before = first.transcript_path.read_bytes()
+
+    def broken(segments, handle, separator=""):
+        handle.write(separator + "partial")
+        raise OSError("disk full")
+
+    with pytest.raises(OSError):
+        grown = _segments(6, changed=2)
+        writer.update_outputs(first, "Stream", grown, _render(grown), broken)
+
+    assert first.transcript_path.read_bytes() == before
+    assert not list(vault.glob(".*.tmp"))
+
+
+def test_recording_checkpoint_keeps_only_the_latest_chunks(monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "SUMMARY_CHUNK_CHARS", 40)
+    monkeypatch.setattr(settings, "EXTRACTIVE_KEEP_RATIO", 1.0)
+    calls = []
+
+    def generate(prompt, system=None, num_ctx=None, metrics=None, num_predict=None):
+        calls.append(prompt)
+        return "Summary: ok" if system is None else "chunk summary"
+
+    monkeypatch.setattr(summarize, "_ollama_generate", generate)
+    directory = tmp_path / "recording"
+    directory.mkdir()
+    (directory / "map-from-another-model.jsonl").write_text("", encoding="utf-8")
+    text = "\n".join(f"Sentence number {index}." for index in range(10))
+
+    summarize.summarize_text(text[:-25], "Stream", "summary", checkpoint_dir=directory)
+    summarize.summarize_text(text, "Stream", "summary", checkpoint_dir=directory)
+
+    (path,) = directory.glob("map-*.jsonl")
+    chunks = list(summarize._chunk_text([text], 40))
+    assert len(MapCheckpoint(path)) == len(chunks)
+    assert len(path.read_text(encoding="utf-8").splitlines()) == len(chunks)
@@ -0,0 +1,52 @@
+import subprocess
+import sys
+
+import pytest
+
+from opennote import registry
+
+
+@pytest.mark.parametrize(
+    "value, kind",
+    [
+        ("https://www.youtube.com/watch?v=abc", "youtube"),
+        ("https://example.com/media/talk.mp3?sig=1", "http"),
+        ("~/talks/keynote.MKV", "audio"),
+        ("/tmp/paper.pdf", "document"),
+    ],
+)
+def test_detect_kind(value, kind):
+    assert registry.detect_kind(value) == kind
+
+
+def test_direct_media_urls_are_recognized_by_path_suffix():
+    assert registry.is_direct_media_url("https://cdn.example.com/a/talk.m4a?token=x")
+    assert not registry.is_direct_media_url("https://example.com/watch?file=talk.mp3")
+
+
+def test_unsupported_input_is_rejected():
+    with pytest.raises(ValueError, match="Unsupported input type: .exe"):
+        registry.detect_kind("setup.exe")
+
+
+def test_bot_commands_import_without_heavy_adapters():
+    heavy = ["faster_whisper", "pypdf", "requests", "opennote.adapters.audio"]
+    code = (
+        "import sys, opennote.bot.commands\n"
+        f"print(','.join(name for name in {heavy!r} if name in sys.modules))"
+    )
+
+    completed = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    )
+
+    assert completed.stdout.strip() == ""
+
+
+def test_prewarm_reports_only_new_imports(monkeypatch):
+    monkeypatch.delitem(sys.modules, "opennote.engine.extractive", raising=False)
+
+    timings = registry.prewarm(["opennote.engine.extractive", "opennote.registry", "no.such"])
+
+    assert list(timings) == ["opennote.engine.extractive"]
+    assert registry.engine("format") is sys.modules["opennote.engine.format"]
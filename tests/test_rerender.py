@@ -0,0 +1,60 @@
+from functools import partial
+
+from opennote.adapters.segments import SegmentArray
+from opennote.adapters.types import IngestResult
+from opennote.engine import format as formatter
+from opennote.engine.summarize import SummaryContent
+from opennote.output import writer
+from opennote.output.note_manifest import manifest_path, read_manifest, write_manifest
+from opennote.rerender import rerender_vault
+
+METADATA = {
+    "title": "Talk",
+    "source_url": None,
+    "duration_seconds": 5.0,
+    "source_type": "audio",
+    "date": "2026-01-01",
+}
+
+
+def _write_note():
+    segments = SegmentArray()
+    segments.append(0.0, 2.0, "Hello there.")
+    segments.append(2.0, 5.0, "General remarks.")
+    ingest = IngestResult(segments, METADATA)
+    summary = SummaryContent(summary="A greeting.", key_takeaways=["Say hello"], body=None)
+    render = partial(formatter.render_outputs, ingest, "note", summary)
+    manifest = formatter.render_manifest(ingest, "note", summary)
+    return writer.write_outputs("Talk", segments, "note", render, manifest)
+
+
+def test_fresh_notes_are_left_alone(vault):
+    _write_note()
+
+    assert [status for status, _ in rerender_vault(vault, workers=1)] == ["unchanged"]
+
+
+def test_rerender_rebuilds_the_note_from_stored_artifacts(vault):
+    outputs = _write_note()
+    original = outputs.markdown_path.read_text(encoding="utf-8")
+    outputs.markdown_path.write_text("stale", encoding="utf-8")
+    path = manifest_path(outputs.markdown_path)
+    manifest = read_manifest(path)
+    manifest["template_version"] = -1
+    write_manifest(path, manifest)
+
+    results = rerender_vault(vault, workers=1)
+
+    assert results == [("rendered", str(outputs.markdown_path))]
+    assert outputs.markdown_path.read_text(encoding="utf-8") == original
+    assert [status for status, _ in rerender_vault(vault, workers=1)] == ["unchanged"]
+
+
+def test_dry_run_and_force(vault):
+    outputs = _write_note()
+
+    assert [status for status, _ in rerender_vault(vault, workers=1, force=True, dry_run=True)] == [
+        "stale"
+    ]
+    assert [status for status, _ in rerender_vault(vault, workers=2, force=True)] == ["rendered"]
+    assert "Hello there." in outputs.markdown_path.read_text(encoding="utf-8")
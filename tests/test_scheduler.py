@@ -0,0 +1,71 @@
+import asyncio
+from functools import partial
+
+from opennote.engine.admission import AdmissionController, Demand, estimate_bytes
+from opennote.engine.scheduler import FairScheduler
+
+TALK = Demand(kind="media", duration_seconds=600, whisper_model="small")
+
+
+def test_new_chat_is_served_before_a_bulk_backlog():
+    async def run():
+        scheduler = FairScheduler(max_active=1, per_chat_limit=1)
+        first = await scheduler.acquire(1)
+        backlog = [asyncio.create_task(scheduler.acquire(1)) for _ in range(3)]
+        newcomer = asyncio.create_task(scheduler.acquire(2))
+        await asyncio.sleep(0)
+
+        scheduler.release(first)
+        lease = await asyncio.wait_for(newcomer, 1)
+        granted = [task.done() for task in backlog]
+        for task in backlog:
+            scheduler.release(lease)
+            lease = await asyncio.wait_for(task, 1)
+        scheduler.release(lease)
+        return granted, lease.interactive
+
+    granted, interactive = asyncio.run(run())
+
+    assert granted == [False, False, False]
+    assert not interactive
+
+
+def test_parked_job_does_not_block_admission_of_the_job_that_preempted_it():
+    async def run():
+        scheduler = FairScheduler(max_active=1, per_chat_limit=1)
+        # Room for one job's estimate, so a second only fits once the first is not counted.
+        admission = AdmissionController(
+            reserve_bytes=0,
+            recheck_seconds=60,
+            available=lambda: int(estimate_bytes(TALK) * 1.5),
+            rss=lambda: 0,
+        )
+
+        bulk = await scheduler.acquire(1)
+        bulk_ticket = await admission.admit(TALK)
+        bulk.on_pause = partial(admission.suspend, bulk_ticket)
+        bulk.on_resume = partial(admission.resume, bulk_ticket)
+        # A second job from the same chat turns the first into bulk work.
+        queued = asyncio.create_task(scheduler.acquire(1))
+        interactive_lease = asyncio.create_task(scheduler.acquire(2))
+        await asyncio.sleep(0)
+        assert bulk.preempt
+
+        # The bulk job's worker reaches a window boundary and parks there.
+        parked = asyncio.create_task(asyncio.to_thread(bulk.pause_point))
+        interactive = await asyncio.wait_for(interactive_lease, 1)
+        ticket = await asyncio.wait_for(admission.admit(TALK), 1)
+        assert bulk_ticket.suspended
+
+        await admission.release(ticket)
+        scheduler.release(interactive)
+        await asyncio.wait_for(parked, 1)
+        assert not bulk_ticket.suspended
+        assert bulk.pauses == 1
+
+        await admission.release(bulk_ticket)
+        scheduler.release(bulk)
+        scheduler.release(await asyncio.wait_for(queued, 1))
+        return ticket
+
+    assert asyncio.run(run()).action in {"admit", "overcommit"}
@@ -0,0 +1,50 @@
+from opennote.adapters.segments import SegmentArray
+from opennote.output.search_index import SearchIndex, backfill, get_search_index
+
+
+def _segments(*texts: str) -> SegmentArray:
+    segments = SegmentArray()
+    for index, text in enumerate(texts):
+        segments.append(index * 10.0, index * 10.0 + 5.0, text)
+    return segments
+
+
+def test_hits_carry_the_segment_timestamp(state_dir, vault):
+    index = SearchIndex(state_dir / "search.sqlite3")
+    index.add_transcript("Talk", vault / "Talk.txt", vault / "Talk.md", _segments("intro", "Café latency"))
+
+    hits = index.search("cafe")
+
+    assert [(hit.title, hit.start_ms) for hit in hits] == [("Talk", 10000)]
+    assert "*Café*" in hits[0].snippet
+    assert hits[0].note_path == vault / "Talk.md"
+
+
+def test_reindexing_replaces_the_old_rows(state_dir, vault):
+    index = SearchIndex(state_dir / "search.sqlite3")
+    index.add_transcript("Talk", vault / "Talk.txt", None, _segments("old words"))
+    index.add_transcript("Talk", vault / "Talk.txt", None, _segments("new words"))
+
+    assert index.search("old") == []
+    assert len(index.search("words")) == 1
+
+
+def test_punctuation_in_queries_is_not_fts_syntax(state_dir, vault):
+    index = SearchIndex(state_dir / "search.sqlite3")
+    index.add_transcript("Talk", vault / "Talk.txt", None, _segments("tokens per second"))
+
+    assert len(index.search('tokens" -second*')) == 1
+    assert index.search("!!!") == []
+
+
+def test_backfill_uses_sidecars_and_plain_text(vault):
+    _segments("indexed from the sidecar").save(vault / "A.segments.bin")
+    (vault / "A.txt").write_text("[00:00:00] indexed from the sidecar")
+    (vault / "2026-01-01 – B.txt").write_text("first paragraph\n\nsecond paragraph")
+
+    assert backfill(vault) == 2
+    assert backfill(vault) == 0
+
+    hits = get_search_index().search("paragraph")
+    assert {hit.title for hit in hits} == {"B"}
+    assert [hit.start_ms for hit in get_search_index().search("sidecar")] == [0]
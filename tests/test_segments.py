@@ -0,0 +1,66 @@
+import io
+import json
+
+import pytest
+
+from opennote.adapters.segments import SegmentArray, write_segments_json
+
+
+def _segments() -> SegmentArray:
+    segments = SegmentArray(capacity=1)
+    segments.append(0.0, 2.5, "Grüß Gott")
+    segments.append(2.5, 6.0, "second line")
+    segments.append(7.0, 9.0, "third line")
+    return segments
+
+
+def test_sidecar_round_trip(tmp_path):
+    path = tmp_path / "talk.segments.bin"
+    _segments().save(path)
+
+    loaded = SegmentArray.load(path)
+
+    assert list(loaded) == list(_segments())
+    assert loaded[-1] == {"start": 7.0, "end": 9.0, "text": "third line"}
+
+
+def test_appending_to_a_loaded_array_copies_it(tmp_path):
+    path = tmp_path / "talk.segments.bin"
+    _segments().save(path)
+    loaded = SegmentArray.load(path)
+
+    loaded.append(9.0, 10.0, "fourth")
+
+    assert [segment["text"] for segment in loaded][-2:] == ["third line", "fourth"]
+    assert len(SegmentArray.load(path)) == 3
+
+
+def test_truncated_sidecar_is_rejected(tmp_path):
+    path = tmp_path / "talk.segments.bin"
+    _segments().save(path)
+    path.write_bytes(path.read_bytes()[:-4])
+
+    with pytest.raises(ValueError):
+        SegmentArray.load(path)
+
+
+def test_lookup_by_time_and_text():
+    segments = _segments()
+
+    assert segments.index_at(0.0) == 0
+    assert segments.index_at(6.5) == 1
+    assert segments.index_at(100.0) == 2
+    assert segments.find("line") == [1, 2]
+    assert segments.find("Gott") == [0]
+    assert segments.find("missing") == []
+
+
+def test_json_matches_the_dicts():
+    handle = io.StringIO()
+    write_segments_json(_segments(), handle)
+
+    assert json.loads(handle.getvalue()) == list(_segments())
+
+    empty = io.StringIO()
+    write_segments_json(SegmentArray(), empty)
+    assert empty.getvalue() == "[]\n"
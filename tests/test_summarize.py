@@ -0,0 +1,86 @@
+import pytest
+
+from config import settings
+from opennote.adapters.segments import SegmentArray
+from opennote.adapters.types import IngestResult
+from opennote.engine import summarize
+
+
+def _join_then_slice(lines, max_chars):
+    text = "\n".join(lines)
+    return [text[start : start + max_chars] for start in range(0, len(text), max_chars)]
+
+
+@pytest.mark.parametrize(
+    "lines",
+    [
+        [],
+        [""],
+        ["x" * 10_000],
+        ["short", "", "lines", "of", "text"] * 40,
+        ["a" * 7, "b" * 8, "c" * 9, "d" * 16, ""],
+        ["ab" * 50, "c", "d" * 399, "e" * 1000],
+    ],
+)
+@pytest.mark.parametrize("max_chars", [1, 8, 16, 100])
+def test_chunks_equal_join_then_slice(lines, max_chars):
+    assert list(summarize._chunk_text(lines, max_chars)) == _join_then_slice(lines, max_chars)
+
+
+def test_chunking_one_huge_line_is_linear():
+    line = "x" * 5_000_000
+
+    chunks = list(summarize._chunk_text([line], 10))
+
+    assert len(chunks) == 500_000
+    assert chunks[-1] == "x" * 10
+
+
+def test_raw_text_is_joined_from_segments_on_first_use():
+    segments = SegmentArray()
+    segments.append(0.0, 1.0, "Hello there.")
+    segments.append(1.0, 2.0, "General remarks.")
+    result = IngestResult(segments, {"title": "Talk"})
+
+    assert result._raw_text is None
+    assert result.raw_text == "Hello there.\nGeneral remarks."
+    renamed = result.with_metadata(title="Other")
+    assert renamed.segments is segments
+    assert renamed.raw_text is result.raw_text
+
+
+def test_segments_summarize_like_their_joined_text(monkeypatch):
+    monkeypatch.setattr(settings, "SUMMARY_CHUNK_CHARS", 50)
+    monkeypatch.setattr(settings, "EXTRACTIVE_KEEP_RATIO", 1.0)
+    prompts = []
+
+    def generate(prompt, system=None, num_ctx=None, metrics=None, num_predict=None):
+        prompts.append(prompt)
+        return "Summary: done" if system is None else f"chunk {len(prompts)}"
+
+    monkeypatch.setattr(summarize, "_ollama_generate", generate)
+    segments = SegmentArray()
+    for index in range(12):
+        segments.append(float(index), index + 1.0, f"Segment number {index} of the talk.")
+
+    summarize.summarize_text(segments, "Talk", "summary")
+    from_segments, prompts[:] = list(prompts), []
+    summarize.summarize_text("\n".join(segments.texts()), "Talk", "summary")
+
+    assert from_segments == prompts
+
+
+def test_only_map_calls_are_capped(monkeypatch):
+    monkeypatch.setattr(settings, "SUMMARY_CHUNK_CHARS", 50)
+    monkeypatch.setattr(settings, "SUMMARY_NUM_PREDICT", None)
+    monkeypatch.setattr(settings, "EXTRACTIVE_KEEP_RATIO", 1.0)
+    caps = []
+
+    def generate(prompt, system=None, num_ctx=None, metrics=None, num_predict=None):
+        caps.append((system is not None, num_predict))
+        return "Summary: done"
+
+    monkeypatch.setattr(summarize, "_ollama_generate", generate)
+    summarize.summarize_text(" ".join(f"word{index}" for index in range(24)), "Talk", "outline")
+
+    assert caps == [(True, settings.OLLAMA_NUM_PREDICT)] * 4 + [(False, -1)]
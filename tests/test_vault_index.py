@@ -0,0 +1,107 @@
+import os
+
+import pytest
+
+from opennote.output import vault_index
+from opennote.output.vault_index import VaultIndex, atomic_open
+
+
+@pytest.fixture
+def db_path(state_dir):
+    return state_dir / "vault.sqlite3"
+
+
+def test_numbered_names_skip_existing_files(vault, db_path):
+    (vault / "Talk.md").write_text("old")
+    index = VaultIndex(vault, db_path)
+
+    assert index.reserve("Talk", ".md").name == "Talk (1).md"
+    assert index.reserve("talk", ".md").name == "talk (2).md"
+    assert index.reserve("Other", ".md").name == "Other.md"
+
+
+def test_two_processes_never_get_the_same_name(vault, db_path):
+    bot = VaultIndex(vault, db_path)
+    runner = VaultIndex(vault, db_path)
+
+    names = {bot.reserve("Talk", ".md").name, runner.reserve("Talk", ".md").name}
+
+    assert names == {"Talk.md", "Talk (1).md"}
+
+
+def test_files_created_after_startup_are_not_handed_out(vault, db_path):
+    index = VaultIndex(vault, db_path)
+    (vault / "Daily.md").write_text("written in Obsidian")
+
+    assert index.reserve("Daily", ".md").name == "Daily (1).md"
+    assert (vault / "Daily.md").read_text() == "written in Obsidian"
+
+
+def test_released_names_are_reused(vault, db_path):
+    index = VaultIndex(vault, db_path)
+    path = index.reserve("Talk", ".md")
+
+    index.release(path)
+
+    assert index.reserve("Talk", ".md") == path
+
+
+def test_own_writes_do_not_force_a_rescan(vault, db_path, monkeypatch):
+    index = VaultIndex(vault, db_path)
+    with index.writing():
+        with atomic_open(index.reserve("Talk", ".md")) as handle:
+            handle.write("note")
+
+    scans = []
+    real_scandir = os.scandir
+    monkeypatch.setattr(vault_index.os, "scandir", lambda path: scans.append(path) or real_scandir(path))
+    VaultIndex(vault, db_path)
+    assert scans == []
+
+    (vault / "Dropped in.md").write_text("external")
+    reopened = VaultIndex(vault, db_path)
+    assert len(scans) == 1
+    assert reopened.reserve("Dropped in", ".md").name == "Dropped in (1).md"
+
+
+def test_atomic_open_syncs_before_replacing(tmp_path, monkeypatch):
+    synced = []
+    real_fsync = os.fsync
+    monkeypatch.setattr(vault_index.os, "fsync", lambda fd: synced.append(fd) or real_fsync(fd))
+    target = tmp_path / "note.md"
+    target.write_text("old")
+
+    with atomic_open(target) as handle:
+        handle.write("new")
+
+    assert synced and target.read_text() == "new"
+    assert not (tmp_path / ".note.md.tmp").exists()
+
+
+def test_atomic_open_keeps_the_old_file_on_error(tmp_path):
+    target = tmp_path / "note.md"
+    target.write_text("old")
+
+    with pytest.raises(RuntimeError):
+        with atomic_open(target) as handle:
+            handle.write("partial")
+            raise RuntimeError("crash")
+
+    assert target.read_text() == "old"
+    assert not (tmp_path / ".note.md.tmp").exists()
+
+
+def test_rescan_keeps_names_another_process_is_still_writing(vault, db_path, monkeypatch):
+    bot = VaultIndex(vault, db_path)
+    pending = bot.reserve("Talk", ".md")
+    # Something else changes the vault, so the next open rescans it.
+    (vault / "Daily.md").write_text("written in Obsidian")
+
+    rerender = VaultIndex(vault, db_path)
+    assert rerender.reserve("Talk", ".md").name == "Talk (1).md"
+
+    # An abandoned reservation is dropped once the grace period is over.
+    monkeypatch.setattr(vault_index, "RESERVATION_GRACE_SECONDS", 0.0)
+    (vault / "Other.md").write_text("another change")
+    later = VaultIndex(vault, db_path)
+    assert later.reserve("Talk", ".md") == pending
@@ -0,0 +1,119 @@
+import numpy as np
+
+from config import settings
+from opennote.adapters.segments import SegmentArray
+from opennote.output.vector_index import Chunk, VectorIndex, chunk_for_embedding, index_transcript
+
+
+def _vectors(*directions: int, dim: int = 4) -> np.ndarray:
+    return np.eye(dim, dtype=np.float32)[list(directions)]
+
+
+def test_search_returns_the_closest_live_chunks(state_dir, vault):
+    index = VectorIndex(state_dir / "vectors")
+    index.add("A", vault / "A.txt", [Chunk("a0", 0.0), Chunk("a1", 30.0)], _vectors(0, 1))
+    index.add("B", vault / "B.txt", [Chunk("b0", 0.0)], _vectors(2))
+
+    hits = index.search(np.array([0.1, 1.0, 0.0, 0.0]), k=2)
+
+    assert [(hit.title, hit.text, hit.start_seconds) for hit in hits] == [
+        ("A", "a1", 30.0),
+        ("A", "a0", 0.0),
+    ]
+
+
+def test_reindexing_hides_the_old_rows(state_dir, vault):
+    index = VectorIndex(state_dir / "vectors")
+    index.add("A", vault / "A.txt", [Chunk("old", None)], _vectors(0))
+    index.add("A", vault / "A.txt", [Chunk("new", None)], _vectors(1))
+
+    assert [hit.text for hit in index.search(_vectors(0)[0], k=5)] == ["new"]
+
+
+def test_partial_append_from_a_crash_does_not_shift_later_rows(state_dir, vault):
+    index = VectorIndex(state_dir / "vectors")
+    index.add("A", vault / "A.txt", [Chunk("a0", None)], _vectors(0))
+    # A crash after writing part of a vector, before its rows were committed.
+    with (state_dir / "vectors" / "vectors.f32").open("ab") as handle:
+        handle.write(b"\x00" * 6)
+
+    reopened = VectorIndex(state_dir / "vectors")
+    reopened.add("B", vault / "B.txt", [Chunk("b0", None), Chunk("b1", None)], _vectors(1, 2))
+
+    assert [hit.text for hit in reopened.search(_vectors(2)[0], k=1)] == ["b1"]
+    assert [hit.text for hit in reopened.search(_vectors(0)[0], k=1)] == ["a0"]
+    assert (state_dir / "vectors" / "vectors.f32").stat().st_size == 3 * 4 * 4
+
+
+def test_uncommitted_vectors_are_ignored_and_overwritten(state_dir, vault):
+    index = VectorIndex(state_dir / "vectors")
+    index.add("A", vault / "A.txt", [Chunk("a0", None)], _vectors(0))
+    with (state_dir / "vectors" / "vectors.f32").open("ab") as handle:
+        handle.write(_vectors(3).astype("<f4").tobytes())
+
+    assert [hit.text for hit in index.search(_vectors(3)[0], k=5)] == ["a0"]
+
+    index.add("B", vault / "B.txt", [Chunk("b0", None)], _vectors(1))
+    assert index.search(_vectors(1)[0], k=1)[0].text == "b0"
+
+
+def test_chunks_keep_the_start_of_their_first_segment(vault):
+    segments = SegmentArray()
+    for second, text in ((0.0, "aaaa"), (5.0, "bbbb"), (9.0, "cccc")):
+        segments.append(second, second + 1, text)
+
+    chunks = chunk_for_embedding(segments, "", max_chars=9)
+
+    assert chunks == [Chunk("aaaa bbbb", 0.0), Chunk("cccc", 9.0)]
+    assert chunk_for_embedding([], "x" * 10, max_chars=4) == [
+        Chunk("xxxx", None),
+        Chunk("xxxx", None),
+        Chunk("xx", None),
+    ]
+
+
+def test_index_transcript_embeds_each_chunk(vault):
+    segments = SegmentArray()
+    segments.append(0.0, 1.0, "hello")
+
+    count = index_transcript("A", vault / "A.txt", segments, "", embed=lambda texts: _vectors(0))
+
+    assert count == 1
+
+
+def test_answers_cite_the_retrieved_excerpts(vault):
+    from opennote.engine.retrieval import answer_question
+    from opennote.output.vector_index import get_vector_index
+
+    get_vector_index().add("Talk", vault / "Talk.txt", [Chunk("GPUs {are} fast", 75.0)], _vectors(1))
+    prompts = []
+
+    answer = answer_question(
+        "Why?", k=3, embed=lambda texts: _vectors(1), generate=lambda prompt: prompts.append(prompt) or "ok"
+    )
+
+    assert answer.text == "ok"
+    assert [chunk.text for chunk in answer.sources] == ["GPUs {are} fast"]
+    assert "[1] Talk [00:01:15]\nGPUs {are} fast" in prompts[0]
+
+
+def test_empty_index_answers_without_the_llm():
+    from opennote.engine.retrieval import answer_question
+
+    answer = answer_question("Why?", k=3, embed=lambda texts: _vectors(0), generate=None)
+
+    assert answer.sources == []
+
+
+def test_answers_come_from_the_configured_ollama(monkeypatch, vault, fake_ollama):
+    from opennote.engine.retrieval import answer_question
+    from opennote.output.vector_index import get_vector_index
+
+    monkeypatch.setattr(settings, "OLLAMA_URL", fake_ollama.url)
+    monkeypatch.setattr(settings, "OLLAMA_BACKENDS", [])
+    get_vector_index().add("Talk", vault / "Talk.txt", [Chunk("GPUs are fast", 75.0)], _vectors(1))
+
+    answer = answer_question("Why?", k=3, embed=lambda texts: _vectors(1))
+
+    assert answer.text.endswith("Third point")
+    assert fake_ollama.requests == 1